@@ -0,0 +1,116 @@
+"""Server-side advisor conversations with a token budget.
+
+The advisor page used to send the whole conversation with every message, so
+Ollama re-read a longer prompt each turn. Conversations now live here, keyed
+by id, and the client only sends the new message.
+
+Once the kept turns exceed `token_budget` (estimated at ~4 characters per
+token), the oldest turns are folded into a short rolling summary. Trimming
+happens in blocks, down to half the budget, rather than one turn at a time.
+That keeps the prompt prefix identical across consecutive turns, so Ollama
+can reuse its cached prefix while the model stays loaded (`keep_alive`).
+"""
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 4
+
+
+class Conversation:
+    def __init__(self, user_id):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.messages = []   # [{'role': 'user'|'assistant', 'content': str}]
+        self.summary = ''
+        self.turns = 0
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    def tokens(self):
+        return sum(estimate_tokens(m['content']) for m in self.messages)
+
+
+class ConversationStore:
+    def __init__(self, token_budget=1024, summary_chars=600, max_conversations=1000, ttl=6 * 3600):
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self.trims = 0
+        self._turn_latency = {}  # turn number -> [count, total_ms]
+
+    def get_or_create(self, conversation_id, user_id):
+        """Return the user's conversation `conversation_id`, or a new one if it is unknown/expired."""
+        now = time.time()
+        with self._lock:
+            conv = self._conversations.get(conversation_id) if conversation_id else None
+            if conv is not None and (conv.user_id != user_id or now - conv.updated_at > self.ttl):
+                conv = None
+            if conv is None:
+                conv = Conversation(user_id)
+                self._conversations[conv.id] = conv
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            self._conversations.move_to_end(conv.id)
+            conv.updated_at = now
+            return conv
+
+    def _fold(self, dropped, summary):
+        """Append the gist of dropped turns to the rolling summary (first sentence of each user turn)."""
+        points = []
+        for message in dropped:
+            if message['role'] != 'user':
+                continue
+            first = re.split(r'(?<=[.!?])\s+', message['content'].strip(), maxsplit=1)[0]
+            points.append(first[:120])
+        if not points:
+            return summary
+        summary = (summary + ' ' if summary else '') + '; '.join(points)
+        # Keep the most recent part of the summary when it grows past the cap
+        return summary[-self.summary_chars:]
+
+    def build_messages(self, conv, system_prompt, new_message):
+        """Messages to send for this turn. Trims `conv` first if it is over budget."""
+        pending = {'role': 'user', 'content': new_message}
+        if conv.tokens() + estimate_tokens(new_message) > self.token_budget:
+            target = self.token_budget // 2
+            dropped = []
+            while conv.messages and conv.tokens() + estimate_tokens(new_message) > target:
+                dropped.append(conv.messages.pop(0))
+            # Never start the kept history on an assistant reply
+            while conv.messages and conv.messages[0]['role'] == 'assistant':
+                dropped.append(conv.messages.pop(0))
+            conv.summary = self._fold(dropped, conv.summary)
+            with self._lock:
+                self.trims += 1
+
+        messages = [{'role': 'system', 'content': system_prompt}]
+        if conv.summary:
+            messages.append({
+                'role': 'system',
+                'content': f'Earlier in this conversation the student asked about: {conv.summary}'
+            })
+        return messages + conv.messages + [pending]
+
+    def record_turn(self, conv, user_message, reply, elapsed_ms):
+        conv.messages.append({'role': 'user', 'content': user_message})
+        conv.messages.append({'role': 'assistant', 'content': reply})
+        conv.turns += 1
+        conv.updated_at = time.time()
+        with self._lock:
+            bucket = self._turn_latency.setdefault(conv.turns, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += elapsed_ms
+
+    def stats(self, turns=(1, 10, 30)):
+        with self._lock:
+            latency = {f'turn_{t}_avg_ms': (self._turn_latency[t][1] / self._turn_latency[t][0])
+                       if t in self._turn_latency else None for t in turns}
+            return dict(conversations=len(self._conversations), trims=self.trims, **latency)
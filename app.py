@@ -1,60 +1,135 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-import requests
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, case
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
+import sys
 import math
-import plaid
-from plaid.api import plaid_api
-import google.generativeai as genai
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.products import Products
-from plaid.model.country_code import CountryCode
-from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
-from plaid.model.transactions_get_request import TransactionsGetRequest
-from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
-from plaid.api_client import ApiClient
 from dotenv import load_dotenv
 import threading
+import time
+from concurrent.futures import wait as wait_for_futures
+from link_token_cache import LinkTokenCache
+from plaid_resilience import ResilientPlaidClient, PlaidUnavailable
+from plaid_webhooks import WebhookVerifier, RefreshQueue, REFRESH_WEBHOOK_CODES
+from json_provider import make_json_provider
+from compression import Compressor
+from advisor_store import ConversationStore
+from ollama_warmup import ModelWarmer
+from semantic_cache import SemanticCache, OllamaEmbedder, mentions_figures
+from llm_router import LLMRouter, OllamaBackend, GeminiBackend, NoBackendAvailable
+from rate_limit import RateLimiter, MemoryBucketStore, SQLiteBucketStore
+from bulk_io import register_data_commands
+from subscriptions import detect_subscriptions
+from simulator import Simulator, parse_params as parse_simulation_params
+from debt_planner import parse_debts, plan_repayment, cache_stats as debt_plan_cache_stats
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
+# orjson-backed jsonify (stdlib fallback) and gzip for larger text/JSON responses
+app.json = make_json_provider(app)
+compressor = Compressor(app, min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)))
+
 # Ensure database directory exists
 db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database')
 if not os.path.exists(db_dir):
     os.makedirs(db_dir)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(db_dir, "WHACK2025.db")}'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f'sqlite:///{os.path.join(db_dir, "WHACK2025.db")}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+# Per-user token buckets for the XP and LLM routes ("N/second|minute|hour", empty = unlimited).
+# Buckets are per process unless RATE_LIMIT_STORE names a SQLite file shared by all workers.
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE')
+RATE_LIMIT_ADD_XP = os.getenv('RATE_LIMIT_ADD_XP', '30/minute')
+RATE_LIMIT_ADVISOR = os.getenv('RATE_LIMIT_ADVISOR', '10/minute')
+RATE_LIMIT_ANALYZE = os.getenv('RATE_LIMIT_ANALYZE', '5/minute')
+RATE_LIMIT_SIMULATE = os.getenv('RATE_LIMIT_SIMULATE', '20/minute')
+limiter = RateLimiter(app, SQLiteBucketStore(RATE_LIMIT_STORE) if RATE_LIMIT_STORE else MemoryBucketStore())
+
 # Plaid Configuration
 PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
 PLAID_SECRET = os.getenv('PLAID_SECRET')
 PLAID_ENV = os.getenv('PLAID_ENV', 'sandbox')
+PLAID_WEBHOOK_URL = os.getenv('PLAID_WEBHOOK_URL')  # public URL of /plaid/webhook, if any
+PLAID_WEBHOOK_DEV_SECRET = os.getenv('PLAID_WEBHOOK_DEV_SECRET')  # sandbox-only, for scripts/post_plaid_webhook.py
+
+# How many days of history a refresh pulls, and how long local transactions are
+# trusted before /api/transactions refreshes them itself. With webhooks set up
+# Plaid tells us when data changes, so the local copy can be kept much longer.
+TRANSACTION_HISTORY_DAYS = 90
+TRANSACTION_CACHE_TTL = timedelta(hours=24) if PLAID_WEBHOOK_URL else timedelta(minutes=5)
 
 # Gemini Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-# Configure Plaid client
-configuration = plaid.Configuration(
-    host=plaid.Environment.Sandbox if PLAID_ENV == 'sandbox' else plaid.Environment.Production,
-    api_key={
-        'clientId': PLAID_CLIENT_ID,
-        'secret': PLAID_SECRET,
-    }
-)
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
+
+# LLM routing between Ollama and Gemini: fastest | cost | sticky
+LLM_ROUTING_POLICY = os.getenv('LLM_ROUTING_POLICY', 'fastest')
+LLM_COST_CAP = os.getenv('LLM_COST_CAP')  # max estimated cost per call for the 'cost' policy
+
+# Ollama (advisor chat) Configuration
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434').rstrip('/')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:3b')
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+ADVISOR_TOKEN_BUDGET = int(os.getenv('ADVISOR_TOKEN_BUDGET', 1024))
+OLLAMA_WARMUP_INTERVAL = int(os.getenv('OLLAMA_WARMUP_INTERVAL', 60))  # seconds; 0 disables warm-up
+ADVISOR_CACHE_EMBED_MODEL = os.getenv('ADVISOR_CACHE_EMBED_MODEL')  # e.g. nomic-embed-text; unset = no answer cache
+ADVISOR_CACHE_SIZE = int(os.getenv('ADVISOR_CACHE_SIZE', 512))
+ADVISOR_CACHE_THRESHOLD = float(os.getenv('ADVISOR_CACHE_THRESHOLD', 0.9))
+ADVISOR_CACHE_POLICY = os.getenv('ADVISOR_CACHE_POLICY', 'lru')
+
+# Plaid and Gemini SDKs are slow to import, so they are only loaded (and their
+# clients built) the first time a route actually needs them.
+_plaid_client = None
+_genai = None
+_client_lock = threading.Lock()
+
+def get_plaid_client():
+    """Return the shared Plaid API client, building it on first use."""
+    global _plaid_client
+    if _plaid_client is None:
+        with _client_lock:
+            if _plaid_client is None:
+                import plaid
+                from plaid.api import plaid_api
+                from plaid.api_client import ApiClient
 
-api_client = ApiClient(configuration)
-plaid_client = plaid_api.PlaidApi(api_client)
+                configuration = plaid.Configuration(
+                    host=plaid.Environment.Sandbox if PLAID_ENV == 'sandbox' else plaid.Environment.Production,
+                    api_key={
+                        'clientId': PLAID_CLIENT_ID,
+                        'secret': PLAID_SECRET,
+                    }
+                )
+                _plaid_client = plaid_api.PlaidApi(ApiClient(configuration))
+    return _plaid_client
+
+# All Plaid calls go through this wrapper for deadlines, retries and per-item circuit breakers
+plaid_api_client = ResilientPlaidClient(get_plaid_client)
+
+def get_genai():
+    """Return the configured google.generativeai module, importing it on first use."""
+    global _genai
+    if _genai is None:
+        with _client_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if GEMINI_API_KEY:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+def is_plaid_api_error(exc):
+    """True if `exc` is a Plaid ApiException. Never imports the SDK itself."""
+    plaid_exceptions = sys.modules.get('plaid.exceptions')
+    return plaid_exceptions is not None and isinstance(exc, plaid_exceptions.ApiException)
 
 # User Model
 class User(db.Model):
@@ -144,6 +219,27 @@ class PlaidItem(db.Model):
     institution_name = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Local copy of an item's Plaid transactions, kept fresh by webhooks / refresh jobs
+class Transaction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.String(100), unique=True, nullable=False)
+    plaid_item_id = db.Column(db.Integer, db.ForeignKey('plaid_item.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    account_id = db.Column(db.String(100))
+    date = db.Column(db.Date, nullable=False, index=True)
+    name = db.Column(db.String(200))
+    amount = db.Column(db.Float, nullable=False)
+    category = db.Column(db.String(100))
+    merchant_name = db.Column(db.String(200))
+
+# When each Plaid item's transactions were last pulled into the local store
+class TransactionSync(db.Model):
+    plaid_item_id = db.Column(db.Integer, db.ForeignKey('plaid_item.id'), primary_key=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+# `flask data export|import users|activity <file>` for moving or auditing XP history in bulk
+register_data_commands(app, db, {'users': User.__table__, 'activity': ActivityLog.__table__})
+
 # Routes
 @app.route('/')
 def index():
@@ -307,6 +403,7 @@ def crossword_alias():
     return redirect(url_for('game4'))
 
 @app.route('/api/add_xp', methods=['POST'])
+@limiter.limit(RATE_LIMIT_ADD_XP)
 def add_xp():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
@@ -355,30 +452,48 @@ def user_stats():
         'progress_text': user.xp_progress_text()
     })
 
+def fetch_link_token(user_id):
+    """Call Plaid's link_token_create for `user_id`. Returns (link_token, expires_at)."""
+    from plaid.model.link_token_create_request import LinkTokenCreateRequest
+    from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+    from plaid.model.products import Products
+    from plaid.model.country_code import CountryCode
+
+    link_request = LinkTokenCreateRequest(
+        user=LinkTokenCreateRequestUser(
+            client_user_id=str(user_id)
+        ),
+        client_name="WHACK2025",
+        products=[Products("transactions")],
+        country_codes=[CountryCode('US')],
+        language='en'
+    )
+    if PLAID_WEBHOOK_URL:
+        link_request.webhook = PLAID_WEBHOOK_URL
+
+    response = plaid_api_client.link_token_create(link_request)
+    expiration = response.get('expiration')
+    return response['link_token'], expiration.timestamp() if expiration else None
+
+link_token_cache = LinkTokenCache(fetch_link_token)
+
 @app.route('/api/create_link_token', methods=['POST'])
 def create_link_token():
-    """Create a link token for Plaid Link"""
+    """Create a link token for Plaid Link (served from the per-user cache when possible)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        link_request = LinkTokenCreateRequest(
-            user=LinkTokenCreateRequestUser(
-                client_user_id=str(session['user_id'])
-            ),
-            client_name="WHACK2025",
-            products=[Products("transactions")],
-            country_codes=[CountryCode('US')],
-            language='en'
-        )
-        
-        response = plaid_client.link_token_create(link_request)
-        return jsonify({'link_token': response['link_token']})
+        link_token = link_token_cache.get(session['user_id'], timeout=30)
+        return jsonify({'link_token': link_token})
     
-    except plaid.ApiException as e:
-        print(f"Plaid API Error: {e}")
-        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        if isinstance(e, PlaidUnavailable):
+            print(f"Plaid Unavailable: {e}")
+            return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503
+        if is_plaid_api_error(e):
+            print(f"Plaid API Error: {e}")
+            return jsonify({'error': str(e)}), 400
         print(f"General Error: {e}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
@@ -390,6 +505,8 @@ def exchange_public_token():
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
+        from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
         public_token = request.json.get('public_token')
         institution_name = request.json.get('institution_name', 'Unknown Bank')
         
@@ -397,7 +514,7 @@ def exchange_public_token():
             public_token=public_token
         )
         
-        exchange_response = plaid_client.item_public_token_exchange(exchange_request)
+        exchange_response = plaid_api_client.item_public_token_exchange(exchange_request)
         access_token = exchange_response['access_token']
         item_id = exchange_response['item_id']
         
@@ -411,23 +528,127 @@ def exchange_public_token():
         
         db.session.add(plaid_item)
         db.session.commit()
+        # Link has been completed with the cached token; start fresh next time
+        link_token_cache.invalidate(session['user_id'])
+        # Start pulling transactions now so they're local before the page asks
+        transaction_refresher.enqueue(item_id)
         
         return jsonify({
             'success': True,
             'item_id': item_id
         })
     
-    except plaid.ApiException as e:
-        print(f"Plaid API Error: {e}")
-        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        if isinstance(e, PlaidUnavailable):
+            print(f"Plaid Unavailable: {e}")
+            return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503
+        if is_plaid_api_error(e):
+            print(f"Plaid API Error: {e}")
+            return jsonify({'error': str(e)}), 400
         print(f"General Error: {e}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+def refresh_item_transactions(item_id):
+    """Pull an item's recent transactions from Plaid into the local store.
+
+    Runs on the refresh queue's worker threads (webhooks, new connections) and
+    is also awaited by /api/transactions when the local copy is stale.
+    Returns the number of transactions stored.
+    """
+    from plaid.model.transactions_get_request import TransactionsGetRequest
+    from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
+
+    with app.app_context():
+        item = PlaidItem.query.filter_by(item_id=item_id).first()
+        if item is None:
+            return 0
+
+        start_date = (datetime.now() - timedelta(days=TRANSACTION_HISTORY_DAYS)).date()
+        end_date = datetime.now().date()
+
+        fetched = []
+        while True:
+            txn_request = TransactionsGetRequest(
+                access_token=item.access_token,
+                start_date=start_date,
+                end_date=end_date,
+                options=TransactionsGetRequestOptions(
+                    count=500,
+                    offset=len(fetched)
+                )
+            )
+            response = plaid_api_client.transactions_get(txn_request, item_id=item.item_id)
+            fetched.extend(response['transactions'])
+            if not response['transactions'] or len(fetched) >= response['total_transactions']:
+                break
+
+        existing = {t.transaction_id: t for t in Transaction.query.filter(
+            Transaction.plaid_item_id == item.id,
+            Transaction.date >= start_date,
+        )}
+        for txn in fetched:
+            row = existing.pop(txn['transaction_id'], None)
+            if row is None:
+                row = Transaction(transaction_id=txn['transaction_id'], plaid_item_id=item.id, user_id=item.user_id)
+                db.session.add(row)
+            row.account_id = txn['account_id']
+            row.date = txn['date']
+            row.name = txn['name']
+            row.amount = txn['amount']
+            row.category = txn['category'][0] if txn.get('category') else 'Uncategorized'
+            row.merchant_name = txn.get('merchant_name') or txn['name']
+        # Anything left in the window was removed or replaced (e.g. pending -> posted)
+        for row in existing.values():
+            db.session.delete(row)
+
+        sync = db.session.get(TransactionSync, item.id) or TransactionSync(plaid_item_id=item.id)
+        sync.refreshed_at = datetime.utcnow()
+        db.session.add(sync)
+        db.session.commit()
+        return len(fetched)
+
+transaction_refresher = RefreshQueue(refresh_item_transactions)
+
+def fetch_webhook_key(kid):
+    """Look up Plaid's public JWK for webhook key id `kid`."""
+    from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+    response = plaid_api_client.call('webhook_verification_key_get',
+                                     WebhookVerificationKeyGetRequest(key_id=kid), key='webhook')
+    return response['key'].to_dict()
+
+webhook_verifier = WebhookVerifier(
+    fetch_webhook_key,
+    dev_secret=PLAID_WEBHOOK_DEV_SECRET if PLAID_ENV == 'sandbox' else None
+)
+
+@app.route('/plaid/webhook', methods=['POST'])
+def plaid_webhook():
+    """Receive Plaid webhooks and queue background transaction refreshes"""
+    body = request.get_data()
+    if not webhook_verifier.verify(body, request.headers):
+        return jsonify({'error': 'Invalid webhook signature'}), 401
+
+    payload = request.get_json(silent=True) or {}
+    webhook_type = payload.get('webhook_type')
+    webhook_code = payload.get('webhook_code')
+    item_id = payload.get('item_id')
+
+    queued = False
+    if webhook_type == 'TRANSACTIONS' and webhook_code in REFRESH_WEBHOOK_CODES and item_id:
+        if PlaidItem.query.filter_by(item_id=item_id).first():
+            transaction_refresher.enqueue(item_id)
+            queued = True
+    elif webhook_type == 'ITEM' and webhook_code == 'ERROR':
+        print(f"Plaid item {item_id} error: {payload.get('error')}")
+
+    # Always 200 for verified webhooks so Plaid doesn't keep retrying ones we ignore
+    return jsonify({'received': True, 'queued': queued})
+
 @app.route('/api/transactions')
 def get_transactions():
-    """Fetch transactions from Plaid"""
+    """Return the user's recent transactions from the local store, refreshing stale items from Plaid"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -438,51 +659,69 @@ def get_transactions():
         if not plaid_items:
             return jsonify({'error': 'No bank accounts connected'}), 404
         
-        all_transactions = []
+        synced = {s.plaid_item_id: s.refreshed_at for s in TransactionSync.query.filter(
+            TransactionSync.plaid_item_id.in_([item.id for item in plaid_items])
+        )}
+        force = request.args.get('refresh') == '1'
+        unavailable = []
         
-        # Get transactions for each connected account
+        # Webhooks normally keep items fresh; only wait on Plaid for stale or new ones
+        refreshes = {}
         for item in plaid_items:
-            start_date = (datetime.now() - timedelta(days=30)).date()
-            end_date = datetime.now().date()
-            
-            txn_request = TransactionsGetRequest(
-                access_token=item.access_token,
-                start_date=start_date,
-                end_date=end_date,
-                options=TransactionsGetRequestOptions(
-                    count=100,
-                    offset=0
-                )
-            )
-            
-            response = plaid_client.transactions_get(txn_request)
-            transactions = response['transactions']
-            
-            # Format transactions
-            for txn in transactions:
-                all_transactions.append({
-                    'id': txn['transaction_id'],
-                    'date': str(txn['date']),
-                    'name': txn['name'],
-                    'amount': txn['amount'],
-                    'category': txn['category'][0] if txn.get('category') else 'Uncategorized',
-                    'merchant_name': txn.get('merchant_name', txn['name']),
-                    'institution': item.institution_name
-                })
+            refreshed_at = synced.get(item.id)
+            if refreshed_at and not force and datetime.utcnow() - refreshed_at < TRANSACTION_CACHE_TTL:
+                continue
+            refreshes[item] = transaction_refresher.enqueue(item.item_id)
         
-        # Sort by date (most recent first)
-        all_transactions.sort(key=lambda x: x['date'], reverse=True)
+        # One shared deadline; refreshes still running keep going in the background and the
+        # stored transactions are returned as partial
+        done, still_running = wait_for_futures(refreshes.values(), timeout=plaid_api_client.deadline * 2)
+        for item, future in refreshes.items():
+            if future not in done:
+                print(f"Plaid refresh for {item.institution_name} still running; serving stored transactions")
+                continue
+            try:
+                future.result()
+            except PlaidUnavailable as e:
+                # One degraded institution shouldn't hide the others
+                print(f"Plaid unavailable for {item.institution_name}: {e}")
+                unavailable.append(e)
+        
+        if len(unavailable) == len(plaid_items):
+            raise unavailable[0]
+        
+        institutions = {item.id: item.institution_name for item in plaid_items}
+        start_date = (datetime.now() - timedelta(days=30)).date()
+        rows = Transaction.query.filter(
+            Transaction.user_id == session['user_id'],
+            Transaction.date >= start_date,
+        ).order_by(Transaction.date.desc()).all()
+        
+        # Most recent first
+        all_transactions = [{
+            'id': row.transaction_id,
+            'date': str(row.date),
+            'name': row.name,
+            'amount': row.amount,
+            'category': row.category,
+            'merchant_name': row.merchant_name,
+            'institution': institutions.get(row.plaid_item_id)
+        } for row in rows]
         
         return jsonify({
             'success': True,
             'transactions': all_transactions,
-            'count': len(all_transactions)
+            'count': len(all_transactions),
+            'partial': bool(unavailable or still_running)
         })
     
-    except plaid.ApiException as e:
-        print(f"Plaid API Error: {e}")
-        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        if isinstance(e, PlaidUnavailable):
+            print(f"Plaid Unavailable: {e}")
+            return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503
+        if is_plaid_api_error(e):
+            print(f"Plaid API Error: {e}")
+            return jsonify({'error': str(e)}), 400
         print(f"General Error: {e}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
@@ -506,11 +745,40 @@ def connected_accounts():
         'accounts': accounts
     })
 
+@app.route('/api/metrics')
+def metrics():
+    """Runtime counters for caches and backend clients"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    return jsonify({
+        'success': True,
+        'link_token_cache': link_token_cache.stats(),
+        'link_token_age_s': link_token_cache.token_age(session['user_id']),
+        'plaid_client': plaid_api_client.stats(),
+        'transaction_refresh': transaction_refresher.stats(),
+        'webhooks': {'accepted': webhook_verifier.accepted, 'rejected': webhook_verifier.rejected,
+                     'key_fetches': webhook_verifier.key_fetches,
+                     'key_fetches_refused': webhook_verifier.key_fetches_refused},
+        'analyze_transactions': analysis_stats_snapshot(),
+        'json_provider': type(app.json).__name__,
+        'compression': compressor.stats(),
+        'advisor_conversations': conversation_store.stats(),
+        'advisor_model': model_warmer.stats(),
+        'advisor_answer_cache': answer_cache.stats() if answer_cache else None,
+        'llm_router': llm_router.stats(),
+        'rate_limits': limiter.stats(),
+        'simulator': simulator.stats(),
+        'debt_planner': debt_plan_cache_stats(),
+    })
+
 @app.route('/bank-api')
 def bank_api():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
+    # Warm the Link token while the page renders so "connect bank" opens instantly
+    link_token_cache.prefetch(session['user_id'])
     user = User.query.get(session['user_id'])
     return render_template('bank_api.html', user=user)
 
@@ -529,79 +797,376 @@ def invest_tools():
     user = User.query.get(session['user_id'])
     return render_template('invest.html', user=user)
 
+# Monte Carlo runs for the invest page; repeats come from cache. Web requests are capped at
+# SIMULATE_MAX_PATHS, below the pool threshold by default, so they run in process: the pool
+# only pays off for offline-sized runs, or if an operator raises both settings.
+simulator = Simulator(pool_threshold=int(os.getenv('SIMULATE_POOL_THRESHOLD', 200_000)))
+SIMULATE_MAX_PATHS = int(os.getenv('SIMULATE_MAX_PATHS', 50_000))
+
+@app.route('/api/simulate', methods=['POST'])
+@limiter.limit(RATE_LIMIT_SIMULATE)
+def simulate():
+    """Percentile bands of savings/investment outcomes over many random return paths.
+
+    Body (all optional): `initial`, `monthly_contribution`, `years`,
+    `annual_return`, `volatility` and `inflation` (percent per year),
+    `paths`, `seed` and a `target` balance. See simulator.py.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    try:
+        params = parse_simulation_params(data, max_paths=SIMULATE_MAX_PATHS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    result, cached = simulator.run(params)
+    return jsonify({'success': True, 'cached': cached, **result})
+
+@app.route('/api/debt_plan', methods=['POST'])
+def debt_plan():
+    """Compare avalanche, snowball and (optionally) a custom repayment order for several debts.
+
+    Body: `debts` (list of {name, balance, apr, min_payment}),
+    `monthly_budget` (default: the sum of the minimums), optional
+    `custom_order` (debt names or indexes) and `include_schedule` for
+    per-debt monthly payments. See debt_planner.py.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json() or {}
+    try:
+        debts, budget, custom = parse_debts(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    result = plan_repayment(debts, budget, custom, include_schedule=bool(data.get('include_schedule')))
+    return jsonify({'success': True, **result})
+
+# Advisor chat history, kept server-side and trimmed to ADVISOR_TOKEN_BUDGET
+conversation_store = ConversationStore(token_budget=ADVISOR_TOKEN_BUDGET)
+
+# Load the advisor model when the worker serves its first request and keep it resident.
+# Not at import: scripts, benchmarks and spawned simulator processes import this module too.
+model_warmer = ModelWarmer(OLLAMA_BASE_URL, OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE,
+                           interval=OLLAMA_WARMUP_INTERVAL)
+
+@app.before_request
+def start_model_warmer():
+    model_warmer.start()
+
+# Answers to common standalone questions, matched by embedding similarity. Only with a real
+# embedding model: near-identical wording ("good"/"bad", 500/900) must not share an answer.
+answer_cache = SemanticCache(
+    OllamaEmbedder(OLLAMA_BASE_URL, ADVISOR_CACHE_EMBED_MODEL),
+    capacity=ADVISOR_CACHE_SIZE,
+    threshold=ADVISOR_CACHE_THRESHOLD,
+    policy=ADVISOR_CACHE_POLICY,
+) if ADVISOR_CACHE_EMBED_MODEL else None
+
+# Advisor chat and transaction analysis share one router over Ollama and Gemini
+llm_router = LLMRouter(
+    [
+        OllamaBackend(OLLAMA_BASE_URL, OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE),
+        GeminiBackend(get_genai, GEMINI_MODEL, GEMINI_API_KEY),
+    ],
+    policy=LLM_ROUTING_POLICY,
+    cost_cap=float(LLM_COST_CAP) if LLM_COST_CAP else None,
+)
+
+@app.route('/api/health')
+def health():
+    """Readiness check: 200 once the advisor model is resident in Ollama, 503 otherwise"""
+    if model_warmer.last_check_at is None or time.time() - model_warmer.last_check_at > 10:
+        model_warmer.check()
+    llm = model_warmer.status()
+    ready = llm['resident']
+    return jsonify({'status': 'ready' if ready else 'degraded', 'llm': llm}), 200 if ready else 503
+
 @app.route('/api/advisor_chat', methods=['POST'])
+@limiter.limit(RATE_LIMIT_ADVISOR)
 def advisor_chat():
+    """Chat with the local Ollama advisor.
+
+    Send `message` plus the `conversation_id` from the previous reply; the
+    history is kept server-side (see advisor_store.py). A legacy `messages`
+    list is still accepted: its last user message is the new turn and earlier
+    ones seed a fresh conversation.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
     data = request.get_json() or {}
-    messages = data.get('messages', [])
     options = data.get('options', {})
-    model = data.get('model', 'llama3.2:3b')
+    model = data.get('model', OLLAMA_MODEL)
+
+    conv = conversation_store.get_or_create(data.get('conversation_id'), session['user_id'])
+    message = (data.get('message') or '').strip()
+    if not message:
+        history = [m for m in data.get('messages', []) if m.get('role') in ('user', 'assistant')]
+        if history and history[-1]['role'] == 'user':
+            message = history.pop()['content'].strip()
+            if not conv.messages:
+                conv.messages = [{'role': m['role'], 'content': m['content']} for m in history]
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
 
     # Ensure a domain-specific system prompt is always included
-    system_prompt = {
-        'role': 'system',
-        'content': 'You are a financial advisor helping university students manage their money wisely. Keep responses concise, practical, and student-friendly.'
+    system_prompt = 'You are a financial advisor helping university students manage their money wisely. Keep responses concise, practical, and student-friendly.'
+
+    llm_options = {
+        # Safely map options with sensible defaults
+        'temperature': options.get('temperature', 0.6),
+        'top_p': options.get('top_p', 0.9),
+        'top_k': options.get('top_k', 40),
+        'num_predict': options.get('num_predict', 160),
+        'repeat_penalty': options.get('repeat_penalty', 1.1),
+        'presence_penalty': options.get('presence_penalty', 0.6),
+        'frequency_penalty': options.get('frequency_penalty', 0.3),
     }
+    # Cached answers are reused only for the same model and options, and never across users
+    # when the question quotes figures
+    cache_scope = (model, tuple(sorted((k, repr(v)) for k, v in llm_options.items())),
+                   session['user_id'] if mentions_figures(message) else None)
+
+    started = time.perf_counter()
+    with conv.lock:
+        # Standalone questions (nothing earlier in the conversation) can be answered from the cache
+        standalone = answer_cache is not None and not conv.messages and not conv.summary
+        if standalone:
+            try:
+                cached, _ = answer_cache.lookup(message, cache_scope)
+            except Exception as e:
+                print(f"Answer cache lookup failed: {e}")
+                cached = None
+            if cached:
+                conversation_store.record_turn(conv, message, cached, (time.perf_counter() - started) * 1000)
+                return jsonify({'bot': cached, 'conversation_id': conv.id, 'cached': True})
+
+        messages = conversation_store.build_messages(conv, system_prompt, message)
+
+        try:
+            result = llm_router.complete(messages, llm_options, task='advisor', conversation_id=conv.id,
+                                         prefer='ollama', models={'ollama': model})
+        except NoBackendAvailable as e:
+            return jsonify({'error': 'LLM backend error', 'detail': str(e)}), 502
+        content = result.text
+        if result.backend == 'ollama':
+            model_warmer.record_reply(result.meta, result.latency_ms)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if standalone:
+            answer_cache.record_miss_latency(elapsed_ms)
+            try:
+                answer_cache.insert(message, content, cache_scope)
+            except Exception as e:
+                print(f"Answer cache insert failed: {e}")
+        conversation_store.record_turn(conv, message, content, elapsed_ms)
+    return jsonify({'bot': content, 'conversation_id': conv.id, 'backend': result.backend})
 
-    # Build chat payload for Ollama
-    ollama_payload = {
-        'model': model,
-        'messages': [system_prompt] + [m for m in messages if m.get('role') in ('user', 'assistant')],
-        'stream': False,
-        'options': {
-            # Safely map options with sensible defaults
-            'temperature': options.get('temperature', 0.6),
-            'top_p': options.get('top_p', 0.9),
-            'top_k': options.get('top_k', 40),
-            'num_predict': options.get('num_predict', 160),
-            'repeat_penalty': options.get('repeat_penalty', 1.1),
-            'presence_penalty': options.get('presence_penalty', 0.6),
-            'frequency_penalty': options.get('frequency_penalty', 0.3),
-        }
+def summarize_uploaded_transactions(transactions):
+    """Summary of a client-supplied transaction list (the original upload path)."""
+    total_spent = sum(t['amount'] for t in transactions if t['amount'] > 0)
+    total_income = abs(sum(t['amount'] for t in transactions if t['amount'] < 0))
+    
+    # Category breakdown
+    categories = {}
+    for txn in transactions:
+        if txn['amount'] > 0:  # Only expenses
+            cat = txn.get('category', 'Uncategorized')
+            categories[cat] = categories.get(cat, 0) + txn['amount']
+    
+    return {
+        'count': len(transactions),
+        'total_spent': total_spent,
+        'total_income': total_income,
+        'top_categories': sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5],
+        'sample': [(t['name'], t['amount'], t['category']) for t in transactions[:10]],
+    }
+
+def transaction_filters(user_id, start_date, end_date, item_ids=None, account_ids=None):
+    filters = [
+        Transaction.user_id == user_id,
+        Transaction.date >= start_date,
+        Transaction.date <= end_date,
+    ]
+    if item_ids:
+        filters.append(Transaction.plaid_item_id.in_(item_ids))
+    if account_ids:
+        filters.append(Transaction.account_id.in_(account_ids))
+    return filters
+
+def summarize_stored_transactions(user_id, start_date, end_date, item_ids=None, account_ids=None):
+    """Same summary as summarize_uploaded_transactions, aggregated in SQL over the local store."""
+    filters = transaction_filters(user_id, start_date, end_date, item_ids, account_ids)
+    
+    count, spent, income = db.session.query(
+        func.count(Transaction.id),
+        func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)),
+        func.sum(case((Transaction.amount < 0, Transaction.amount), else_=0)),
+    ).filter(*filters).one()
+    
+    category_total = func.sum(Transaction.amount)
+    top_categories = db.session.query(Transaction.category, category_total).filter(
+        *filters, Transaction.amount > 0
+    ).group_by(Transaction.category).order_by(category_total.desc()).limit(5).all()
+    
+    sample = db.session.query(Transaction.name, Transaction.amount, Transaction.category).filter(
+        *filters
+    ).order_by(Transaction.date.desc()).limit(10).all()
+    
+    return {
+        'count': count,
+        'total_spent': spent or 0.0,
+        'total_income': abs(income or 0.0),
+        'top_categories': [(cat, amt) for cat, amt in top_categories],
+        'sample': [tuple(row) for row in sample],
     }
 
+# Subscriptions need a longer view than the analysis window: annual charges and a few months of history
+SUBSCRIPTION_LOOKBACK_DAYS = 400
+
+def stored_subscriptions(user_id, end_date, item_ids=None, account_ids=None):
+    """Recurring charges in the local store over the SUBSCRIPTION_LOOKBACK_DAYS before `end_date`."""
+    filters = transaction_filters(user_id, end_date - timedelta(days=SUBSCRIPTION_LOOKBACK_DAYS), end_date,
+                                  item_ids, account_ids)
+    rows = db.session.query(
+        func.coalesce(Transaction.merchant_name, Transaction.name), Transaction.date, Transaction.amount
+    ).filter(*filters, Transaction.amount > 0).all()
+    if not rows:
+        return []
+    merchants, dates, amounts = zip(*rows)
+    return detect_subscriptions(merchants, dates, amounts, today=end_date)
+
+def uploaded_subscriptions(transactions):
+    """Recurring charges in a client-supplied list; rows without a valid YYYY-MM-DD date are skipped."""
+    rows = []
+    for txn in transactions:
+        try:
+            rows.append((txn.get('merchant_name') or txn.get('name'),
+                         datetime.strptime(str(txn['date']), '%Y-%m-%d').date(), float(txn['amount'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not rows:
+        return []
+    merchants, dates, amounts = zip(*rows)
+    return detect_subscriptions(merchants, dates, amounts)
+
+def parse_date_arg(value, default):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+
+def parse_id_list(value, kind):
+    """A JSON list of `kind` (int or str) ids, or None when absent. Raises ValueError."""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(v, kind) and not isinstance(v, bool) for v in value):
+        raise ValueError
+    return value or None
+
+@app.route('/api/subscriptions')
+def subscriptions():
+    """Recurring charges (subscriptions, memberships, bills) detected in the stored transactions.
+
+    Looks back SUBSCRIPTION_LOOKBACK_DAYS from `end_date` (YYYY-MM-DD,
+    default today). Active ones come first, most expensive per month first.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
     try:
-        resp = requests.post('http://localhost:11434/api/chat', json=ollama_payload, timeout=60)
-        if resp.status_code != 200:
-            return jsonify({'error': 'LLM backend error', 'detail': resp.text}), 502
+        end_date = parse_date_arg(request.args.get('end_date'), datetime.now().date())
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    found = stored_subscriptions(session['user_id'], end_date,
+                                 item_ids=request.args.getlist('item_id', type=int) or None)
+    return jsonify({
+        'success': True,
+        'subscriptions': found,
+        'count': len(found),
+        'monthly_total': round(sum(s['monthly_cost'] for s in found if s['active']), 2),
+    })
 
-        payload = resp.json()
-        content = payload.get('message', {}).get('content', '').strip()
-        return jsonify({'bot': content})
-    except Exception as e:
-        return jsonify({'error': 'Failed to contact LLM backend', 'detail': str(e)}), 500
+# Request size and latency of /api/analyze_transactions, per mode ('upload' / 'reference')
+analysis_stats = {}
+_analysis_stats_lock = threading.Lock()
+
+def record_analysis(mode, request_bytes, summary_ms, total_ms):
+    with _analysis_stats_lock:
+        stats = analysis_stats.setdefault(mode, {
+            'requests': 0, 'request_bytes': 0, 'summary_ms': 0.0, 'total_ms': 0.0
+        })
+        stats['requests'] += 1
+        stats['request_bytes'] += request_bytes
+        stats['summary_ms'] += summary_ms
+        stats['total_ms'] += total_ms
+
+def analysis_stats_snapshot():
+    with _analysis_stats_lock:
+        return {mode: {
+            'requests': s['requests'],
+            'avg_request_bytes': s['request_bytes'] / s['requests'],
+            'avg_summary_ms': s['summary_ms'] / s['requests'],
+            'avg_total_ms': s['total_ms'] / s['requests'],
+        } for mode, s in analysis_stats.items()}
 
 @app.route('/api/analyze_transactions', methods=['POST'])
+@limiter.limit(RATE_LIMIT_ANALYZE)
 def analyze_transactions():
-    """Use Gemini AI to analyze transactions and provide insights"""
+    """Use Gemini AI to analyze transactions and provide insights.
+
+    By default the summary is built from the transactions already stored
+    server-side, filtered by optional `start_date`/`end_date` (YYYY-MM-DD,
+    default: last 30 days), `item_ids` (connected account ids) and
+    `account_ids` (Plaid account ids). Sending a `transactions` list instead
+    analyzes exactly that list, as before.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    if not GEMINI_API_KEY:
-        return jsonify({'error': 'Gemini API not configured. Please add GEMINI_API_KEY to your .env file'}), 500
-    
+    started = time.perf_counter()
     try:
-        data = request.get_json()
-        transactions = data.get('transactions', [])
-        
-        if not transactions:
-            return jsonify({'error': 'No transactions provided'}), 400
+        data = request.get_json() or {}
         
-        # Prepare transaction summary for Gemini
-        total_spent = sum(t['amount'] for t in transactions if t['amount'] > 0)
-        total_income = abs(sum(t['amount'] for t in transactions if t['amount'] < 0))
-        
-        # Category breakdown
-        categories = {}
-        for txn in transactions:
-            if txn['amount'] > 0:  # Only expenses
-                cat = txn.get('category', 'Uncategorized')
-                categories[cat] = categories.get(cat, 0) + txn['amount']
+        if 'transactions' in data:
+            mode = 'upload'
+            if not data['transactions']:
+                return jsonify({'error': 'No transactions provided'}), 400
+            summary = summarize_uploaded_transactions(data['transactions'])
+            recurring = uploaded_subscriptions(data['transactions'])
+        else:
+            mode = 'reference'
+            try:
+                end_date = parse_date_arg(data.get('end_date'), datetime.now().date())
+                start_date = parse_date_arg(data.get('start_date'), end_date - timedelta(days=30))
+            except ValueError:
+                return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+            try:
+                item_ids = parse_id_list(data.get('item_ids'), int)
+                account_ids = parse_id_list(data.get('account_ids'), str)
+            except ValueError:
+                return jsonify({'error': 'item_ids must be a list of integers and account_ids a list of strings'}), 400
+            summary = summarize_stored_transactions(
+                session['user_id'], start_date, end_date, item_ids=item_ids, account_ids=account_ids
+            )
+            if not summary['count']:
+                return jsonify({'error': 'No stored transactions match this filter'}), 404
+            recurring = stored_subscriptions(
+                session['user_id'], end_date, item_ids=item_ids, account_ids=account_ids
+            )
+        summary_ms = (time.perf_counter() - started) * 1000
         
-        # Sort categories by spending
-        top_categories = sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5]
+        total_spent = summary['total_spent']
+        total_income = summary['total_income']
+        top_categories = summary['top_categories']
+        active_recurring = [r for r in recurring if r['active']]
+        recurring_lines = [
+            f"- {r['merchant']}: ${r['amount']:.2f} {r['period']} (about ${r['annual_cost']:.2f}/year, last charged {r['last_date']})"
+            for r in active_recurring[:10]
+        ] or ['- None detected']
         
         # Build prompt for Gemini
         prompt = f"""As a professional financial advisor, analyze these transaction patterns and provide actionable insights:
@@ -610,39 +1175,48 @@ FINANCIAL SUMMARY:
 - Total Spending: ${total_spent:.2f}
 - Total Income: ${total_income:.2f}
 - Net: ${total_income - total_spent:.2f}
-- Number of Transactions: {len(transactions)}
+- Number of Transactions: {summary['count']}
 
 TOP SPENDING CATEGORIES:
 {chr(10).join([f"- {cat}: ${amt:.2f} ({(amt/total_spent*100):.1f}%)" for cat, amt in top_categories])}
 
+RECURRING CHARGES (detected subscriptions, ${sum(r['monthly_cost'] for r in active_recurring):.2f}/month in total):
+{chr(10).join(recurring_lines)}
+
 RECENT TRANSACTIONS (sample):
-{chr(10).join([f"- {t['name']}: ${t['amount']:.2f} ({t['category']})" for t in transactions[:10]])}
+{chr(10).join([f"- {name}: ${amount:.2f} ({category})" for name, amount, category in summary['sample']])}
 
 Please provide:
 1. **Key Insights** (2-3 bullet points about spending patterns)
-2. **Saving Opportunities** (specific areas to reduce spending)
+2. **Saving Opportunities** (specific areas to reduce spending, including any subscriptions worth cancelling or downgrading)
 3. **Budgeting Recommendations** (practical tips for this spending profile)
 4. **Action Items** (3 concrete steps to improve financial health)
 
 Format your response professionally but concisely. Use clear sections with headers. Keep it under 300 words."""
 
-        # Call Gemini API (using gemini-1.5-flash for free tier)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt)
+        # Gemini by default; the router fails over to (or prefers) Ollama depending on policy and health
+        result = llm_router.complete([{'role': 'user', 'content': prompt}], {'num_predict': 600},
+                                     task='analysis', prefer='gemini')
+        
+        record_analysis(mode, request.content_length or 0, summary_ms, (time.perf_counter() - started) * 1000)
         
         return jsonify({
             'success': True,
-            'analysis': response.text,
+            'mode': mode,
+            'backend': result.backend,
+            'analysis': result.text,
             'summary': {
                 'total_spent': total_spent,
                 'total_income': total_income,
                 'net': total_income - total_spent,
-                'top_categories': [{'name': cat, 'amount': amt} for cat, amt in top_categories]
+                'count': summary['count'],
+                'top_categories': [{'name': cat, 'amount': amt} for cat, amt in top_categories],
+                'subscriptions': active_recurring,
             }
         })
     
     except Exception as e:
-        print(f"Gemini API Error: {e}")
+        print(f"AI Analysis Error: {e}")
         return jsonify({'error': f'AI analysis failed: {str(e)}'}), 500
 
 if __name__ == '__main__':
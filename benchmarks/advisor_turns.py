@@ -0,0 +1,117 @@
+"""Advisor chat latency per turn, with and without the token budget.
+
+Drives /api/advisor_chat for 30 turns of one conversation and prints the
+latency at turns 1, 10 and 30. It runs once with an unlimited budget (every
+turn resends the whole history, like the old client) and once with the
+configured budget.
+
+By default the LLM is a local fake Ollama server. It charges for uncached
+prompt tokens (anything after the prefix shared with the previous prompt)
+plus a small cost per token of total context, roughly how llama.cpp behaves
+with a warm KV cache. Pass --ollama http://localhost:11434 to use a real
+server instead.
+
+Usage:
+    python benchmarks/advisor_turns.py [--turns 30] [--budget 1024] [--ollama URL]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "How should I split my student loan across the term so I don't run out before the next payment?",
+    "Is it worth getting a student credit card to build credit, or is that risky?",
+    "What's a realistic weekly food budget if I cook most meals myself?",
+    "Should I put my summer job savings in an ISA or keep it in my current account?",
+    "How do I stop impulse spending on takeaways late at night?",
+]
+REPLY = ("Start by listing fixed costs like rent and bills, then divide what is left by the weeks in the term. "
+         "Keep a small buffer for surprises and review it every Sunday. ") * 4
+
+PREFILL_MS_PER_TOKEN = 0.6
+CONTEXT_MS_PER_TOKEN = 0.05
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    last_prompt = ''
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = ''.join(m['content'] for m in body['messages'])
+        shared = os.path.commonprefix([prompt, FakeOllama.last_prompt])
+        FakeOllama.last_prompt = prompt
+        new_tokens = (len(prompt) - len(shared)) / 4
+        time.sleep((5 + new_tokens * PREFILL_MS_PER_TOKEN + len(prompt) / 4 * CONTEXT_MS_PER_TOKEN) / 1000)
+        data = json.dumps({'message': {'role': 'assistant', 'content': REPLY}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(whack, client, turns):
+    timings = []
+    conversation_id = None
+    for turn in range(turns):
+        started = time.perf_counter()
+        resp = client.post('/api/advisor_chat', json={
+            'conversation_id': conversation_id,
+            'message': QUESTIONS[turn % len(QUESTIONS)],
+        })
+        timings.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        conversation_id = resp.get_json()['conversation_id']
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--budget', type=int, default=1024)
+    parser.add_argument('--ollama', help='real Ollama base URL (default: built-in fake)')
+    args = parser.parse_args()
+
+    server = None
+    if args.ollama:
+        os.environ['OLLAMA_BASE_URL'] = args.ollama
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOllama)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ['OLLAMA_BASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    os.environ['OLLAMA_WARMUP_INTERVAL'] = '0'
+    os.environ['GEMINI_API_KEY'] = ''  # route every turn to the (fake) Ollama server
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ['RATE_LIMIT_ADVISOR'] = ''  # 60 turns back to back would trip the per-user limit
+    os.environ['ADVISOR_CACHE_EMBED_MODEL'] = ''  # every run asks the same questions; no answer cache
+    import app as whack
+
+    client = whack.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    milestones = [t for t in (1, 10, 30) if t <= args.turns]
+    print(f"{'mode':<22}" + ''.join(f"{f'turn {t} ms':>12}" for t in milestones))
+    for label, budget in (('full history', 10 ** 9), (f'budget {args.budget} tok', args.budget)):
+        whack.conversation_store.token_budget = budget
+        FakeOllama.last_prompt = ''
+        timings = run(whack, client, args.turns)
+        print(f"{label:<22}" + ''.join(f"{timings[t - 1]:>12.1f}" for t in milestones))
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compare the two /api/analyze_transactions modes.
+
+"upload" posts the full transaction list back to the server (what the bank
+page used to do); "reference" posts only a date range and lets the server
+aggregate its stored transactions. Reports request payload size and
+end-to-end latency for each. The LLM is replaced by an instant fake backend
+so the numbers show only transfer and server-side work.
+
+Usage:
+    python benchmarks/analyze_modes.py [--transactions 5000] [--runs 20]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CATEGORIES = ['Food and Drink', 'Travel', 'Shops', 'Recreation', 'Transfer', 'Payment', 'Service']
+MERCHANTS = ['Starbucks', 'Uber', 'Tesco', 'Amazon', 'Spotify', 'Netflix', 'Greggs', 'Trainline']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['OLLAMA_WARMUP_INTERVAL'] = '0'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ['RATE_LIMIT_ANALYZE'] = ''
+    import app as whack
+    from llm_router import FakeBackend, LLMRouter
+
+    whack.llm_router = LLMRouter([FakeBackend('gemini')])
+
+    rng = random.Random(42)
+    today = date.today()
+    with whack.app.app_context():
+        whack.db.create_all()
+        user = whack.User(email='bench@example.com', username='bench')
+        user.set_password('bench')
+        whack.db.session.add(user)
+        whack.db.session.commit()
+        item = whack.PlaidItem(user_id=user.id, access_token='access-bench', item_id='item-bench',
+                               institution_name='Bench Bank')
+        whack.db.session.add(item)
+        whack.db.session.commit()
+        rows = []
+        for i in range(args.transactions):
+            merchant = rng.choice(MERCHANTS)
+            rows.append(whack.Transaction(
+                transaction_id=f'txn-{i}', plaid_item_id=item.id, user_id=user.id, account_id='acc-1',
+                date=today - timedelta(days=rng.randint(0, 29)), name=merchant, merchant_name=merchant,
+                amount=round(rng.uniform(-200, 120), 2), category=rng.choice(CATEGORIES),
+            ))
+        whack.db.session.add_all(rows)
+        # Mark the item fresh so /api/transactions doesn't try to reach Plaid
+        whack.db.session.add(whack.TransactionSync(plaid_item_id=item.id, refreshed_at=datetime.utcnow()))
+        whack.db.session.commit()
+        user_id = user.id
+
+    client = whack.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+    listing = client.get('/api/transactions').get_json()['transactions']
+    bodies = {
+        'upload': json.dumps({'transactions': listing}).encode(),
+        'reference': json.dumps({}).encode(),
+    }
+
+    print(f"{args.transactions} stored transactions, {args.runs} runs per mode")
+    print(f"{'mode':<10} {'request bytes':>14} {'median ms':>10} {'p95 ms':>8}")
+    for mode, body in bodies.items():
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            resp = client.post('/api/analyze_transactions', data=body, content_type='application/json')
+            timings.append((time.perf_counter() - started) * 1000)
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{mode:<10} {len(body):>14,} {statistics.median(timings):>10.2f} {p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
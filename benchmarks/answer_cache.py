@@ -0,0 +1,102 @@
+"""Hit rate and lookup cost of the advisor's semantic answer cache.
+
+Replays a skewed stream of student questions. A few topics are asked
+constantly, with varied casing, punctuation and small rewordings. The
+stream runs through SemanticCache with the deterministic HashingEmbedder,
+once per eviction policy. Reports hit rate, lookup latency and the LLM time
+saved (hits x --llm-ms), then lookup latency on a full large cache.
+
+Usage:
+    python benchmarks/answer_cache.py [--questions 5000] [--capacity 64] [--llm-ms 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import HashingEmbedder, SemanticCache  # noqa: E402
+
+TOPICS = [
+    "how do I budget my student loan",
+    "should I get a credit card",
+    "how much should I spend on food each week",
+    "is it worth opening an ISA",
+    "how do I build my credit score",
+    "what is an overdraft and should I use it",
+    "how can I save money on rent",
+    "should I pay off my overdraft or save",
+    "how do I stop impulse spending",
+    "what's the best way to split bills with housemates",
+]
+SUBJECTS = ['rent', 'food', 'travel', 'books', 'gym', 'phone', 'gifts', 'holidays', 'laptop', 'bills']
+TEMPLATES = [
+    "how do I plan for {} costs next term",
+    "what is a sensible monthly amount for {}",
+    "any tips to cut back on {} spending",
+]
+
+
+def variant(text, rng):
+    """A reworded form of `text`: case, punctuation and filler changes."""
+    if rng.random() < 0.3:
+        text = text.capitalize()
+    if rng.random() < 0.3:
+        text = 'hi, ' + text
+    if rng.random() < 0.2:
+        text = text.replace(' my ', ' my own ', 1)
+    return text + rng.choice(['?', '??', '', ' please?'])
+
+
+def question_stream(n, rng):
+    # 70% from a few popular topics (Zipf-ish), 30% long tail
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    for _ in range(n):
+        if rng.random() < 0.7:
+            yield variant(rng.choices(TOPICS, weights)[0], rng)
+        else:
+            yield rng.choice(TEMPLATES).format(rng.choice(SUBJECTS)) + f' {rng.randint(0, 500)}'
+
+
+def replay(policy, args):
+    rng = random.Random(7)
+    cache = SemanticCache(HashingEmbedder(), capacity=args.capacity, threshold=args.threshold, policy=policy)
+    for question in question_stream(args.questions, rng):
+        answer, _ = cache.lookup(question)
+        if answer is None:
+            cache.record_miss_latency(args.llm_ms)
+            cache.insert(question, f'answer to: {question}')
+    return cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--capacity', type=int, default=64)
+    parser.add_argument('--threshold', type=float, default=0.9)
+    parser.add_argument('--llm-ms', type=float, default=2000.0)
+    args = parser.parse_args()
+
+    print(f"{args.questions} questions, capacity {args.capacity}, threshold {args.threshold}")
+    print(f"{'policy':<6} {'hit rate':>9} {'lookup us':>10} {'LLM time saved':>15}")
+    for policy in ('lru', 'lfu'):
+        stats = replay(policy, args)
+        saved_s = (stats['latency_saved_ms'] or 0) / 1000
+        print(f"{policy:<6} {stats['hit_rate']:>9.1%} {stats['avg_lookup_ms'] * 1000:>10.1f} {saved_s:>14.0f}s")
+
+    for size in (512, 5000):
+        cache = SemanticCache(HashingEmbedder(), capacity=size)
+        rng = random.Random(1)
+        for i in range(size):
+            cache.insert(f'question {i} about {rng.choice(SUBJECTS)} {rng.random()}', 'a')
+        started = time.perf_counter()
+        for _ in range(200):
+            cache.lookup('how do I budget my student loan')
+        per_lookup = (time.perf_counter() - started) / 200 * 1e6
+        print(f"full cache of {size:>5} entries: {per_lookup:.1f} us per lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Throughput and memory of the `flask data export|import` commands.
+
+Fills a scratch SQLite database with synthetic users and activity rows
+(2 million by default), then exports `activity` as CSV and NDJSON and
+imports each file into a fresh database. Prints rows/s for every step and
+the process's peak RSS after it. Because the work is streamed in chunks,
+peak RSS should stay flat however many rows there are.
+
+Usage:
+    python benchmarks/bulk_io.py [--users 100000] [--activities 2000000] [--chunk-size 10000]
+"""
+import argparse
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fill(path, users, activities, chunk=50_000):
+    rng = random.Random(3)
+    start = datetime(2025, 1, 1)
+    types = ['game', 'learning', 'quiz']
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO user (id, email, username, password_hash, xp, level, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'student{i}@uni.ac.uk', f'student{i}', 'scrypt:32768:8:1$x$' + 'ab' * 32,
+          rng.randint(0, 5000), rng.randint(1, 20), str(start + timedelta(minutes=i))) for i in range(1, users + 1)))
+    for base in range(0, activities, chunk):
+        conn.executemany(
+            'INSERT INTO activity_log (id, user_id, activity_type, xp_gained, timestamp, details) VALUES (?, ?, ?, ?, ?, ?)',
+            ((i, rng.randint(1, users), rng.choice(types), rng.choice((5, 10, 25, 50)),
+              str(start + timedelta(seconds=i * 7)), rng.choice((None, 'crossword', 'Completed quiz: Budgeting 101')))
+             for i in range(base + 1, min(base + chunk, activities) + 1)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--activities', type=int, default=2_000_000)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    source = os.path.join(tmp, 'source.db')
+    os.environ['OLLAMA_WARMUP_INTERVAL'] = '0'
+    os.environ['DATABASE_URL'] = f'sqlite:///{source}'
+    import app as whack
+    from bulk_io import export_table, import_table, open_stream
+    from sqlalchemy import create_engine
+
+    with whack.app.app_context():
+        whack.db.create_all()
+    started = time.perf_counter()
+    fill(source, args.users, args.activities)
+    print(f"generated {args.users:,} users + {args.activities:,} activities in {time.perf_counter() - started:.1f}s")
+
+    table = whack.ActivityLog.__table__
+    engine = create_engine(f'sqlite:///{source}')
+    print(f"{'step':<22} {'rows/s':>12} {'file MB':>9} {'peak RSS MB':>12}")
+    for fmt in ('csv', 'ndjson'):
+        path = os.path.join(tmp, f'activity.{fmt}')
+        started = time.perf_counter()
+        with engine.connect() as conn, open_stream(path, 'w') as out:
+            count = export_table(conn, table, out, fmt, args.chunk_size)
+        rate = count / (time.perf_counter() - started)
+        print(f"{'export ' + fmt:<22} {rate:>12,.0f} {os.path.getsize(path) / 1e6:>9.1f} {peak_rss_mb():>12.0f}")
+
+        target = create_engine(f"sqlite:///{os.path.join(tmp, f'target-{fmt}.db')}")
+        whack.db.metadata.create_all(target, tables=[whack.User.__table__, table])
+        started = time.perf_counter()
+        with target.begin() as conn, open_stream(path, 'r') as src:
+            imported = import_table(conn, table, src, fmt, args.chunk_size)
+        rate = imported / (time.perf_counter() - started)
+        assert imported == count
+        print(f"{'import ' + fmt:<22} {rate:>12,.0f} {'':>9} {peak_rss_mb():>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
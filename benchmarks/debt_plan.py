@@ -0,0 +1,88 @@
+"""Latency of the debt payoff planner.
+
+Plans random portfolios (10 and 50 debts) with a budget 10% above the
+minimums, comparing avalanche, snowball and a custom order for each.
+Reports cold time (simulation plus response building), memoized time, and
+the endpoint through the Flask test client. Then it times a worst case that
+runs the full 30 years (360 months). The target is under 20 ms for 50 debts.
+
+Usage:
+    python benchmarks/debt_plan.py [--runs 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from debt_planner import parse_debts, plan_repayment, simulate  # noqa: E402
+
+
+def portfolio(n, rng):
+    debts = []
+    for i in range(n):
+        balance = round(rng.uniform(200, 40_000), 2)
+        debts.append({'name': f'debt {i}', 'balance': balance, 'apr': round(rng.uniform(0, 40), 2),
+                      'min_payment': round(max(25, balance * 0.03), 2)})
+    return {
+        'debts': debts,
+        'monthly_budget': round(sum(d['min_payment'] for d in debts) * 1.1, 2),
+        'custom_order': list(range(n))[::-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'debts':>6} {'cold ms':>9} {'cached ms':>10} {'endpoint ms':>12} {'months':>7} {'avalanche saves':>16}")
+    rng = random.Random(5)
+    os.environ['OLLAMA_WARMUP_INTERVAL'] = '0'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    import app as whack
+    client = whack.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    for n in (10, 50):
+        cold, cached, endpoint = [], [], []
+        for _ in range(args.runs):
+            data = portfolio(n, rng)
+            debts, budget, custom = parse_debts(data)
+            simulate.cache_clear()
+            started = time.perf_counter()
+            result = plan_repayment(debts, budget, custom)
+            cold.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            plan_repayment(debts, budget, custom)
+            cached.append((time.perf_counter() - started) * 1000)
+            simulate.cache_clear()
+            started = time.perf_counter()
+            assert client.post('/api/debt_plan', json=data).status_code == 200
+            endpoint.append((time.perf_counter() - started) * 1000)
+        avalanche, snowball = result['strategies']['avalanche'], result['strategies']['snowball']
+        saved = snowball['total_interest'] - avalanche['total_interest']
+        print(f"{n:>6} {statistics.median(cold):>9.2f} {statistics.median(cached):>10.2f} "
+              f"{statistics.median(endpoint):>12.2f} {avalanche['months']:>7} {saved:>16,.2f}")
+
+    # Worst case: minimums below the interest, so nothing is ever cleared and all 30 years are simulated
+    data = portfolio(50, rng)
+    for debt in data['debts']:
+        debt['min_payment'] = round(debt['balance'] * 0.005, 2)
+    debts, budget, custom = parse_debts({**data, 'monthly_budget': None})
+    timings = []
+    for _ in range(args.runs):
+        simulate.cache_clear()
+        started = time.perf_counter()
+        simulate(debts, budget, custom, max_months=360)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"50 debts, full 360 months, 3 strategies: {statistics.median(timings):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Cold-start benchmark for app.py.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and reports
+the total import time plus the slowest top-level packages, then times the
+first request a new worker serves (the login page).
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+client.get('/login')
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.3f} {(t2 - t1) * 1000:.3f}")
+"""
+
+
+def run_importtime():
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time:   self |  cumulative |   package.module";
+    # deeper imports are indented further, so keep the shallowest level under `app`.
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        name = fields[2].rstrip()
+        depth = len(name) - len(name.lstrip())
+        modules[name.strip()] = (depth, int(fields[1]))
+    return modules
+
+
+def run_first_request():
+    proc = subprocess.run(
+        [sys.executable, '-c', FIRST_REQUEST_SNIPPET],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    import_ms, request_ms = proc.stdout.strip().splitlines()[-1].split()
+    return float(import_ms), float(request_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        modules = run_importtime()
+        totals.append(modules.get('app', (0, 0))[1] / 1000)
+    # Direct children of `app` sit one indent level below it
+    app_depth = modules.get('app', (1, 0))[0]
+    direct = {name: us for name, (depth, us) in modules.items() if depth == app_depth + 2}
+
+    print(f"import app (-X importtime, {args.runs} runs)")
+    print(f"  median {statistics.median(totals):.1f} ms   min {min(totals):.1f} ms")
+    print("  slowest imports made by app.py (last run):")
+    for name, us in sorted(direct.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"    {us / 1000:8.1f} ms  {name}")
+
+    heavy = [name for name in modules if name.split('.')[0] in ('plaid', 'google', 'numpy')]
+    print(f"  plaid/google/numpy imported at boot: {'yes' if heavy else 'no'}")
+
+    boots = [run_first_request() for _ in range(args.runs)]
+    print("worker boot + first request (/login)")
+    print(f"  import   median {statistics.median(b[0] for b in boots):.1f} ms")
+    print(f"  request  median {statistics.median(b[1] for b in boots):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Serialization time and bytes on the wire for a 10k-transaction response.
+
+Compares the stdlib and orjson providers from json_provider.py on a payload
+shaped like /api/transactions, then shows the gzip size the compression hook
+would send.
+
+Usage:
+    python benchmarks/json_wire.py [--transactions 10000] [--runs 20]
+"""
+import argparse
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from json_provider import OrjsonProvider, StdlibJSONProvider, orjson  # noqa: E402
+
+CATEGORIES = ['Food and Drink', 'Travel', 'Shops', 'Recreation', 'Transfer', 'Payment', 'Service']
+MERCHANTS = ['Starbucks', 'Uber', 'Tesco', 'Amazon', 'Spotify', 'Netflix', 'Greggs', 'Trainline']
+
+
+def make_payload(n, rng):
+    today = date.today()
+    transactions = []
+    for i in range(n):
+        merchant = rng.choice(MERCHANTS)
+        transactions.append({
+            'id': f'txn-{i:08d}',
+            'date': today - timedelta(days=rng.randint(0, 89)),
+            'name': f'{merchant} #{rng.randint(100, 999)}',
+            'amount': Decimal(f'{rng.uniform(-200, 120):.2f}'),
+            'category': rng.choice(CATEGORIES),
+            'merchant_name': merchant,
+            'institution': 'Bench Bank',
+        })
+    return {'success': True, 'transactions': transactions, 'count': n}
+
+
+def time_provider(provider, app, payload, runs):
+    timings = []
+    body = b''
+    with app.app_context():
+        for _ in range(runs):
+            started = time.perf_counter()
+            body = provider.response(payload).get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = make_payload(args.transactions, random.Random(42))
+    providers = [('stdlib', StdlibJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        print("orjson not installed; only the stdlib provider is measured")
+
+    print(f"{args.transactions} transactions, median of {args.runs} runs")
+    print(f"{'provider':<8} {'serialize ms':>13} {'raw bytes':>11} {'gzip bytes':>11} {'gzip ms':>8}")
+    for name, provider in providers:
+        median_ms, body = time_provider(provider, app, payload, args.runs)
+        started = time.perf_counter()
+        compressed = gzip.compress(body, compresslevel=6)
+        gzip_ms = (time.perf_counter() - started) * 1000
+        print(f"{name:<8} {median_ms:>13.2f} {len(body):>11,} {len(compressed):>11,} {gzip_ms:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""LLMRouter behaviour against local fake backends with injected latency.
+
+Scenarios:
+  saturation  - "ollama" slows down as concurrent requests pile up and
+                "gemini" has a flat latency; `fastest` should spread load
+  outage      - "gemini" fails every call; requests fail over to "ollama"
+                and gemini is benched for the cooldown
+  cost        - `cost` policy with a cap keeps traffic on the cheap backend
+  sticky      - conversations stay on the backend that answered them first
+
+Usage:
+    python benchmarks/llm_router.py [--requests 200] [--concurrency 8]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_router import FakeBackend, LLMRouter  # noqa: E402
+
+MESSAGES = [{'role': 'user', 'content': 'How do I budget my loan?'}]
+
+
+class Saturating:
+    """Latency that grows with the number of requests in flight (a single local GPU)."""
+
+    def __init__(self, base, per_inflight):
+        self.base = base
+        self.per_inflight = per_inflight
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.inflight += 1
+            latency = self.base + self.per_inflight * (self.inflight - 1)
+        time.sleep(latency)
+        with self._lock:
+            self.inflight -= 1
+        return 0.0
+
+
+def drive(router, n, concurrency, **kwargs):
+    timings = []
+
+    def one(i):
+        started = time.perf_counter()
+        conversation_id = f'c{i % 10}' if kwargs.get('sticky') else None
+        router.complete(MESSAGES, task='advisor', conversation_id=conversation_id, prefer='ollama')
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(n)))
+    return timings
+
+
+def report(name, router, timings):
+    stats = router.stats()
+    routed = ', '.join(f"{b}={s['routed']}" for b, s in stats['backends'].items())
+    p99 = sorted(timings)[int(len(timings) * 0.99) - 1]
+    print(f"{name:<11} p50 {statistics.median(timings):7.1f} ms  p99 {p99:7.1f} ms  "
+          f"routed: {routed}  failovers: {stats['failovers']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    # Baseline: everything pinned to the local backend, as before the router
+    pinned = LLMRouter([FakeBackend('ollama', latency=Saturating(0.02, 0.01))])
+    report('pinned', pinned, drive(pinned, args.requests, args.concurrency))
+
+    router = LLMRouter([
+        FakeBackend('ollama', latency=Saturating(0.02, 0.01)),
+        FakeBackend('gemini', latency=0.04, cost_per_call=0.001),
+    ])
+    report('saturation', router, drive(router, args.requests, args.concurrency))
+
+    router = LLMRouter([
+        FakeBackend('ollama', latency=0.03),
+        FakeBackend('gemini', latency=0.01, error_rate=1.0),
+    ], cooldown=60)
+    report('outage', router, drive(router, args.requests, args.concurrency))
+
+    router = LLMRouter([
+        FakeBackend('ollama', latency=0.03),
+        FakeBackend('gemini', latency=0.01, cost_per_call=0.001),
+    ], policy='cost', cost_cap=0.0)
+    report('cost', router, drive(router, args.requests, args.concurrency))
+
+    router = LLMRouter([
+        FakeBackend('ollama', latency=0.02),
+        FakeBackend('gemini', latency=0.02),
+    ], policy='sticky')
+    report('sticky', router, drive(router, args.requests, args.concurrency, sticky=True))
+    print(f"sticky decisions: {router.stats()['decisions']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Frame time of the pygbag map renderer, headless.
+
+Runs static/pygbag/main.py's Game under SDL's dummy video driver for a fixed
+number of frames. Inputs are scripted: the character walks a fixed route of
+held arrow keys, with pauses, posted as real key events. Each frame lasts
+exactly 1/FPS of game time, so every run takes the same steps. `random` is
+seeded, so the world and particles are the same every run. Only the work per
+frame is timed, not the wait for the next frame.
+
+Reports mean and p99 per render stage (from the game's own FrameProfiler),
+draw calls and Surface allocations per frame. --json saves the results;
+pass an earlier file as --baseline to print the change per stage.
+
+Usage:
+    python benchmarks/map_render.py [--frames 600] [--zones 3x2] [--dirty] [--level 0]
+                                    [--json out.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'pygbag'))
+
+import pygame  # noqa: E402
+import main as game_module  # noqa: E402
+
+# (frames, keys held): across the first zone, into the next ones and back, with pauses for the dirty-rect path
+ROUTE = [
+    (90, ('d',)), (60, ()), (120, ('s', 'd')), (90, ('d',)), (45, ()),
+    (120, ('w', 'a')), (60, ('a',)), (90, ('s',)), (60, ()), (120, ('a', 'w')),
+]
+
+
+def keys_at(frame):
+    frame %= sum(length for length, _ in ROUTE)
+    for length, keys in ROUTE:
+        if frame < length:
+            return {getattr(pygame, f'K_{key}') for key in keys}
+        frame -= length
+
+
+class ScriptedClock:
+    """Stands in for pygame.time.Clock: frames last exactly 1/FPS, and the route is posted as key events"""
+    def __init__(self, game, frames):
+        self.game = game
+        self.frames = frames
+        self.frame = 0
+        self.held = set()
+        self.press()
+
+    def press(self):
+        keys = keys_at(self.frame)
+        for key in self.held - keys:
+            pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key))
+        for key in keys - self.held:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+        self.held = keys
+
+    def tick(self, framerate=0):
+        self.frame += 1
+        if self.frame >= self.frames:
+            self.game.running = False
+        else:
+            self.press()
+        return 1000 / game_module.FPS
+
+
+def summary(values):
+    ordered = sorted(values)
+    return {'mean': round(statistics.mean(ordered), 3), 'p99': round(ordered[int(len(ordered) * 0.99)], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=30, help='frames left out of the stats')
+    parser.add_argument('--zones', default='3x2', help='world size in screens, COLSxROWS')
+    parser.add_argument('--dirty', action='store_true', help='use the dirty-rectangle renderer')
+    parser.add_argument('--level', type=int, default=0, help='fixed index into QUALITY_LEVELS')
+    parser.add_argument('--overlay', action='store_true', help='show the F3 profiler overlay')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='save the results to this file')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    zones = tuple(int(n) for n in args.zones.lower().split('x'))
+    scale, particles = game_module.QUALITY_LEVELS[args.level]
+    game = game_module.Game(dirty_rects=args.dirty, world_zones=zones, adaptive_quality=False)
+    game.scale = scale
+    game.particles.resize(particles)
+    game.profiler = profiler = game_module.FrameProfiler(window=args.frames)
+    profiler.visible = args.overlay
+    game.clock = ScriptedClock(game, args.frames)
+    asyncio.run(game.run())
+
+    def measured(values):
+        return list(values)[args.warmup:]
+
+    frames = [sum(times) for times in zip(*(measured(profiler.times[s]) for s in profiler.STAGES))]
+    draws = [sum(counts) for counts in zip(*(measured(profiler.draws[s]) for s in profiler.STAGES))]
+    results = {
+        'config': {'frames': args.frames, 'warmup': args.warmup, 'zones': list(zones), 'dirty_rects': args.dirty,
+                   'scale': scale, 'particles': particles, 'overlay': args.overlay, 'seed': args.seed,
+                   'screen': [game_module.WIDTH, game_module.HEIGHT]},
+        'frame_ms': summary(frames),
+        'stages': {stage: {**summary(measured(profiler.times[stage])),
+                           'draws': round(statistics.mean(measured(profiler.draws[stage])), 1)}
+                   for stage in profiler.STAGES},
+        'draws_per_frame': round(statistics.mean(draws), 1),
+        'surfaces_per_frame': round(statistics.mean(measured(profiler.allocations)), 3),
+        'ground': game.ground.stats(),
+        'text_cache': game_module.text_cache.stats(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.platform(),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    def change(new, old):
+        return f"{(new - old) / old:>+8.1%}" if old else f"{'':>8}"
+
+    print(f"{args.frames - args.warmup} frames, {args.zones} zones, scale {scale}, {particles} particles, "
+          f"{'dirty rects' if args.dirty else 'full frames'}")
+    print(f"{'stage':<10} {'mean ms':>8} {'p99 ms':>8} {'draws':>7}" + (f" {'vs base':>8}" if baseline else ''))
+    for stage, timing in results['stages'].items():
+        line = f"{stage:<10} {timing['mean']:>8.3f} {timing['p99']:>8.3f} {timing['draws']:>7.1f}"
+        if baseline and stage in baseline['stages']:
+            line += ' ' + change(timing['mean'], baseline['stages'][stage]['mean'])
+        print(line)
+    line = f"{'frame':<10} {results['frame_ms']['mean']:>8.3f} {results['frame_ms']['p99']:>8.3f} {results['draws_per_frame']:>7.1f}"
+    if baseline:
+        line += ' ' + change(results['frame_ms']['mean'], baseline['frame_ms']['mean'])
+    print(line)
+    print(f"surfaces allocated per frame: {results['surfaces_per_frame']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"saved {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Exercise ResilientPlaidClient against a local fault-injecting Plaid stub.
+
+No network or Plaid credentials needed: `FaultyPlaidApi` stands in for the
+generated `PlaidApi` and fails in scripted ways (rate limits,
+PRODUCT_NOT_READY, bad input, slow responses, outages). Each scenario checks
+retry, deadline and circuit-breaker behaviour and prints its wall time.
+
+Usage:
+    python benchmarks/plaid_faults.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plaid_resilience import CircuitBreaker, PlaidUnavailable, ResilientPlaidClient, RetryBudget  # noqa: E402
+
+
+class StubApiException(Exception):
+    """Shaped like plaid.ApiException: HTTP status plus a JSON body."""
+
+    def __init__(self, status, error_type, error_code):
+        super().__init__(f'({status}) {error_code}')
+        self.status = status
+        self.body = json.dumps({'error_type': error_type, 'error_code': error_code})
+
+
+RATE_LIMIT = lambda: StubApiException(429, 'RATE_LIMIT_EXCEEDED', 'RATE_LIMIT_EXCEEDED')  # noqa: E731
+NOT_READY = lambda: StubApiException(400, 'ITEM_ERROR', 'PRODUCT_NOT_READY')  # noqa: E731
+BAD_INPUT = lambda: StubApiException(400, 'INVALID_INPUT', 'INVALID_FIELD')  # noqa: E731
+OUTAGE = lambda: StubApiException(503, 'API_ERROR', 'INTERNAL_SERVER_ERROR')  # noqa: E731
+
+
+class FaultyPlaidApi:
+    """Plays back a script of faults, then succeeds. `latency` simulates a slow endpoint."""
+
+    def __init__(self, faults=(), latency=0.0, always=None):
+        self.faults = list(faults)
+        self.latency = latency
+        self.always = always
+        self.calls = 0
+
+    def _respond(self, payload, _request_timeout=None):
+        self.calls += 1
+        if self.latency:
+            if _request_timeout is not None and self.latency > _request_timeout:
+                time.sleep(_request_timeout)
+                raise TimeoutError('read timed out')
+            time.sleep(self.latency)
+        if self.always:
+            raise self.always()
+        if self.faults:
+            raise self.faults.pop(0)()
+        return payload
+
+    def link_token_create(self, request, _request_timeout=None):
+        return self._respond({'link_token': 'link-sandbox-stub', 'expiration': None}, _request_timeout)
+
+    def item_public_token_exchange(self, request, _request_timeout=None):
+        return self._respond({'access_token': 'access-stub', 'item_id': 'item-stub'}, _request_timeout)
+
+    def transactions_get(self, request, _request_timeout=None):
+        return self._respond({'transactions': []}, _request_timeout)
+
+
+def make_client(stub, **kwargs):
+    options = dict(deadline=2.0, attempt_timeout=0.5, base_delay=0.01, max_delay=0.05,
+                   failure_threshold=3, reset_timeout=0.3, budget=RetryBudget(min_tokens=10))
+    options.update(kwargs)
+    return ResilientPlaidClient(lambda: stub, **options)
+
+
+def scenario_rate_limit_then_success():
+    stub = FaultyPlaidApi([RATE_LIMIT, RATE_LIMIT])
+    result = make_client(stub).transactions_get({}, item_id='a')
+    assert result == {'transactions': []} and stub.calls == 3
+
+
+def scenario_product_not_ready_is_retried():
+    stub = FaultyPlaidApi([NOT_READY])
+    make_client(stub).transactions_get({}, item_id='a')
+    assert stub.calls == 2
+
+
+def scenario_bad_input_is_not_retried():
+    stub = FaultyPlaidApi([BAD_INPUT])
+    client = make_client(stub)
+    try:
+        client.link_token_create({})
+    except StubApiException:
+        pass
+    else:
+        raise AssertionError('bad input should propagate')
+    assert stub.calls == 1 and client.breaker('link').state == CircuitBreaker.CLOSED
+
+
+def scenario_slow_endpoint_respects_deadline():
+    stub = FaultyPlaidApi(latency=5.0)
+    client = make_client(stub, deadline=1.0, attempt_timeout=0.3)
+    started = time.monotonic()
+    try:
+        client.transactions_get({}, item_id='slow')
+    except PlaidUnavailable:
+        pass
+    else:
+        raise AssertionError('slow endpoint should time out')
+    assert time.monotonic() - started < 1.2
+
+
+def scenario_breaker_opens_and_fails_fast():
+    stub = FaultyPlaidApi(always=OUTAGE)
+    client = make_client(stub, max_attempts=2)
+    for _ in range(3):
+        try:
+            client.transactions_get({}, item_id='down')
+        except PlaidUnavailable:
+            pass
+    calls_before = stub.calls
+    started = time.monotonic()
+    try:
+        client.transactions_get({}, item_id='down')
+    except PlaidUnavailable as e:
+        assert e.retry_after is not None
+    assert stub.calls == calls_before, 'open breaker must not reach Plaid'
+    assert time.monotonic() - started < 0.01
+    # Other items keep their own breaker
+    stub.always = None
+    client.transactions_get({}, item_id='healthy')
+
+
+def scenario_breaker_recovers_after_cooldown():
+    stub = FaultyPlaidApi(always=OUTAGE)
+    client = make_client(stub, max_attempts=1)
+    for _ in range(3):
+        try:
+            client.transactions_get({}, item_id='flaky')
+        except PlaidUnavailable:
+            pass
+    assert client.breaker('item:flaky').state == CircuitBreaker.OPEN
+    stub.always = None
+    time.sleep(0.35)
+    client.transactions_get({}, item_id='flaky')
+    assert client.breaker('item:flaky').state == CircuitBreaker.CLOSED
+
+
+def scenario_retry_budget_caps_amplification():
+    stub = FaultyPlaidApi(always=RATE_LIMIT)
+    client = make_client(stub, budget=RetryBudget(ratio=0.2, min_tokens=0), failure_threshold=1000)
+    for i in range(50):
+        try:
+            client.transactions_get({}, item_id=f'i{i}')
+        except PlaidUnavailable:
+            pass
+    # 50 calls may add at most ~20% retries on top
+    assert stub.calls <= 50 * 1.2 + 1, stub.calls
+
+
+SCENARIOS = [
+    scenario_rate_limit_then_success,
+    scenario_product_not_ready_is_retried,
+    scenario_bad_input_is_not_retried,
+    scenario_slow_endpoint_respects_deadline,
+    scenario_breaker_opens_and_fails_fast,
+    scenario_breaker_recovers_after_cooldown,
+    scenario_retry_budget_caps_amplification,
+]
+
+
+def main():
+    failed = 0
+    for scenario in SCENARIOS:
+        started = time.perf_counter()
+        try:
+            scenario()
+            status = 'ok'
+        except AssertionError as e:
+            failed += 1
+            status = f'FAIL {e}'
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{scenario.__name__[len('scenario_'):]:<42} {elapsed:8.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
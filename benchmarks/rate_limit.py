@@ -0,0 +1,87 @@
+"""Overhead of the per-user token-bucket rate limiter.
+
+Times `hit()` on the in-memory and SQLite bucket stores, for one hot key
+and spread over many users. Then drives /api/add_xp through the Flask test
+client with and without the limiter, and floods it from one user to check
+that the other users are not affected.
+
+Usage:
+    python benchmarks/rate_limit.py [--hits 100000] [--users 10000] [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import MemoryBucketStore, SQLiteBucketStore  # noqa: E402
+
+
+def time_store(store, hits, users):
+    keys = [f'add_xp:{i % users}' for i in range(hits)]
+    started = time.perf_counter()
+    for key in keys:
+        store.hit(key, 30, 60.0)
+    return (time.perf_counter() - started) / hits * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    print(f"{'store':<10} {'keys':>7} {'us per hit':>11}")
+    for users in (1, args.users):
+        print(f"{'memory':<10} {users:>7} {time_store(MemoryBucketStore(), args.hits, users):>11.2f}")
+    for users in (1, args.users):
+        store = SQLiteBucketStore(os.path.join(tmp, f'buckets-{users}.db'))
+        print(f"{'sqlite':<10} {users:>7} {time_store(store, args.hits // 10, users):>11.2f}")
+
+    os.environ['OLLAMA_WARMUP_INTERVAL'] = '0'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    # A bucket that never runs dry, so the first pass measures only the overhead
+    os.environ['RATE_LIMIT_ADD_XP'] = '1000000000/second'
+    import app as whack
+
+    with whack.app.app_context():
+        whack.db.create_all()
+        for name in ('flooder', 'student'):
+            user = whack.User(username=name, email=f'{name}@example.com')
+            user.set_password('x')
+            whack.db.session.add(user)
+        whack.db.session.commit()
+
+    view = whack.app.view_functions['add_xp']
+    body = {'xp': 1, 'activity_type': 'bench'}
+    print(f"\n/api/add_xp, {args.requests} requests")
+    for label, func in (('no limiter', view.__wrapped__), ('limiter', view)):
+        whack.app.view_functions['add_xp'] = func
+        client = whack.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            client.post('/api/add_xp', json=body)
+        per_request = (time.perf_counter() - started) / args.requests * 1e6
+        print(f"  {label:<12} {per_request:>9.1f} us per request")
+
+    whack.app.view_functions['add_xp'] = whack.limiter.limit('30/minute')(view.__wrapped__)
+    flooder, student = whack.app.test_client(), whack.app.test_client()
+    with flooder.session_transaction() as sess:
+        sess['user_id'] = 1
+    with student.session_transaction() as sess:
+        sess['user_id'] = 2
+    flood = [flooder.post('/api/add_xp', json=body).status_code for _ in range(500)]
+    other = [student.post('/api/add_xp', json=body) for _ in range(5)]
+    print(f"\nflood of 500 from one user: {flood.count(200)} allowed, {flood.count(429)} limited")
+    print(f"other user meanwhile: {[r.status_code for r in other]}, "
+          f"remaining {other[-1].headers['RateLimit-Remaining']}/{other[-1].headers['RateLimit-Limit']}")
+
+
+if __name__ == '__main__':
+    main()
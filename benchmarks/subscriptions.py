@@ -0,0 +1,80 @@
+"""Speed and accuracy of the recurring-charge detector.
+
+Builds a synthetic two-year transaction history:
+- everyday spending at a few hundred merchants, with random amounts and
+  dates;
+- a few hundred planted subscriptions (weekly, monthly and annual) whose
+  dates drift by a day (weekly) or two (monthly, annual) and whose
+  prices occasionally rise;
+- merchant names carrying reference numbers, like real bank feeds.
+
+Runs detect_subscriptions at several sizes up to 1M rows and reports time,
+rows/s, and precision/recall against the planted subscriptions.
+
+Usage:
+    python benchmarks/subscriptions.py [--rows 1000000] [--subscriptions 300]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subscriptions import detect_subscriptions, normalize_merchant  # noqa: E402
+
+TODAY = date(2025, 10, 1)
+PERIOD_DAYS = {'weekly': 7, 'monthly': 30, 'annual': 365}
+
+
+def synthetic(rows, n_subscriptions, rng):
+    merchants, dates, amounts = [], [], []
+    planted = set()
+    for i in range(n_subscriptions):
+        period = rng.choices(list(PERIOD_DAYS), weights=(2, 6, 1))[0]
+        name = f'SUBSCRIPTION SERVICE {chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676)}'
+        planted.add(normalize_merchant(name).title())
+        price = round(rng.uniform(2, 40) if period != 'annual' else rng.uniform(30, 150), 2)
+        day = TODAY - timedelta(days=rng.randint(0, 5))
+        drift = 1 if period == 'weekly' else 2
+        for _ in range(730 // PERIOD_DAYS[period] + 1):
+            merchants.append(f'{name} REF{rng.randint(10000, 99999)}')
+            dates.append(day + timedelta(days=rng.randint(-drift, drift)))
+            amounts.append(price)
+            day -= timedelta(days=PERIOD_DAYS[period])
+            if rng.random() < 0.03:
+                price = round(price * 0.95, 2)  # going back in time, so the price rises
+    shops = [f'Shop {i} Store #{rng.randint(100, 999)}' for i in range(400)]
+    while len(amounts) < rows:
+        merchants.append(rng.choice(shops))
+        dates.append(TODAY - timedelta(days=rng.randint(0, 730)))
+        amounts.append(round(rng.expovariate(1 / 25), 2) if rng.random() < 0.97 else -round(rng.uniform(100, 900), 2))
+    return merchants[:rows], dates[:rows], amounts[:rows], planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--subscriptions', type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    merchants, dates, amounts, planted = synthetic(args.rows, args.subscriptions, rng)
+    print(f"{'rows':>9} {'ms':>9} {'rows/s':>12} {'found':>6} {'precision':>10} {'recall':>7}")
+    for size in sorted({100_000, args.rows}):
+        if size > args.rows:
+            continue
+        # The planted subscriptions come first, so every size keeps all of them
+        started = time.perf_counter()
+        found = detect_subscriptions(merchants[:size], dates[:size], amounts[:size], today=TODAY)
+        elapsed = time.perf_counter() - started
+        names = {f['merchant'] for f in found}
+        precision = len(names & planted) / len(names) if names else 0.0
+        recall = len(names & planted) / len(planted)
+        print(f"{size:>9,} {elapsed * 1000:>9.0f} {size / elapsed:>12,.0f} {len(found):>6} {precision:>10.1%} {recall:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Streaming bulk export and import of whole tables (users, activity history).
+
+Exports read the table in primary-key order in `chunk_size` batches from a
+streaming cursor, and write each batch straight to CSV or NDJSON. Imports
+read the file back in batches of the same size and insert each batch with
+a single `executemany`, all in one transaction. Memory stays at about one
+chunk either way, whatever the table size.
+
+The file format comes from the extension (`.csv`, `.ndjson`/`.jsonl`,
+optionally with `.gz`) or from `--format`; `-` means stdout/stdin. Columns
+are the table's own, so an export can be imported unchanged into another
+database. Ids are kept, so import `users` before `activity`.
+
+CSV has no NULL, so an empty field imports as NULL in nullable columns.
+User exports include password hashes; treat the files as secrets.
+
+    flask --app app data export users users.csv.gz
+    flask --app app data import activity activity.ndjson --chunk-size 20000
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import click
+from sqlalchemy import Date, DateTime, Integer, select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def format_for(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    raise click.UsageError(f'Cannot tell the format of {path!r}; pass --format csv|ndjson')
+
+
+@contextmanager
+def open_stream(path, mode):
+    """Text stream for `path` ('-' = stdout/stdin), gzip-compressed if it ends in .gz."""
+    if path == '-':
+        stream = io.TextIOWrapper(sys.stdout.buffer if mode == 'w' else sys.stdin.buffer,
+                                  encoding='utf-8', newline='')
+        try:
+            yield stream
+        finally:
+            stream.flush()
+            stream.detach()  # leave the process's stdout/stdin open
+        return
+    if path.endswith('.gz'):
+        stream = gzip.open(path, mode + 't', encoding='utf-8', newline='', compresslevel=6)
+    else:
+        stream = open(path, mode, encoding='utf-8', newline='')
+    with stream:
+        yield stream
+
+
+def _json_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, default=_json_default, separators=(',', ':'))
+
+
+def _parsers(table):
+    """Per-column functions turning a text field (CSV) into a Python value."""
+    parsers = []
+    for column in table.columns:
+        if isinstance(column.type, Integer):
+            parse = int
+        elif isinstance(column.type, DateTime):
+            parse = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            parse = date.fromisoformat
+        else:
+            parse = None
+        parsers.append((column.name, parse, column.nullable))
+    return parsers
+
+
+def export_table(conn, table, out, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write every row of `table` to the text stream `out`. Returns the row count."""
+    names = [c.name for c in table.columns]
+    query = select(table).order_by(*table.primary_key.columns)
+    result = conn.execution_options(yield_per=chunk_size).execute(query)
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(names)
+        for chunk in result.partitions():
+            writer.writerows(chunk)
+            count += len(chunk)
+    else:
+        for chunk in result.partitions():
+            out.write('\n'.join(_dumps(dict(zip(names, row))) for row in chunk))
+            out.write('\n')
+            count += len(chunk)
+    return count
+
+
+def _csv_records(src, table):
+    reader = csv.reader(src)
+    header = next(reader, None)
+    if header is None:
+        return
+    parsers = {name: (parse, nullable) for name, parse, nullable in _parsers(table)}
+    unknown = [h for h in header if h not in parsers]
+    if unknown:
+        raise click.ClickException(f'Unknown columns for {table.name}: {", ".join(unknown)}')
+    fields = [(h, *parsers[h]) for h in header]
+    for row in reader:
+        record = {}
+        for (name, parse, nullable), value in zip(fields, row):
+            if value == '' and nullable:
+                record[name] = None
+            else:
+                record[name] = parse(value) if parse is not None else value
+        yield record
+
+
+def _ndjson_records(src, table):
+    loads = orjson.loads if orjson is not None else json.loads
+    # JSON has no date type; exported dates and datetimes come back as ISO strings
+    temporal = [(name, parse) for name, parse, _ in _parsers(table)
+                if parse in (datetime.fromisoformat, date.fromisoformat)]
+    for line in src:
+        if not line.strip():
+            continue
+        record = loads(line)
+        for name, parse in temporal:
+            value = record.get(name)
+            if isinstance(value, str):
+                record[name] = parse(value)
+        yield record
+
+
+def import_table(conn, table, src, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert every record from the text stream `src` into `table`. Returns the row count.
+
+    Runs on the caller's transaction; nothing is committed here.
+    """
+    records = _csv_records(src, table) if fmt == 'csv' else _ndjson_records(src, table)
+    insert = table.insert()
+    count = 0
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            conn.execute(insert, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert, batch)
+        count += len(batch)
+    return count
+
+
+def _report(verb, count, name, elapsed):
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    click.echo(f'{verb} {count:,} {name} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)', err=True)
+
+
+def register_data_commands(app, db, tables):
+    """Add `flask data export|import <table> <path>` for the tables in `tables` (name -> Table)."""
+    table_choice = click.Choice(sorted(tables))
+    format_option = click.option('--format', 'fmt', type=click.Choice(FORMATS),
+                                 help='File format (default: from the file extension)')
+    chunk_option = click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+                                help='Rows fetched or inserted per batch')
+
+    @app.cli.group('data')
+    def data():
+        """Bulk export/import of users and activity history."""
+
+    @data.command('export')
+    @click.argument('table', type=table_choice)
+    @click.argument('path')
+    @format_option
+    @chunk_option
+    def export_command(table, path, fmt, chunk_size):
+        """Stream TABLE to PATH as CSV or NDJSON."""
+        fmt = fmt or format_for(path)
+        started = time.perf_counter()
+        with db.engine.connect() as conn, open_stream(path, 'w') as out:
+            count = export_table(conn, tables[table], out, fmt, chunk_size)
+        _report('Exported', count, table, time.perf_counter() - started)
+
+    @data.command('import')
+    @click.argument('table', type=table_choice)
+    @click.argument('path')
+    @format_option
+    @chunk_option
+    def import_command(table, path, fmt, chunk_size):
+        """Stream rows from PATH into TABLE in one transaction."""
+        fmt = fmt or format_for(path)
+        db.create_all()
+        started = time.perf_counter()
+        with db.engine.begin() as conn, open_stream(path, 'r') as src:
+            count = import_table(conn, tables[table], src, fmt, chunk_size)
+        _report('Imported', count, table, time.perf_counter() - started)
@@ -0,0 +1,66 @@
+"""gzip compression for dynamic responses.
+
+Registered as an `after_request` hook. A response is compressed only when
+the client accepts gzip, it is a plain 200 with a body of at least
+`min_size` bytes, its mimetype is on the allow-list, and it isn't already
+encoded or streamed (static files from `send_from_directory` are skipped).
+"""
+import gzip
+
+DEFAULT_MIMETYPES = frozenset({
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+})
+
+
+class Compressor:
+    def __init__(self, app=None, min_size=1024, level=6, mimetypes=DEFAULT_MIMETYPES):
+        self.min_size = min_size
+        self.level = level
+        self.mimetypes = frozenset(mimetypes)
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def should_compress(self, request, response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+            return False
+        if response.mimetype not in self.mimetypes or 'Content-Encoding' in response.headers:
+            return False
+        if 'gzip' not in request.accept_encodings:
+            return False
+        length = response.calculate_content_length()
+        return length is not None and length >= self.min_size
+
+    def after_request(self, response):
+        from flask import request
+
+        response.vary.add('Accept-Encoding')
+        if not self.should_compress(request, response):
+            return response
+
+        data = response.get_data()
+        compressed = gzip.compress(data, compresslevel=self.level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+        self.compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        return response
+
+    def stats(self):
+        return {
+            'compressed_responses': self.compressed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': self.bytes_out / self.bytes_in if self.bytes_in else 1.0,
+        }
@@ -0,0 +1,203 @@
+"""Multi-debt repayment planner: avalanche vs snowball vs a custom order.
+
+Every month each debt accrues interest at APR / 12 and then receives its
+minimum payment. Whatever is left of `monthly_budget` goes to the debts in
+priority order, filling the first one before moving to the next. The
+minimums of cleared debts roll into that extra payment. Priority orders:
+
+- `avalanche`: highest APR first (least interest overall);
+- `snowball`: smallest balance first (quickest wins);
+- `custom`: the order the caller gives.
+
+All strategies run together as rows of one (strategies x debts) array. Each
+row is stored in its strategy's priority order, so a month is a handful
+of NumPy operations on that array, and a cumulative sum hands out the
+extra payment. 50 debts over 30 years take a few milliseconds. Plans are
+memoized on their inputs.
+"""
+import math
+from datetime import date
+from functools import lru_cache
+
+MAX_DEBTS = 100
+MAX_MONTHS = 600  # give up after 50 years
+_PAID = 0.005  # balances under half a cent count as cleared
+
+
+def _np():
+    """NumPy, imported on first use so importing this module (and the app) stays fast."""
+    import numpy
+    return numpy
+
+
+def parse_debts(data):
+    """Validated debts, budget and custom order from a request body. Raises ValueError."""
+    debts = data.get('debts')
+    if not isinstance(debts, list) or not debts:
+        raise ValueError('debts must be a non-empty list')
+    if len(debts) > MAX_DEBTS:
+        raise ValueError(f'At most {MAX_DEBTS} debts')
+    parsed = []
+    for i, debt in enumerate(debts):
+        try:
+            name = str(debt.get('name') or f'Debt {i + 1}')
+            balance = float(debt['balance'])
+            apr = float(debt.get('apr', 0))
+            minimum = float(debt.get('min_payment', 0))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f'Debt {i + 1} needs a numeric balance, apr and min_payment')
+        if not all(map(math.isfinite, (balance, apr, minimum))):
+            raise ValueError(f'Debt {i + 1}: balance, apr and min_payment must be finite numbers')
+        if balance < 0 or not 0 <= apr <= 100 or minimum < 0:
+            raise ValueError(f'Debt {i + 1}: balance and min_payment must be >= 0 and apr between 0 and 100')
+        parsed.append((name, round(balance, 2), apr, round(minimum, 2)))
+
+    budget = data.get('monthly_budget')
+    try:
+        budget = round(float(budget if budget is not None else sum(d[3] for d in parsed)), 2)
+    except (TypeError, ValueError):
+        raise ValueError('monthly_budget must be a number')
+    if not math.isfinite(budget):
+        raise ValueError('monthly_budget must be a finite number')
+    minimums = sum(min(d[1], d[3]) for d in parsed)
+    if budget < minimums:
+        raise ValueError(f'monthly_budget must cover the minimum payments ({minimums:.2f})')
+
+    custom = data.get('custom_order')
+    if custom is not None:
+        if not isinstance(custom, list):
+            raise ValueError('custom_order must be a list of debt names or indexes')
+        names = [d[0] for d in parsed]
+        order = []
+        for c in custom:
+            if isinstance(c, str):
+                if names.count(c) != 1:
+                    # Several debts with one name: only their indexes say which is which
+                    raise ValueError(f'custom_order: {c!r} is not the name of exactly one debt; use indexes')
+                order.append(names.index(c))
+            elif isinstance(c, int) and not isinstance(c, bool):
+                order.append(c)
+            else:
+                raise ValueError('custom_order must list debt names or indexes')
+        custom = tuple(order)
+        if sorted(custom) != list(range(len(parsed))):
+            raise ValueError('custom_order must list every debt exactly once')
+    return tuple(parsed), budget, custom
+
+
+def priority_orders(debts, custom=None):
+    """Strategy name -> debt indexes, highest priority first."""
+    np = _np()
+    balances = np.array([d[1] for d in debts])
+    aprs = np.array([d[2] for d in debts])
+    orders = {
+        # np.lexsort sorts by the last key first
+        'avalanche': np.lexsort((balances, -aprs)),
+        'snowball': np.lexsort((-aprs, balances)),
+    }
+    if custom is not None:
+        orders['custom'] = np.array(custom)
+    return orders
+
+
+@lru_cache(maxsize=256)
+def simulate(debts, budget, custom=None, max_months=MAX_MONTHS):
+    """Run every strategy month by month. Returns (names, per-strategy arrays) for `plan_repayment`."""
+    np = _np()
+    orders = priority_orders(debts, custom)
+    names = list(orders)
+    order = np.stack([orders[n] for n in names])
+
+    # Every row is kept in its own priority order, so the extra payment is a plain cumulative sum
+    rate = (np.array([d[2] for d in debts]) / 100 / 12)[order]
+    minimum = np.array([d[3] for d in debts])[order]
+    balance = np.array([d[1] for d in debts], dtype=np.float64)[order]
+    interest_paid = np.zeros_like(balance)
+    payoff_month = np.where(balance <= _PAID, 0, -1)
+    totals = [balance.sum(axis=1)]
+    payments = []
+
+    for month in range(1, max_months + 1):
+        interest = balance * rate
+        balance += interest
+        interest_paid += interest
+        pay = np.minimum(minimum, balance)
+        leftover = budget - pay.sum(axis=1, keepdims=True)
+
+        # Each debt gets whatever extra is left after the higher-priority ones are cleared
+        remaining = balance - pay
+        extra = np.cumsum(remaining, axis=1)
+        extra -= remaining
+        np.subtract(leftover, extra, out=extra)
+        np.maximum(extra, 0, out=extra)
+        np.minimum(extra, remaining, out=extra)
+        pay += extra
+
+        balance -= pay
+        cleared = balance <= _PAID
+        balance[cleared] = 0.0
+        payoff_month[cleared & (payoff_month < 0)] = month
+        totals.append(balance.sum(axis=1))
+        payments.append(pay)
+        if not balance.any():
+            break
+
+    # Back from priority order to the caller's debt order
+    unsort = np.argsort(order, axis=1)
+    return names, {
+        'order': order,
+        'payoff_month': np.take_along_axis(payoff_month, unsort, axis=1),
+        'interest_paid': np.take_along_axis(interest_paid, unsort, axis=1),
+        'total_balance': np.stack(totals, axis=1),
+        'payments': np.take_along_axis(np.stack(payments, axis=1), unsort[:, None, :], axis=2),  # (strategies, months, debts)
+    }
+
+
+def _add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def plan_repayment(debts, budget, custom=None, start=None, include_schedule=False):
+    """Compare strategies for `debts` (from parse_debts). Dates count from the month after `start`."""
+    np = _np()
+    start = start or date.today()
+    names, result = simulate(debts, budget, custom)
+    strategies = {}
+    for s, name in enumerate(names):
+        months = result['payoff_month'][s]
+        cleared = bool((months >= 0).all())
+        total_interest = float(result['interest_paid'][s].sum())
+        entry = {
+            'order': [debts[i][0] for i in result['order'][s]],
+            'paid_off': cleared,
+            'months': int(months.max()) if cleared else None,
+            'payoff_date': _add_months(start, int(months.max())) if cleared else None,
+            'total_interest': round(total_interest, 2),
+            'total_paid': round(float(result['payments'][s].sum()), 2),
+            'debts': [{
+                'name': debt[0],
+                'payoff_month': int(m) if m >= 0 else None,
+                'payoff_date': _add_months(start, int(m)) if m >= 0 else None,
+                'interest_paid': round(float(interest), 2),
+            } for debt, m, interest in zip(debts, months, result['interest_paid'][s])],
+            'total_balance': np.round(result['total_balance'][s], 2).tolist(),
+        }
+        if include_schedule:
+            entry['payments'] = np.round(result['payments'][s], 2).tolist()
+        strategies[name] = entry
+
+    finished = [n for n in names if strategies[n]['paid_off']]
+    best = min(finished, key=lambda n: (strategies[n]['total_interest'], strategies[n]['months'])) if finished else None
+    return {
+        'monthly_budget': budget,
+        'strategies': strategies,
+        'recommended': best,
+        'interest_saved': round(max(s['total_interest'] for s in strategies.values())
+                                - strategies[best]['total_interest'], 2) if best else None,
+    }
+
+
+def cache_stats():
+    info = simulate.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'entries': info.currsize}
@@ -0,0 +1,81 @@
+"""Pluggable JSON provider for `jsonify` and `request.get_json`.
+
+`make_json_provider(app)` returns an orjson-backed provider when orjson is
+installed (several times faster than the stdlib encoder on large payloads
+such as /api/transactions) and the stdlib one otherwise. `JSON_PROVIDER=stdlib`
+in the environment forces the fallback.
+
+Both providers serialize the same way so switching is invisible to clients:
+dates and datetimes as ISO 8601 strings, Decimal and UUID as strings,
+dataclasses as dicts.
+"""
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, with ISO dates to match OrjsonProvider."""
+
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """orjson-backed provider. Responses are written as bytes without a str round trip."""
+
+    name = 'orjson'
+
+    def _options(self, indent=False):
+        # NON_STR_KEYS keeps parity with json.dumps for int-keyed dicts
+        options = orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {'indent', 'separators'}:
+            # Unusual arguments (cls=, sort_keys=...) only the stdlib understands
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options(bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def make_json_provider(app):
+    choice = os.getenv('JSON_PROVIDER', 'orjson' if orjson is not None else 'stdlib')
+    if choice == 'orjson' and orjson is not None:
+        return OrjsonProvider(app)
+    return StdlibJSONProvider(app)
@@ -0,0 +1,124 @@
+"""Per-user cache for Plaid Link tokens.
+
+Link tokens stay valid for hours, so there is no need to call
+`link_token_create` every time someone clicks "connect bank". Tokens are kept
+per user until shortly before they expire, and can be prefetched in the
+background (e.g. when the bank page is rendered) so the click is served
+straight from memory.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LinkTokenCache:
+    """Thread-safe, expiry-aware store of one Link token per user.
+
+    `fetch(user_id)` must return `(link_token, expires_at)` where `expires_at`
+    is a unix timestamp (or None to fall back to `default_ttl`).
+    """
+
+    def __init__(self, fetch, refresh_margin=600, default_ttl=4 * 3600, max_workers=2):
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self._entries = {}   # user_id -> (token, created_at, expires_at)
+        self._inflight = {}  # user_id -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='link-token')
+
+        self.hits = 0
+        self.misses = 0
+        self.inflight_joins = 0
+        self.prefetches = 0
+        self.errors = 0
+        self._served = 0
+        self._age_total = 0.0
+        self._age_max = 0.0
+
+    def _fresh(self, entry, now):
+        return entry is not None and entry[2] - now > self.refresh_margin
+
+    def _run_fetch(self, user_id):
+        try:
+            token, expires_at = self._fetch(user_id)
+            now = time.time()
+            if expires_at is None:
+                expires_at = now + self.default_ttl
+            with self._lock:
+                self._entries[user_id] = (token, now, expires_at)
+            return token
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+
+    def _start_fetch(self, user_id):
+        """Return the in-flight fetch for `user_id`, starting one if needed. Caller holds the lock."""
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = self._executor.submit(self._run_fetch, user_id)
+            self._inflight[user_id] = future
+        return future
+
+    def _record_age(self, age):
+        self._served += 1
+        self._age_total += age
+        self._age_max = max(self._age_max, age)
+
+    def get(self, user_id, timeout=None):
+        """Return a valid Link token for `user_id`, fetching it if necessary."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if self._fresh(entry, now):
+                self.hits += 1
+                self._record_age(now - entry[1])
+                return entry[0]
+            if user_id in self._inflight:
+                # A prefetch is already running; joining it is cheaper than a second round trip
+                self.inflight_joins += 1
+            else:
+                self.misses += 1
+            future = self._start_fetch(user_id)
+
+        token = future.result(timeout=timeout)
+        with self._lock:
+            self._record_age(0.0)
+        return token
+
+    def prefetch(self, user_id):
+        """Warm the cache for `user_id` in the background. Returns immediately."""
+        with self._lock:
+            if self._fresh(self._entries.get(user_id), time.time()) or user_id in self._inflight:
+                return
+            self.prefetches += 1
+            self._start_fetch(user_id)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def token_age(self, user_id):
+        """Seconds since the cached token for `user_id` was created, or None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        return None if entry is None else time.time() - entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.inflight_joins
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'inflight_joins': self.inflight_joins,
+                'prefetches': self.prefetches,
+                'errors': self.errors,
+                'hit_rate': (self.hits + self.inflight_joins) / lookups if lookups else 0.0,
+                'avg_token_age_s': self._age_total / self._served if self._served else 0.0,
+                'max_token_age_s': self._age_max,
+            }
@@ -0,0 +1,282 @@
+"""Route LLM requests across Ollama and Gemini by latency, health and cost.
+
+Both the advisor chat and the transaction analysis go through `LLMRouter`.
+It keeps a rolling window of latency and errors for every backend and picks
+one per request by policy:
+
+- `fastest`: the healthy backend with the lowest recent latency for this
+  task (advisor replies and analyses are timed separately), with a small
+  share of requests (`explore`) sent elsewhere to keep figures current;
+- `cost`: the cheapest healthy backend whose per-call cost is within
+  `cost_cap`, then the rest by cost;
+- `sticky`: keep a conversation on the backend that answered it last, as
+  long as that backend stays healthy; otherwise behave like `fastest`.
+
+If the chosen backend fails, the router tries the next one in order. A
+backend with `failure_threshold` consecutive failures, or a recent error
+rate above 50%, sits out for `cooldown` seconds. It stays available as a
+last resort. Its record is wiped when the cooldown starts, so once the
+cooldown ends it is half-open: it is tried again and judged only on the
+calls made since then.
+
+`FakeBackend` has configurable latency and error rate for tests and
+benchmarks.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class BackendError(Exception):
+    pass
+
+
+class NoBackendAvailable(Exception):
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors
+
+
+class OllamaBackend:
+    name = 'ollama'
+
+    def __init__(self, base_url, model, keep_alive='30m', cost_per_call=0.0, timeout=60):
+        self.base_url = base_url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.cost_per_call = cost_per_call
+        self.timeout = timeout
+
+    def available(self):
+        return True
+
+    def chat(self, messages, options, model=None):
+        resp = requests.post(f'{self.base_url}/api/chat', json={
+            'model': model or self.model,
+            'messages': messages,
+            'stream': False,
+            'keep_alive': self.keep_alive,
+            'options': options,
+        }, timeout=self.timeout)
+        if resp.status_code != 200:
+            raise BackendError(f'Ollama returned {resp.status_code}: {resp.text[:200]}')
+        payload = resp.json()
+        return payload.get('message', {}).get('content', '').strip(), payload
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def __init__(self, genai_factory, model, api_key, cost_per_call=0.001):
+        self._genai_factory = genai_factory
+        self.model = model
+        self.api_key = api_key
+        self.cost_per_call = cost_per_call
+
+    def available(self):
+        return bool(self.api_key)
+
+    def chat(self, messages, options, model=None):
+        genai = self._genai_factory()
+        system = '\n'.join(m['content'] for m in messages if m['role'] == 'system')
+        contents = [{'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [m['content']]}
+                    for m in messages if m['role'] != 'system']
+        # `num_predict` is an Ollama cap and is not passed on: Gemini 2.5 counts thinking tokens
+        # against max_output_tokens, so the same cap truncates or empties its replies
+        generation_config = {
+            'temperature': options.get('temperature'),
+            'top_p': options.get('top_p'),
+            'top_k': options.get('top_k'),
+        }
+        gemini = genai.GenerativeModel(self.model, system_instruction=system or None)
+        response = gemini.generate_content(
+            contents,
+            generation_config={k: v for k, v in generation_config.items() if v is not None},
+        )
+        return response.text.strip(), None
+
+
+class FakeBackend:
+    """Local stand-in with injected latency (seconds, or a callable) and error rate."""
+
+    def __init__(self, name, latency=0.0, error_rate=0.0, cost_per_call=0.0, reply='ok', seed=None):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.cost_per_call = cost_per_call
+        self.reply = reply
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def available(self):
+        return True
+
+    def chat(self, messages, options, model=None):
+        self.calls += 1
+        time.sleep(self.latency() if callable(self.latency) else self.latency)
+        if self._rng.random() < self.error_rate:
+            raise BackendError(f'{self.name} injected failure')
+        return f'{self.reply} from {self.name}', None
+
+
+class BackendHealth:
+    def __init__(self, window):
+        self.outcomes = deque(maxlen=window)        # True/False per call
+        self.latency = {}                           # task -> deque of ms
+        self.window = window
+        self.calls = 0
+        self.errors = 0
+        self.routed = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def error_rate(self):
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def avg_latency(self, task):
+        samples = self.latency.get(task)
+        return sum(samples) / len(samples) if samples else None
+
+
+class RouteResult:
+    def __init__(self, text, backend, latency_ms, failovers, meta):
+        self.text = text
+        self.backend = backend
+        self.latency_ms = latency_ms
+        self.failovers = failovers
+        self.meta = meta
+
+
+class LLMRouter:
+    POLICIES = ('fastest', 'cost', 'sticky')
+
+    def __init__(self, backends, policy='fastest', cost_cap=None, window=50,
+                 failure_threshold=3, cooldown=30.0, max_sticky=5000, explore=0.05, seed=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f'policy must be one of {self.POLICIES}')
+        self.backends = {b.name: b for b in backends}
+        self.policy = policy
+        self.cost_cap = cost_cap
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_sticky = max_sticky
+        self.explore = explore
+        self._rng = random.Random(seed)
+        self._health = {b.name: BackendHealth(window) for b in backends}
+        self._sticky = {}
+        self._lock = threading.Lock()
+        self.failovers = 0
+        self.decisions = {}  # 'policy:backend' -> count
+
+    def _healthy(self, name, now):
+        health = self._health[name]
+        return health.cooldown_until <= now and health.error_rate() <= 0.5
+
+    def order(self, task, conversation_id=None, prefer=None, policy=None):
+        """Backends to try for this request, best first."""
+        policy = policy or self.policy
+        now = time.monotonic()
+        with self._lock:
+            names = [n for n, b in self.backends.items() if b.available()]
+            healthy = [n for n in names if self._healthy(n, now)]
+            unhealthy = [n for n in names if n not in healthy]
+
+            def latency_key(name):
+                avg = self._health[name].avg_latency(task)
+                # Untried backends go first (preferred one before others) so every backend gets measured
+                return (avg is not None, avg or 0.0, name != prefer)
+
+            if policy == 'cost':
+                within = [n for n in healthy if self.cost_cap is None or self.backends[n].cost_per_call <= self.cost_cap]
+                over = [n for n in healthy if n not in within]
+                by_cost = lambda n: (self.backends[n].cost_per_call, latency_key(n))  # noqa: E731
+                ordered = sorted(within, key=by_cost) + sorted(over, key=by_cost)
+            else:
+                ordered = sorted(healthy, key=latency_key)
+                # Occasionally try a slower backend so its latency figures don't go stale
+                if len(ordered) > 1 and self._rng.random() < self.explore:
+                    ordered.insert(0, ordered.pop(self._rng.randrange(1, len(ordered))))
+                sticky = self._sticky.get(conversation_id) if policy == 'sticky' and conversation_id else None
+                if sticky in ordered:
+                    ordered.remove(sticky)
+                    ordered.insert(0, sticky)
+            return ordered + sorted(unhealthy, key=latency_key)
+
+    def _record(self, name, task, ok, latency_ms):
+        now = time.monotonic()
+        with self._lock:
+            health = self._health[name]
+            health.calls += 1
+            if not ok:
+                health.errors += 1
+            if health.cooldown_until > now:
+                return  # a last-resort call while cooling down doesn't count towards health
+            health.outcomes.append(ok)
+            if ok:
+                health.consecutive_failures = 0
+                health.latency.setdefault(task, deque(maxlen=health.window)).append(latency_ms)
+            else:
+                health.consecutive_failures += 1
+                if health.consecutive_failures >= self.failure_threshold or health.error_rate() > 0.5:
+                    health.cooldown_until = now + self.cooldown
+                    # Half-open after the cooldown: judged afresh on the calls made from then on
+                    health.outcomes.clear()
+                    health.consecutive_failures = 0
+
+    def complete(self, messages, options=None, task='default', conversation_id=None,
+                 prefer=None, policy=None, models=None):
+        """Run `messages` on the best backend, failing over in order. Returns a RouteResult."""
+        options = options or {}
+        models = models or {}
+        policy = policy or self.policy
+        order = self.order(task, conversation_id, prefer, policy)
+        if not order:
+            raise NoBackendAvailable('No LLM backend is configured', [])
+
+        errors = []
+        for attempt, name in enumerate(order):
+            backend = self.backends[name]
+            started = time.perf_counter()
+            try:
+                text, meta = backend.chat(messages, options, model=models.get(name))
+            except Exception as e:
+                self._record(name, task, False, (time.perf_counter() - started) * 1000)
+                errors.append(f'{name}: {e}')
+                continue
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._record(name, task, True, latency_ms)
+            with self._lock:
+                self._health[name].routed += 1
+                self.failovers += attempt
+                key = f'{policy}:{name}'
+                self.decisions[key] = self.decisions.get(key, 0) + 1
+                if conversation_id:
+                    self._sticky[conversation_id] = name
+                    while len(self._sticky) > self.max_sticky:
+                        self._sticky.pop(next(iter(self._sticky)))
+            return RouteResult(text, name, latency_ms, attempt, meta)
+
+        raise NoBackendAvailable('All LLM backends failed: ' + '; '.join(errors), errors)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            backends = {}
+            for name, health in self._health.items():
+                backends[name] = {
+                    'calls': health.calls,
+                    'errors': health.errors,
+                    'routed': health.routed,
+                    'error_rate': health.error_rate(),
+                    'healthy': self._healthy(name, now),
+                    'avg_latency_ms': {task: sum(s) / len(s) for task, s in health.latency.items() if s},
+                }
+            return {
+                'policy': self.policy,
+                'failovers': self.failovers,
+                'decisions': dict(self.decisions),
+                'backends': backends,
+            }
@@ -0,0 +1,164 @@
+"""Keep the advisor's Ollama model loaded.
+
+Ollama unloads a model after `keep_alive` of inactivity, and the next chat
+then pays the full load time (often tens of seconds for llama3.2:3b).
+`ModelWarmer` loads the model once `start()` is called and then checks `/api/ps`
+every `interval` seconds. It reloads the model (an empty-prompt
+`/api/generate`) whenever it isn't resident or is close to expiring.
+
+It also sorts advisor replies into cold and warm using Ollama's
+`load_duration`, and reports first-token latency for each group.
+"""
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+# A reply whose model load took longer than this counts as a cold start
+COLD_LOAD_MS = 500
+
+
+def _parse_expiry(value):
+    """Parse Ollama's RFC 3339 `expires_at` (nanosecond fractions) to an aware datetime."""
+    if not value:
+        return None
+    value = re.sub(r'(\.\d{6})\d+', r'\1', value).replace('Z', '+00:00')
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class ModelWarmer:
+    def __init__(self, base_url, model, keep_alive='30m', interval=60):
+        self.base_url = base_url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.reachable = None
+        self.resident = False
+        self.expires_at = None
+        self.last_check_at = None
+        self.last_warm_at = None
+        self.last_warm_ms = None
+        self.warmups = 0
+        self.warmup_errors = 0
+        self._latency = {'cold': [0, 0.0], 'warm': [0, 0.0]}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _matches(self, name):
+        # /api/ps reports "llama3.2:3b"; a bare "llama3.2" means ":latest"
+        wanted = self.model if ':' in self.model else f'{self.model}:latest'
+        return name in (self.model, wanted)
+
+    def check(self):
+        """Ask Ollama which models are loaded. Returns True if ours is resident."""
+        try:
+            resp = requests.get(f'{self.base_url}/api/ps', timeout=2)
+            resp.raise_for_status()
+            models = resp.json().get('models', [])
+            entry = next((m for m in models if self._matches(m.get('name') or m.get('model', ''))), None)
+            with self._lock:
+                self.reachable = True
+                self.resident = entry is not None
+                self.expires_at = _parse_expiry(entry.get('expires_at')) if entry else None
+        except Exception:
+            with self._lock:
+                self.reachable = False
+                self.resident = False
+                self.expires_at = None
+        with self._lock:
+            self.last_check_at = time.time()
+            return self.resident
+
+    def warm(self):
+        """Load the model (no-op generation) and pin it for `keep_alive`."""
+        started = time.perf_counter()
+        try:
+            resp = requests.post(f'{self.base_url}/api/generate', json={
+                'model': self.model,
+                'prompt': '',
+                'keep_alive': self.keep_alive,
+                'stream': False,
+            }, timeout=300)
+            resp.raise_for_status()
+        except Exception as e:
+            print(f"Ollama warm-up failed: {e}")
+            with self._lock:
+                self.warmup_errors += 1
+            return False
+        with self._lock:
+            self.warmups += 1
+            self.last_warm_at = time.time()
+            self.last_warm_ms = (time.perf_counter() - started) * 1000
+        return self.check()
+
+    def _expiring_soon(self):
+        if self.expires_at is None:
+            return False
+        remaining = (self.expires_at - datetime.now(timezone.utc)).total_seconds()
+        return remaining < 2 * self.interval
+
+    def tick(self):
+        if not self.check() or self._expiring_soon():
+            self.warm()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background warm-up loop (once; safe to call from every request)."""
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='ollama-warmup', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def record_reply(self, payload, elapsed_ms):
+        """Record first-token latency for an /api/chat response payload.
+
+        Ollama's durations are in nanoseconds. With stream=False the first
+        token arrives roughly after load + prompt evaluation; fall back to the
+        wall time if the fields are missing.
+        """
+        load_ms = payload.get('load_duration', 0) / 1e6
+        prompt_ms = payload.get('prompt_eval_duration', 0) / 1e6
+        first_token_ms = load_ms + prompt_ms if (load_ms or prompt_ms) else elapsed_ms
+        kind = 'cold' if load_ms > COLD_LOAD_MS else 'warm'
+        with self._lock:
+            bucket = self._latency[kind]
+            bucket[0] += 1
+            bucket[1] += first_token_ms
+            if kind == 'warm':
+                self.resident = True
+
+    def status(self):
+        with self._lock:
+            return {
+                'model': self.model,
+                'reachable': self.reachable,
+                'resident': self.resident,
+                'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+                'keep_alive': self.keep_alive,
+                'last_check_at': self.last_check_at,
+                'last_warm_at': self.last_warm_at,
+                'last_warm_ms': self.last_warm_ms,
+            }
+
+    def stats(self):
+        with self._lock:
+            stats = {'warmups': self.warmups, 'warmup_errors': self.warmup_errors}
+            for kind, (count, total) in self._latency.items():
+                stats[f'{kind}_replies'] = count
+                stats[f'{kind}_first_token_avg_ms'] = total / count if count else None
+            return stats
@@ -0,0 +1,265 @@
+"""Timeouts, retries and circuit breaking around the Plaid API client.
+
+`ResilientPlaidClient` wraps the generated `PlaidApi` so a slow or degraded
+Plaid endpoint can't hold a worker indefinitely:
+
+- every call has an overall deadline, and each HTTP attempt gets the time
+  that is left of it as its socket timeout;
+- retryable failures (rate limits, PRODUCT_NOT_READY, 5xx, network errors)
+  are retried with jittered exponential backoff, limited by a shared retry
+  budget so an outage doesn't multiply traffic. Calls that aren't safe to
+  repeat (the public token exchange) get a single attempt: a timeout or 5xx
+  doesn't tell whether Plaid already carried them out;
+- each item (and Link itself) has a circuit breaker that fails fast after
+  repeated failures, then lets a single probe through once it cools down.
+
+Errors are classified by duck typing (`status` / `body` attributes), so this
+module never imports the Plaid SDK itself.
+"""
+import json
+import random
+import threading
+import time
+
+# Plaid error codes worth retrying; see https://plaid.com/docs/errors/
+RETRYABLE_ERROR_CODES = {
+    'RATE_LIMIT_EXCEEDED',
+    'PRODUCT_NOT_READY',
+    'INTERNAL_SERVER_ERROR',
+    'PLANNED_MAINTENANCE',
+    'INSTITUTION_DOWN',
+    'INSTITUTION_NOT_RESPONDING',
+}
+RETRYABLE_ERROR_TYPES = {'RATE_LIMIT_EXCEEDED', 'API_ERROR', 'INSTITUTION_ERROR'}
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PlaidUnavailable(Exception):
+    """Raised when a call is rejected by the breaker or runs out of time/retries."""
+
+    def __init__(self, message, retry_after=None, cause=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.cause = cause
+
+
+def plaid_error_code(exc):
+    """Return (error_type, error_code) from a Plaid ApiException body, if any."""
+    body = getattr(exc, 'body', None)
+    if not body:
+        return None, None
+    try:
+        data = json.loads(body) if isinstance(body, (str, bytes)) else body
+    except ValueError:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    return data.get('error_type'), data.get('error_code')
+
+
+def is_retryable(exc):
+    """True for failures that are likely to succeed if tried again shortly."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import urllib3
+        if isinstance(exc, urllib3.exceptions.HTTPError):
+            return True
+    except ImportError:
+        pass
+    status = getattr(exc, 'status', None)
+    if status is None:
+        return False
+    error_type, error_code = plaid_error_code(exc)
+    if error_code in RETRYABLE_ERROR_CODES or error_type in RETRYABLE_ERROR_TYPES:
+        return True
+    return status in RETRYABLE_STATUSES
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self):
+        """Return True if a call may proceed right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(self.reset_timeout - (self._clock() - self.opened_at), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+class RetryBudget:
+    """Allow retries up to `ratio` of recent calls (plus a small floor).
+
+    Every call deposits `ratio` tokens and every retry withdraws one, so at
+    most ~20% extra traffic is sent to Plaid while it is failing.
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=3.0, max_tokens=20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class ResilientPlaidClient:
+    """Drop-in wrapper for the Plaid calls app.py makes.
+
+    `client_factory` is called on first use (see `get_plaid_client` in app.py)
+    so wrapping doesn't force the SDK to load.
+    """
+
+    def __init__(self, client_factory, deadline=15.0, attempt_timeout=10.0, max_attempts=4,
+                 base_delay=0.25, max_delay=4.0, failure_threshold=5, reset_timeout=30.0,
+                 budget=None, sleep=time.sleep, clock=time.monotonic):
+        self._client_factory = client_factory
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.budget = budget or RetryBudget()
+        self._sleep = sleep
+        self._clock = clock
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+            'budget_exhausted': 0, 'deadline_exceeded': 0, 'breaker_rejections': 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def breaker(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout, self._clock)
+                self._breakers[key] = breaker
+            return breaker
+
+    def _backoff(self, attempt):
+        # "Full jitter": uniform over [0, capped exponential]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, method_name, request, key='default', retry=True):
+        """Invoke `PlaidApi.<method_name>(request)` with deadline, retries and breaker `key`.
+
+        Pass `retry=False` for calls that must not be repeated.
+        """
+        breaker = self.breaker(key)
+        self._count('calls')
+        self.budget.deposit()
+        # Before allow(): a half-open breaker would wait forever on a probe that never ran
+        # if building the client (the lazy SDK import, its configuration) raised
+        method = getattr(self._client_factory(), method_name)
+        if not breaker.allow():
+            self._count('breaker_rejections')
+            raise PlaidUnavailable(f'Plaid circuit open for {key}', retry_after=breaker.retry_after())
+
+        deadline_at = self._clock() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline_at - self._clock()
+            if remaining <= 0:
+                self._count('deadline_exceeded')
+                breaker.record_failure()
+                raise PlaidUnavailable(f'Plaid {method_name} exceeded {self.deadline:.0f}s deadline')
+            try:
+                result = method(request, _request_timeout=min(self.attempt_timeout, remaining))
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request itself is bad (e.g. INVALID_INPUT); Plaid is healthy
+                    breaker.record_success()
+                    self._count('failures')
+                    raise
+                attempt += 1
+                delay = self._backoff(attempt)
+                if not retry or attempt >= self.max_attempts or delay >= deadline_at - self._clock():
+                    breaker.record_failure()
+                    self._count('failures')
+                    raise PlaidUnavailable(f'Plaid {method_name} failed after {attempt} attempt(s): {e}',
+                                           retry_after=breaker.retry_after() or None, cause=e)
+                if not self.budget.withdraw():
+                    self._count('budget_exhausted')
+                    breaker.record_failure()
+                    self._count('failures')
+                    raise PlaidUnavailable(f'Plaid {method_name} failed and retry budget is exhausted: {e}',
+                                           cause=e)
+                self._count('retries')
+                self._sleep(delay)
+                continue
+            breaker.record_success()
+            self._count('successes')
+            return result
+
+    def link_token_create(self, request):
+        return self.call('link_token_create', request, key='link')
+
+    def item_public_token_exchange(self, request):
+        # Not idempotent: a public token can be exchanged only once
+        return self.call('item_public_token_exchange', request, key='link', retry=False)
+
+    def transactions_get(self, request, item_id):
+        return self.call('transactions_get', request, key=f'item:{item_id}')
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            breakers = {key: b.state for key, b in self._breakers.items()}
+        counters['open_breakers'] = sorted(key for key, state in breakers.items() if state != CircuitBreaker.CLOSED)
+        return counters
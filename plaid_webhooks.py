@@ -0,0 +1,202 @@
+"""Plaid webhook verification and the background transaction refresh queue.
+
+Plaid signs every webhook with an ES256 JWT in the `Plaid-Verification`
+header. `WebhookVerifier` checks that signature against the key Plaid
+publishes for the JWT's `kid`, rejects stale tokens and compares the body
+hash claim with the actual request body.
+See https://plaid.com/docs/api/webhooks/webhook-verification/
+
+`RefreshQueue` runs refresh jobs on a small worker pool with at most one job
+per item queued or running. Webhooks that arrive while an item is already
+refreshing are folded into a single follow-up run instead of piling up.
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# TRANSACTIONS webhook codes that mean "there is new data to pull"
+REFRESH_WEBHOOK_CODES = {
+    'SYNC_UPDATES_AVAILABLE',
+    'INITIAL_UPDATE',
+    'HISTORICAL_UPDATE',
+    'DEFAULT_UPDATE',
+    'TRANSACTIONS_REMOVED',
+}
+
+DEV_SIGNATURE_HEADER = 'X-Dev-Webhook-Signature'
+
+
+def dev_signature(secret, body):
+    """HMAC-SHA256 signature used by scripts/post_plaid_webhook.py for local testing."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class WebhookVerifier:
+    """Verify Plaid webhook JWTs.
+
+    `key_fetcher(kid)` returns the JWK dict for a key id (in app.py it calls
+    `/webhook_verification_key/get`). Keys are cached by id. `dev_secret`
+    additionally accepts HMAC-signed bodies from the local test script; app.py
+    only passes it in the sandbox environment.
+
+    The `kid` comes from an unauthenticated request, so lookups are guarded:
+    a failed lookup is remembered for `failure_ttl` seconds, and at most
+    `max_fetches` lookups go to Plaid per `fetch_window` seconds. Made-up key
+    ids can't turn webhook posts into a stream of Plaid calls.
+    """
+
+    def __init__(self, key_fetcher, max_age=300, dev_secret=None, failure_ttl=300, max_fetches=10, fetch_window=60):
+        self._key_fetcher = key_fetcher
+        self.max_age = max_age
+        self.dev_secret = dev_secret
+        self.failure_ttl = failure_ttl
+        self.max_fetches = max_fetches
+        self.fetch_window = fetch_window
+        self._keys = {}
+        self._failed = {}  # kid -> monotonic time the failure stops counting
+        self._fetched_at = deque()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.key_fetches = 0
+        self.key_fetches_refused = 0
+
+    def _key(self, kid):
+        now = time.monotonic()
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+            if self._failed.get(kid, 0) > now:
+                self.key_fetches_refused += 1
+                raise LookupError(f'Verification key {kid} failed to load recently')
+            while self._fetched_at and self._fetched_at[0] <= now - self.fetch_window:
+                self._fetched_at.popleft()
+            if len(self._fetched_at) >= self.max_fetches:
+                self.key_fetches_refused += 1
+                raise LookupError('Too many verification key lookups')
+            self._fetched_at.append(now)
+            self.key_fetches += 1
+        try:
+            key = self._key_fetcher(kid)
+        except Exception:
+            with self._lock:
+                self._failed = {k: until for k, until in self._failed.items() if until > now}
+                self._failed[kid] = now + self.failure_ttl
+            raise
+        with self._lock:
+            self._keys[kid] = key
+        return key
+
+    def _verify_jwt(self, body, token):
+        import jwt
+
+        header = jwt.get_unverified_header(token)
+        if header.get('alg') != 'ES256' or not header.get('kid'):
+            return False
+        jwk = self._key(header['kid'])
+        if jwk.get('expired_at'):
+            return False
+        public_key = jwt.algorithms.ECAlgorithm.from_jwk(json.dumps(jwk))
+        claims = jwt.decode(token, key=public_key, algorithms=['ES256'])
+        if time.time() - claims.get('iat', 0) > self.max_age:
+            return False
+        expected = claims.get('request_body_sha256', '')
+        return hmac.compare_digest(hashlib.sha256(body).hexdigest(), expected)
+
+    def verify(self, body, headers):
+        """Return True if `body` carries a valid Plaid (or dev) signature."""
+        ok = False
+        try:
+            token = headers.get('Plaid-Verification')
+            if token:
+                ok = self._verify_jwt(body, token)
+            elif self.dev_secret and headers.get(DEV_SIGNATURE_HEADER):
+                ok = hmac.compare_digest(dev_signature(self.dev_secret, body), headers[DEV_SIGNATURE_HEADER])
+        except Exception as e:
+            print(f"Webhook verification error: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+        return ok
+
+
+class RefreshQueue:
+    """Deduplicating per-key job queue on a thread pool.
+
+    `enqueue(key)` returns the Future for the key's pending/running job,
+    creating one if there is none, so callers can also wait on it.
+    """
+
+    def __init__(self, job, max_workers=2):
+        self._job = job
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._running = set()
+        self._rerun = set()
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+
+    def enqueue(self, key):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                if key in self._running:
+                    # New data arrived mid-refresh; run once more when this one finishes
+                    self._rerun.add(key)
+                return future
+            self.enqueued += 1
+            future = self._executor.submit(self._run, key)
+            self._futures[key] = future
+            return future
+
+    def _run(self, key):
+        while True:
+            with self._lock:
+                self._running.add(key)
+                self._rerun.discard(key)
+            error = None
+            result = None
+            try:
+                result = self._job(key)
+                with self._lock:
+                    self.completed += 1
+            except Exception as e:
+                error = e
+                print(f"Refresh job for {key} failed: {e}")
+                with self._lock:
+                    self.failed += 1
+            with self._lock:
+                if key in self._rerun:
+                    continue
+                self._running.discard(key)
+                self._futures.pop(key, None)
+            if error is not None:
+                raise error
+            return result
+
+    def pending(self):
+        with self._lock:
+            return len(self._futures)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._futures),
+                'running': len(self._running),
+                'enqueued': self.enqueued,
+                'deduplicated': self.deduplicated,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
@@ -0,0 +1,241 @@
+"""Per-user token-bucket rate limiting for the write-heavy and LLM routes.
+
+Each (route, user) pair has a bucket of `limit` tokens that refills
+continuously at `limit / period` tokens per second. A request takes one
+token, or is answered with 429 and `Retry-After` when the bucket is empty.
+So short bursts up to `limit` go through, but the long-run rate is capped.
+
+Buckets live in process memory by default (`MemoryBucketStore`), which
+costs a dict lookup and a little arithmetic per request. With several
+workers, point `RATE_LIMIT_STORE` at a SQLite file instead
+(`SQLiteBucketStore`). Every worker then draws from the same buckets, at the
+price of one short write transaction per request.
+
+Each bucket also records when it will be full again. A full bucket is the
+same as no bucket, so both stores drop those: the memory store when it
+reaches `max_keys`, the SQLite store every `prune_every` requests.
+
+Responses from limited routes carry the `RateLimit-Limit`,
+`RateLimit-Remaining` and `RateLimit-Reset` headers. Reset is the number of
+seconds until the bucket is full again.
+"""
+import itertools
+import math
+import re
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+_RATE = re.compile(r'^\s*(\d+)\s*/\s*(\d*(?:\.\d+)?)\s*([a-z]*)\s*$')
+_UNITS = {'': 1, 's': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60,
+          'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(value):
+    """'30/minute', '5/10s' or '100/hour' -> (limit, period_seconds). Empty or '0' -> None (no limit)."""
+    if not value or value.strip().lower() in ('0', 'off', 'none'):
+        return None
+    match = _RATE.match(value.lower())
+    unit = match and match.group(3)
+    if unit and unit not in _UNITS and unit.endswith('s'):
+        unit = unit[:-1]  # 'minutes' -> 'minute'
+    if not match or unit not in _UNITS:
+        raise ValueError(f'Invalid rate {value!r}; expected e.g. "30/minute" or "5/10s"')
+    return int(match.group(1)), float(match.group(2) or 1) * _UNITS[unit]
+
+
+class RateLimitResult:
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset_after', 'retry_after')
+
+    def __init__(self, allowed, limit, remaining, reset_after, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_after = reset_after
+        self.retry_after = retry_after
+
+    def headers(self):
+        headers = {
+            'RateLimit-Limit': str(self.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _take(tokens, updated, now, limit, rate, cost):
+    """Refill a bucket to `now` and try to take `cost` tokens. Returns (tokens, allowed)."""
+    tokens = min(limit, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, True
+    return tokens, False
+
+
+def _full_at(tokens, now, limit, rate):
+    """When a bucket holding `tokens` at `now` will have refilled to `limit`."""
+    return now + (limit - tokens) / rate
+
+
+def _result(tokens, allowed, limit, rate, cost):
+    return RateLimitResult(
+        allowed, limit, int(tokens),
+        (limit - tokens) / rate,
+        0.0 if allowed else (cost - tokens) / rate,
+    )
+
+
+class MemoryBucketStore:
+    """Buckets in a dict, for a single worker process."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> [tokens, updated, full_at]
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period, cost=1):
+        rate = limit / period
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = [float(limit), now, now]
+            tokens, allowed = _take(bucket[0], bucket[1], now, limit, rate, cost)
+            bucket[:] = tokens, now, _full_at(tokens, now, limit, rate)
+        return _result(tokens, allowed, limit, rate, cost)
+
+    def _prune(self, now):
+        # Routes have different rates, so each bucket is judged by its own refill time
+        stale = [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in stale or list(self._buckets)[:len(self._buckets) // 10 or 1]:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite table, shared by every worker that opens the same file."""
+
+    def __init__(self, path, timeout=5.0, prune_every=1000):
+        self.path = path
+        self.timeout = timeout
+        self.prune_every = prune_every
+        self._hits = itertools.count(1)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                     'updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)')
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(rate_buckets)')]
+        if 'full_at' not in columns:
+            # Tables from before full_at: their rows count as full, i.e. as fresh buckets
+            conn.execute('ALTER TABLE rate_buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; hit() manages its own transaction
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, period, cost=1):
+        rate = limit / period
+        # Wall-clock time: monotonic clocks aren't comparable across processes
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (float(limit), now)
+            tokens, allowed = _take(tokens, min(updated, now), now, limit, rate, cost)
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                         (key, tokens, now, _full_at(tokens, now, limit, rate)))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if self.prune_every and next(self._hits) % self.prune_every == 0:
+            self.prune()
+        return _result(tokens, allowed, limit, rate, cost)
+
+    def prune(self):
+        """Delete buckets that have refilled completely. Returns how many were deleted."""
+        return self._conn().execute('DELETE FROM rate_buckets WHERE full_at <= ?', (time.time(),)).rowcount
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+
+
+class RateLimiter:
+    """Flask glue: `@limiter.limit('30/minute')` on a view keys the bucket by route and user.
+
+    Anonymous requests are keyed by client address. The rate-limit headers
+    are added by an `after_request` hook, so they also appear on responses
+    the view returns as tuples.
+    """
+
+    def __init__(self, app=None, store=None):
+        self.store = store or MemoryBucketStore()
+        self.allowed = {}
+        self.limited = {}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def _count(self, counter, scope):
+        with self._stats_lock:
+            counter[scope] = counter.get(scope, 0) + 1
+
+    def limit(self, rate, scope=None):
+        parsed = parse_rate(rate) if isinstance(rate, str) or rate is None else rate
+
+        def decorator(view):
+            if parsed is None:
+                return view
+            limit, period = parsed
+            name = scope or view.__name__
+
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                from flask import g, jsonify, request, session
+
+                user = session.get('user_id')
+                key = f'{name}:{user}' if user is not None else f'{name}:ip:{request.remote_addr}'
+                result = self.store.hit(key, limit, period)
+                g.rate_limit = result
+                if not result.allowed:
+                    self._count(self.limited, name)
+                    return jsonify({'error': 'Too many requests, please slow down',
+                                    'retry_after': max(1, math.ceil(result.retry_after))}), 429
+                self._count(self.allowed, name)
+                return view(*args, **kwargs)
+
+            return wrapped
+
+        return decorator
+
+    def after_request(self, response):
+        from flask import g
+
+        result = g.pop('rate_limit', None)
+        if result is not None:
+            response.headers.update(result.headers())
+        return response
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'store': type(self.store).__name__,
+                'allowed': dict(self.allowed),
+                'limited': dict(self.limited),
+            }
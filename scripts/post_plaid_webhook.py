@@ -0,0 +1,92 @@
+"""Post sample Plaid webhooks to a locally running app.
+
+The app only accepts these when PLAID_ENV=sandbox and PLAID_WEBHOOK_DEV_SECRET
+is set (in .env or the environment); the same secret signs the bodies here.
+
+Usage:
+    python scripts/post_plaid_webhook.py --item-id <plaid item_id> [--code SYNC_UPDATES_AVAILABLE] [--repeat 3]
+    python scripts/post_plaid_webhook.py --list
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plaid_webhooks import DEV_SIGNATURE_HEADER, dev_signature  # noqa: E402
+
+SAMPLE_PAYLOADS = {
+    'SYNC_UPDATES_AVAILABLE': {
+        'webhook_type': 'TRANSACTIONS',
+        'webhook_code': 'SYNC_UPDATES_AVAILABLE',
+        'initial_update_complete': True,
+        'historical_update_complete': False,
+        'environment': 'sandbox',
+    },
+    'DEFAULT_UPDATE': {
+        'webhook_type': 'TRANSACTIONS',
+        'webhook_code': 'DEFAULT_UPDATE',
+        'new_transactions': 3,
+        'environment': 'sandbox',
+    },
+    'HISTORICAL_UPDATE': {
+        'webhook_type': 'TRANSACTIONS',
+        'webhook_code': 'HISTORICAL_UPDATE',
+        'new_transactions': 231,
+        'environment': 'sandbox',
+    },
+    'TRANSACTIONS_REMOVED': {
+        'webhook_type': 'TRANSACTIONS',
+        'webhook_code': 'TRANSACTIONS_REMOVED',
+        'removed_transactions': ['yBVBEwrPyJs8GvR77N7QTxnGg6wG74H7dEDN6'],
+        'environment': 'sandbox',
+    },
+    'ITEM_ERROR': {
+        'webhook_type': 'ITEM',
+        'webhook_code': 'ERROR',
+        'error': {'error_type': 'ITEM_ERROR', 'error_code': 'ITEM_LOGIN_REQUIRED'},
+        'environment': 'sandbox',
+    },
+}
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000/plaid/webhook')
+    parser.add_argument('--item-id', help='Plaid item_id of a connected account (see the plaid_item table)')
+    parser.add_argument('--code', default='SYNC_UPDATES_AVAILABLE', choices=sorted(SAMPLE_PAYLOADS))
+    parser.add_argument('--repeat', type=int, default=1, help='send the same webhook N times to see deduplication')
+    parser.add_argument('--secret', default=os.getenv('PLAID_WEBHOOK_DEV_SECRET'))
+    parser.add_argument('--unsigned', action='store_true', help='omit the signature (should be rejected)')
+    parser.add_argument('--list', action='store_true', help='print the sample payloads and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        print(json.dumps(SAMPLE_PAYLOADS, indent=2))
+        return
+    if not args.item_id:
+        parser.error('--item-id is required')
+    if not args.secret and not args.unsigned:
+        parser.error('set PLAID_WEBHOOK_DEV_SECRET (or pass --secret)')
+
+    payload = dict(SAMPLE_PAYLOADS[args.code], item_id=args.item_id)
+    body = json.dumps(payload).encode()
+    headers = {'Content-Type': 'application/json'}
+    if not args.unsigned:
+        headers[DEV_SIGNATURE_HEADER] = dev_signature(args.secret, body)
+
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        resp = requests.post(args.url, data=body, headers=headers, timeout=10)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{args.code} -> {resp.status_code} in {elapsed:.1f} ms: {resp.text.strip()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Embedding-based answer cache for common advisor questions.
+
+Questions are normalized, embedded, and stored as unit vectors in one NumPy
+matrix. A lookup is a single matrix-vector product: the best cosine
+similarity at or above `threshold` returns the stored answer with no LLM
+call. When the cache is full, the least recently used (`policy='lru'`) or
+least frequently used (`policy='lfu'`) entry is overwritten.
+
+Every entry has a `scope`, any hashable value. A question only matches
+entries stored under the same scope. The app scopes entries by model and
+generation options. For questions that quote figures, it adds the user.
+
+`OllamaEmbedder` uses a local Ollama embedding model for real semantic
+matches. `HashingEmbedder` is a deterministic, dependency-free stand-in for
+tests and benchmarks: word and character-trigram feature hashing. It
+catches rewordings and typos of the same question, but it can't tell "good"
+from "bad" or 500 from 900. Never use it to serve real answers.
+"""
+import re
+import threading
+import time
+import zlib
+
+import requests
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+_FIGURES = re.compile(r"\d|[£$€]")
+
+
+def _np():
+    """NumPy, imported on first use so importing this module (and the app) stays fast."""
+    import numpy
+    return numpy
+
+
+def normalize_question(text):
+    return _SPACE.sub(' ', _PUNCT.sub(' ', text.lower())).strip()
+
+
+def mentions_figures(text):
+    """True if the question quotes amounts or other numbers, which are likely the asker's own."""
+    return bool(_FIGURES.search(text))
+
+
+class HashingEmbedder:
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed(self, text):
+        np = _np()
+        vec = np.zeros(self.dim, dtype=np.float32)
+        words = text.split()
+        features = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+        padded = f' {text} '
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            h = zlib.crc32(feature.encode())
+            # Sign bit from the hash keeps unrelated features from only adding up
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vec
+
+
+class OllamaEmbedder:
+    def __init__(self, base_url, model='nomic-embed-text', dim=None):
+        self.base_url = base_url
+        self.model = model
+        self.dim = dim  # None: taken from the first embedding the model returns
+
+    def embed(self, text):
+        np = _np()
+        resp = requests.post(f'{self.base_url}/api/embeddings',
+                             json={'model': self.model, 'prompt': text}, timeout=10)
+        resp.raise_for_status()
+        return np.asarray(resp.json()['embedding'], dtype=np.float32)
+
+
+class SemanticCache:
+    def __init__(self, embedder, capacity=512, threshold=0.9, policy='lru'):
+        np = _np()
+        if policy not in ('lru', 'lfu'):
+            raise ValueError("policy must be 'lru' or 'lfu'")
+        self.embedder = embedder
+        self.capacity = capacity
+        self.threshold = threshold
+        self.policy = policy
+        self._vectors = None  # (capacity, dim), allocated once the embedding size is known
+        if embedder.dim:
+            self._vectors = np.zeros((capacity, embedder.dim), dtype=np.float32)
+        self._keys = [None] * capacity  # (scope, normalized question)
+        self._answers = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._uses = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self._lookup_ms = 0.0
+        self._miss_ms = [0, 0.0]  # LLM calls timed via record_miss_latency
+
+    def _vector(self, normalized):
+        np = _np()
+        vec = self.embedder.embed(normalized)
+        if self._vectors is not None and vec.shape != self._vectors.shape[1:]:
+            raise ValueError(f'Embedding has {vec.size} dimensions, the cache holds {self._vectors.shape[1]}')
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def lookup(self, question, scope=None):
+        """Return (answer, similarity) for the closest cached question in `scope`, or (None, best_similarity).
+
+        On a miss, `best_similarity` is over all entries, whatever their scope.
+        """
+        np = _np()
+        started = time.perf_counter()
+        normalized = normalize_question(question)
+        vec = self._vector(normalized) if normalized else None
+        with self._lock:
+            self.lookups += 1
+            answer, best = None, 0.0
+            if vec is not None and self._size:
+                sims = self._vectors[:self._size] @ vec
+                best = float(sims.max())
+                # Only the few entries over the threshold need their scope checked, best first
+                close = np.flatnonzero(sims >= self.threshold)
+                idx = next((int(i) for i in close[np.argsort(-sims[close])] if self._keys[i][0] == scope), None)
+                if idx is not None:
+                    best = float(sims[idx])
+                    answer = self._answers[idx]
+                    self._last_used[idx] = time.monotonic()
+                    self._uses[idx] += 1
+                    self.hits += 1
+            self._lookup_ms += (time.perf_counter() - started) * 1000
+        return answer, best
+
+    def insert(self, question, answer, scope=None):
+        np = _np()
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        vec = self._vector(normalized)
+        key = (scope, normalized)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, vec.size), dtype=np.float32)
+            if key in self._keys[:self._size]:
+                idx = self._keys.index(key)
+            elif self._size < self.capacity:
+                idx = self._size
+                self._size += 1
+            else:
+                if self.policy == 'lru':
+                    idx = int(np.argmin(self._last_used))
+                else:
+                    # Fewest uses first; ties broken by least recently used
+                    idx = int(np.lexsort((self._last_used, self._uses))[0])
+                self.evictions += 1
+            self._vectors[idx] = vec
+            self._keys[idx] = key
+            self._answers[idx] = answer
+            self._last_used[idx] = time.monotonic()
+            self._uses[idx] = 0
+
+    def record_miss_latency(self, elapsed_ms):
+        """Time of an LLM call a hit would have avoided; used to estimate latency saved."""
+        with self._lock:
+            self._miss_ms[0] += 1
+            self._miss_ms[1] += elapsed_ms
+
+    def stats(self):
+        with self._lock:
+            avg_miss = self._miss_ms[1] / self._miss_ms[0] if self._miss_ms[0] else None
+            avg_lookup = self._lookup_ms / self.lookups if self.lookups else 0.0
+            return {
+                'entries': self._size,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'evictions': self.evictions,
+                'avg_lookup_ms': avg_lookup,
+                'latency_saved_ms': (avg_miss - avg_lookup) * self.hits if avg_miss is not None else None,
+            }
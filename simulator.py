@@ -0,0 +1,220 @@
+"""Monte Carlo savings and investment simulator behind /api/simulate.
+
+Each path starts at `initial` and then, month by month, grows by a random
+return and receives `monthly_contribution`. Monthly log-returns are normal.
+Their drift is chosen so the expected annual return equals `annual_return`,
+and their spread gives an annual volatility of `volatility` (both in
+percent). The result is a set of yearly percentile bands across all
+paths, in nominal terms and deflated by `inflation`.
+
+Paths are simulated in fixed-size chunks, each with its own seed spawned
+from `seed`. So a run gives the same numbers whether it executes in
+process or on the process pool (runs over `pool_threshold` paths), and
+identical parameters can be served from an LRU cache.
+
+Each chunk reduces its paths to percentiles and counts as it goes. The
+full (years x paths) matrix is never kept, and workers return a few
+kilobytes. Bands for runs of several chunks are the size-weighted mean of
+the chunk percentiles. With 50,000 paths per chunk, that differs from
+the exact pooled percentile by less than the sampling noise.
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+PERCENTILES = (5, 25, 50, 75, 95)
+MAX_PATHS = 1_000_000
+MAX_YEARS = 60
+CHUNK_PATHS = 50_000
+
+# name -> (default, lowest, highest)
+PARAMS = {
+    'initial': (1000.0, 0.0, 1e9),
+    'monthly_contribution': (0.0, 0.0, 1e7),
+    'years': (10, 1, MAX_YEARS),
+    'annual_return': (5.0, -50.0, 50.0),
+    'volatility': (15.0, 0.0, 100.0),
+    'inflation': (2.0, -10.0, 50.0),
+    'paths': (10_000, 100, MAX_PATHS),
+    'seed': (0, 0, 2 ** 32 - 1),
+    'target': (None, 0.0, 1e12),
+}
+_INTEGER_PARAMS = ('years', 'paths', 'seed')
+
+
+def _np():
+    """NumPy, imported on first use so importing this module (and the app) stays fast."""
+    import numpy
+    return numpy
+
+
+def parse_params(data, max_paths=MAX_PATHS):
+    """Validated, normalized simulation parameters from a request body. Raises ValueError."""
+    params = {}
+    for name, (default, low, high) in PARAMS.items():
+        if name == 'paths':
+            high = min(high, max_paths)
+        value = data.get(name)
+        if value is None or value == '':
+            params[name] = default
+            continue
+        try:
+            value = int(value) if name in _INTEGER_PARAMS else float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a number')
+        if not (low <= value <= high) or (isinstance(value, float) and math.isnan(value)):
+            raise ValueError(f'{name} must be between {low:g} and {high:g}')
+        params[name] = value
+    return params
+
+
+def simulate_chunk(seed_seq, n_paths, params):
+    """Summary of one chunk of paths: yearly percentiles, shape (len(PERCENTILES), years + 1), and final-year counts."""
+    np = _np()
+    years = params['years']
+    sigma = params['volatility'] / 100 / math.sqrt(12)
+    # E[exp(N(mu, s^2))] = exp(mu + s^2 / 2), so this drift gives (1 + r) per year on average
+    mu = math.log1p(params['annual_return'] / 100) / 12 - sigma ** 2 / 2
+    contribution = params['monthly_contribution']
+
+    rng = np.random.default_rng(seed_seq)
+    balance = np.full(n_paths, params['initial'], dtype=np.float64)
+    bands = np.empty((len(PERCENTILES), years + 1))
+    bands[:, 0] = params['initial']
+    growth = np.empty(n_paths, dtype=np.float32)
+    for month in range(1, years * 12 + 1):
+        if sigma:
+            rng.standard_normal(n_paths, dtype=np.float32, out=growth)
+            growth *= sigma
+            growth += mu
+            np.exp(growth, out=growth)
+            balance *= growth
+        else:
+            balance *= math.exp(mu)
+        balance += contribution
+        if month % 12 == 0:
+            bands[:, month // 12] = np.percentile(balance, PERCENTILES)
+
+    contributed = params['initial'] + contribution * 12 * years
+    return {
+        'paths': n_paths,
+        'bands': bands,
+        'final_sum': float(balance.sum()),
+        'losses': int((balance < contributed).sum()),
+        'on_target': int((balance >= params['target']).sum()) if params['target'] is not None else 0,
+    }
+
+
+def _chunks(params):
+    np = _np()
+    paths = params['paths']
+    sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS)
+    if paths % CHUNK_PATHS:
+        sizes.append(paths % CHUNK_PATHS)
+    return zip(np.random.SeedSequence(params['seed']).spawn(len(sizes)), sizes)
+
+
+def _summarize(parts, params):
+    np = _np()
+    years = np.arange(params['years'] + 1)
+    paths = sum(part['paths'] for part in parts)
+    bands = sum(part['bands'] * part['paths'] for part in parts) / paths
+    deflator = (1 + params['inflation'] / 100) ** years
+    contributed = params['initial'] + params['monthly_contribution'] * 12 * years
+    median_final = float(bands[PERCENTILES.index(50), -1])
+    summary = {
+        'median_final': median_final,
+        'mean_final': sum(part['final_sum'] for part in parts) / paths,
+        'median_final_real': median_final / float(deflator[-1]),
+        'prob_loss': sum(part['losses'] for part in parts) / paths,
+    }
+    if params['target'] is not None:
+        summary['prob_target'] = sum(part['on_target'] for part in parts) / paths
+    return {
+        'years': years.tolist(),
+        'percentiles': list(PERCENTILES),
+        'bands': {f'p{p}': np.round(band, 2).tolist() for p, band in zip(PERCENTILES, bands)},
+        'real_bands': {f'p{p}': np.round(band / deflator, 2).tolist() for p, band in zip(PERCENTILES, bands)},
+        'contributed': np.round(contributed, 2).tolist(),
+        'summary': {k: round(v, 4) if k.startswith('prob') else round(v, 2) for k, v in summary.items()},
+    }
+
+
+class Simulator:
+    def __init__(self, cache_size=128, pool_threshold=200_000, max_workers=None):
+        self.cache_size = cache_size
+        self.pool_threshold = pool_threshold
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+        self.hits = 0
+        self.misses = 0
+        self.pool_runs = 0
+        self.paths_simulated = 0
+        self._sim_ms = 0.0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the web server has threads (and locks) a fork would copy mid-use
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _simulate(self, params):
+        chunks = list(_chunks(params))
+        if params['paths'] > self.pool_threshold and self.max_workers > 1:
+            pool = self._executor()
+            futures = [pool.submit(simulate_chunk, seed, size, params) for seed, size in chunks]
+            parts = [f.result() for f in futures]
+            with self._lock:
+                self.pool_runs += 1
+            return parts
+        return [simulate_chunk(seed, size, params) for seed, size in chunks]
+
+    def run(self, params):
+        """Simulate `params` (from parse_params). Returns (result, cached)."""
+        key = tuple(sorted(params.items()))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key], True
+            self.misses += 1
+
+        started = time.perf_counter()
+        result = _summarize(self._simulate(params), params)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result['paths'] = params['paths']
+        result['elapsed_ms'] = round(elapsed_ms, 1)
+
+        with self._lock:
+            self.paths_simulated += params['paths']
+            self._sim_ms += elapsed_ms
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'pool_runs': self.pool_runs,
+                'workers': self.max_workers,
+                'paths_per_s': self.paths_simulated / (self._sim_ms / 1000) if self._sim_ms else None,
+            }
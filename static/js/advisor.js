@@ -1,5 +1,6 @@
 // Advisor chat client for llama via Flask proxy
 // Uses /api/advisor_chat which calls a local Ollama server (http://localhost:11434)
+// The server keeps the conversation history; we only send the new message.
 
 (function() {
   const form = document.getElementById('advisor-form');
@@ -18,7 +19,7 @@
     presence_penalty: 0.6,
   };
 
-  const conversation = [];
+  let conversationId = null;
 
   function appendBubble(role, text) {
     const wrap = document.createElement('div');
@@ -43,7 +44,8 @@
   async function sendMessage(prompt) {
     const body = {
       model: 'llama3.2:3b',
-      messages: conversation,
+      conversation_id: conversationId,
+      message: prompt,
       options: {
         temperature: params.temperature,
         top_p: params.top_p,
@@ -67,6 +69,7 @@
     }
 
     const data = await resp.json();
+    conversationId = data.conversation_id || conversationId;
     let reply = (data.bot || '').trim();
     // Strip common markdown: **bold**, *italic*, `code`, headings
     reply = reply
@@ -92,19 +95,13 @@
     if (!text) return;
 
     appendBubble('user', text);
-    conversation.push({ role: 'user', content: text });
 
     input.value = '';
     setLoading(true);
 
     try {
-      // Encourage concise answers on first turn
-      if (conversation.length === 1) {
-        conversation.unshift({ role: 'system', content: 'Keep answers concise, practical, and student-friendly.' });
-      }
       const reply = await sendMessage(text);
       appendBubble('assistant', reply);
-      conversation.push({ role: 'assistant', content: reply });
     } catch (err) {
       appendBubble('assistant', 'Sorry, there was an error contacting the advisor.');
       console.error(err);
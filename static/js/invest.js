@@ -7,6 +7,9 @@
   const yearsEl = document.getElementById('years');
   const freqEl = document.getElementById('frequency');
   const showDebtEl = document.getElementById('showDebt');
+  const showRangeEl = document.getElementById('showRange');
+  const volatilityEl = document.getElementById('volatility');
+  const volatilityFieldEl = document.getElementById('volatilityField');
   const updateBtn = document.getElementById('updateBtn');
   const resetBtn = document.getElementById('resetBtn');
   const chartCanvas = document.getElementById('growthChart');
@@ -17,8 +20,13 @@
   const debtLegendEl = document.getElementById('debtLegend');
   const finalDebtEl = document.getElementById('finalDebt');
   const debtInterestEl = document.getElementById('debtInterest');
+  const rangeLegendEl = document.getElementById('rangeLegend');
+  const rangeStatEl = document.getElementById('rangeStat');
+  const rangeFinalEl = document.getElementById('rangeFinal');
+  const rangeSubEl = document.getElementById('rangeSub');
 
   let chart;
+  let rangeRequest = 0;
 
   function sanitizePositiveNum(el, fallback){
     const v = parseFloat(el.value);
@@ -58,6 +66,43 @@
     };
   }
 
+  // Percentile bands from the server-side Monte Carlo simulator (one point per year)
+  async function fetchRange(principal, aprPct, years, volatility){
+    const response = await fetch('/api/simulate', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ initial: principal, annual_return: aprPct, years: Math.max(1, Math.round(years)), volatility, paths: 10000 })
+    });
+    const data = await response.json();
+    if (!data.success) throw new Error(data.error || 'Simulation failed');
+    return data;
+  }
+
+  function alignYearly(labels, yearlyValues){
+    // Chart labels may be monthly/weekly; place yearly values on whole years and let the line span the gaps
+    return labels.map(t => Number.isInteger(t) && t < yearlyValues.length ? yearlyValues[t] : null);
+  }
+
+  async function updateRange(P, r, y, labels){
+    const request = ++rangeRequest;
+    try {
+      const sim = await fetchRange(P, r, y, sanitizePositiveNum(volatilityEl, 15));
+      if (request !== rangeRequest || !showRangeEl.checked) return;
+      const low = makeDataset('Pessimistic (5%)', alignYearly(labels, sim.bands.p5), 'rgba(148,163,184,1)', false);
+      const high = makeDataset('Optimistic (95%)', alignYearly(labels, sim.bands.p95), 'rgba(148,163,184,1)', false);
+      [low, high].forEach(ds => { ds.borderDash = [6, 4]; ds.borderWidth = 2; ds.spanGaps = true; });
+      high.fill = '-1';  // shade between the two bands
+      chart.data.datasets.push(low, high);
+      chart.update();
+      const last = sim.bands.p5.length - 1;
+      rangeFinalEl.textContent = `${formatMoney(sim.bands.p5[last])} – ${formatMoney(sim.bands.p95[last])}`;
+      rangeSubEl.textContent = `Median: ${formatMoney(sim.bands.p50[last])} · chance of ending below what you put in: ${(sim.summary.prob_loss * 100).toFixed(0)}%`;
+    } catch (err) {
+      console.error('Simulation error:', err);
+      rangeSubEl.textContent = 'Could not load the simulation.';
+    }
+  }
+
   function update(){
     const P = sanitizePositiveNum(amountEl, 1000);
     const r = sanitizePositiveNum(rateEl, 5);
@@ -116,6 +161,12 @@
       debtLegendEl.style.display = 'none';
       debtStatEl.style.display = 'none';
     }
+
+    const showRange = !!showRangeEl.checked;
+    volatilityFieldEl.style.display = showRange ? '' : 'none';
+    rangeLegendEl.style.display = showRange ? '' : 'none';
+    rangeStatEl.style.display = showRange ? '' : 'none';
+    if (showRange) updateRange(P, r, y, labels);
   }
 
   function reset(){
@@ -124,6 +175,8 @@
     yearsEl.value = 10;
     freqEl.value = 12;
     showDebtEl.checked = false;
+    showRangeEl.checked = false;
+    volatilityEl.value = 15;
     update();
   }
 
@@ -135,6 +188,7 @@
   yearsEl.addEventListener('input', () => {});
   freqEl.addEventListener('change', () => {});
   showDebtEl.addEventListener('change', update);
+  showRangeEl.addEventListener('change', update);
 
   // First render
   window.addEventListener('load', update);
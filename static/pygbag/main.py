@@ -3,14 +3,49 @@ import sys
 import math
 import random
 import asyncio
+import bisect
+import itertools
+import json
+import time
+import weakref
+from collections import OrderedDict, deque
 from enum import Enum
 
 pygame.init()
 
+surfaces_allocated = 0  # Surfaces the map has created, see new_surface; read by FrameProfiler
+
+def new_surface(size, flags=0):
+    """pygame.Surface, counted in `surfaces_allocated`"""
+    global surfaces_allocated
+    surfaces_allocated += 1
+    return pygame.Surface(size, flags)
+
 # Constants - Extra widescreen with more height
 WIDTH = 2000
 HEIGHT = 1100
 FPS = 60
+PARTICLE_COUNT = 30
+
+# Gameplay advances in fixed steps, however fast frames are drawn
+TICK = 1 / FPS
+MAX_STEPS = 5  # steps per frame at most; a slower machine slows the game down rather than spiralling
+
+# Adaptive quality: the scene is rendered at a scale of the window and upscaled. Each level is
+# (render scale, particle count), best first; frames over budget step down, headroom steps back up.
+ADAPTIVE_QUALITY = True
+QUALITY_LEVELS = ((1.0, PARTICLE_COUNT), (0.75, 20), (0.5, 10))
+FRAME_BUDGET_MS = 1000 / FPS
+
+# The world is a grid of screen-sized zones; the camera follows the character across it
+WORLD_ZONES = (3, 2)
+CHUNK_SIZE = 512  # the static ground is rendered lazily in chunks this size
+MAX_CHUNKS = 48   # chunks kept around; the farthest from the camera are evicted first
+
+# Dirty-rectangle rendering: only regions touched by moving things are redrawn and pushed
+DIRTY_RECTS = False
+DIRTY_TILE = 32          # dirty regions are tracked on a grid of tiles this size
+DIRTY_AREA_LIMIT = 0.35  # above this share of the screen a full flip is cheaper
 
 class Colors:
     # Sunset sky - vibrant gradient
@@ -69,69 +104,237 @@ class Location(Enum):
     BANK = "bank-api"
     NONE = None
 
+class TextCache:
+    """Fonts by (name, size, bold) and rendered text by (string, color, font, alpha), shared by the whole map.
+    
+    Fonts are few and kept for good; rendered surfaces are evicted least recently used beyond `max_surfaces`.
+    Cached surfaces are shared, so callers must not draw on them.
+    """
+    def __init__(self, max_surfaces=256):
+        self.max_surfaces = max_surfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.font_loads = 0
+        self.renders = 0
+        self.hits = 0
+        
+    def font(self, size, name=None, bold=False, fallback_size=None):
+        key = (name, size, bold)
+        if key not in self.fonts:
+            self.font_loads += 1
+            if name is None:
+                self.fonts[key] = pygame.font.Font(None, size)
+            else:
+                try:
+                    self.fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+                except:
+                    self.fonts[key] = pygame.font.Font(None, fallback_size or size)
+        return self.fonts[key]
+    
+    def render(self, text, color, size, name=None, bold=False, fallback_size=None, alpha=None):
+        global surfaces_allocated
+        key = (text, color, size, name, bold, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        surfaces_allocated += 1
+        self.renders += 1
+        surface = self.font(size, name, bold, fallback_size).render(text, True, color)
+        if alpha is not None:
+            surface.set_alpha(alpha)
+        self.surfaces[key] = surface
+        while len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def stats(self):
+        return {
+            'fonts': len(self.fonts),
+            'surfaces': len(self.surfaces),
+            'font_loads': self.font_loads,
+            'renders': self.renders,
+            'hits': self.hits,
+        }
+
+text_cache = TextCache()
+
+_scaled_sprites = weakref.WeakKeyDictionary()
+
+def scaled(sprite, scale):
+    """`sprite` resized by `scale`, smoothscaled once per sprite and scale and dropped along with the sprite"""
+    global surfaces_allocated
+    if scale == 1:
+        return sprite
+    copies = _scaled_sprites.setdefault(sprite, {})
+    if scale not in copies:
+        surfaces_allocated += 1
+        width, height = sprite.get_size()
+        copies[scale] = pygame.transform.smoothscale(
+            sprite, (max(1, round(width * scale)), max(1, round(height * scale))))
+    return copies[scale]
+
 class Particle:
-    """Floating sparkle particles"""
-    def __init__(self):
-        self.reset()
-        
-    def reset(self):
-        self.x = random.randint(0, WIDTH)
-        self.y = random.randint(0, HEIGHT)
-        self.size = random.choice([2, 2, 3, 3, 4])
-        colors = [(255, 255, 220), (255, 240, 200), (250, 220, 255), (220, 255, 255)]
-        self.color = random.choice(colors)
-        self.speed_y = -0.2 - random.random() * 0.4
-        self.speed_x = (random.random() - 0.5) * 0.3
-        self.alpha = 150 + random.randint(0, 80)
-        self.pulse_speed = 0.05 + random.random() * 0.05
-        self.pulse = random.random() * math.pi * 2
-        
+    __slots__ = ('x', 'y', 'speed_x', 'speed_y', 'pulse', 'pulse_speed', 'alpha', 'size', 'color')
+
+class ParticleSystem:
+    """Floating sparkle particles: a pool of `__slots__` objects, reused when they float off the top.
+    
+    Glow sprites are pre-rendered for every color, size and alpha bucket, so drawing is a single
+    `blits` call with no per-particle Surface or circle drawing. Plain Python rather than NumPy:
+    there are at most a few dozen particles, and the browser build would download NumPy for them.
+    """
+    COLORS = [(255, 255, 220), (255, 240, 200), (250, 220, 255), (220, 255, 255)]
+    SIZES = [2, 2, 3, 3, 4]
+    ALPHA_STEP = 8  # alpha buckets are this wide
+    
+    def __init__(self, count, width=WIDTH, height=HEIGHT, depth_y=420):
+        self.width = width
+        self.height = height
+        self.depth_y = depth_y  # particles below this line are drawn behind trees and buildings
+        # Seeded from `random`, so a seeded game replays the same particles
+        self.rng = random.Random(random.getrandbits(32))
+        self.sizes = sorted(set(self.SIZES))
+        self.size_index = {size: i for i, size in enumerate(self.sizes)}
+        self.atlas = self.render_atlas()
+        self.atlases = {1: self.atlas}  # render scale -> atlas
+        
+        self.particles = []
+        self.spare = []  # particles dropped by resize, kept for the next time it grows
+        self.resize(count)
+        
+    def render_atlas(self):
+        """Flat list of glow sprites indexed by (color, size, alpha bucket)"""
+        atlas = []
+        for color in self.COLORS:
+            for size in self.sizes:
+                for bucket in range(256 // self.ALPHA_STEP):
+                    alpha = bucket * self.ALPHA_STEP
+                    surf = new_surface((size * 3, size * 3), pygame.SRCALPHA)
+                    for i in range(size, 0, -1):
+                        a = alpha // (size - i + 1)
+                        pygame.draw.circle(surf, (*color, a), (size + 1, size + 1), i)
+                    atlas.append(surf.convert_alpha())
+        return atlas
+    
+    def __len__(self):
+        return len(self.particles)
+    
+    def resize(self, count):
+        """Grow or shrink to `count` particles; new ones start anywhere on screen"""
+        while len(self.particles) > count:
+            self.spare.append(self.particles.pop())
+        while len(self.particles) < count:
+            p = self.spare.pop() if self.spare else Particle()
+            self.spawn(p)
+            p.y = float(self.rng.randint(0, self.height))
+            self.particles.append(p)
+    
+    def spawn(self, p):
+        """(Re)start `p` just below the bottom edge"""
+        rng = self.rng
+        p.x = float(rng.randint(0, self.width))
+        p.y = self.height + 10.0
+        p.size = rng.choice(self.SIZES)
+        p.color = rng.randrange(len(self.COLORS))
+        p.speed_y = -0.2 - rng.random() * 0.4
+        p.speed_x = (rng.random() - 0.5) * 0.3
+        p.alpha = 150.0 + rng.randint(0, 80)
+        p.pulse_speed = 0.05 + rng.random() * 0.05
+        p.pulse = rng.random() * math.pi * 2
+    
     def update(self):
-        self.y += self.speed_y
-        self.x += self.speed_x
-        self.pulse += self.pulse_speed
-        
-        if self.y < -10:
-            self.reset()
-            self.y = HEIGHT + 10
-            
-    def draw(self, screen):
-        brightness = 0.6 + 0.4 * abs(math.sin(self.pulse))
-        surf = pygame.Surface((self.size * 3, self.size * 3), pygame.SRCALPHA)
-        alpha = int(self.alpha * brightness)
-        
-        # Glow
-        for i in range(self.size, 0, -1):
-            a = alpha // (self.size - i + 1)
-            color = (*self.color, a)
-            pygame.draw.circle(surf, color, (self.size + 1, self.size + 1), i)
-        
-        screen.blit(surf, (self.x - self.size - 1, self.y - self.size - 1))
+        for p in self.particles:
+            p.y += p.speed_y
+            p.x += p.speed_x
+            p.pulse += p.pulse_speed
+            # Particles that float off the top come back from the bottom, re-randomized
+            if p.y < -10:
+                self.spawn(p)
+    
+    def mark_dirty(self, grid, tile):
+        """Flag the tiles of `grid` (rows of `tile` px columns) that any particle sprite touches"""
+        last_row, last_col = len(grid) - 1, len(grid[0]) - 1
+        for p in self.particles:
+            left = p.x - p.size - 1
+            top = p.y - p.size - 1
+            # Sprites are smaller than a tile, so their four corners cover every tile they touch
+            x0 = min(max(int(left // tile), 0), last_col)
+            x1 = min(max(int((left + p.size * 3) // tile), 0), last_col)
+            y0 = min(max(int(top // tile), 0), last_row)
+            y1 = min(max(int((top + p.size * 3) // tile), 0), last_row)
+            grid[y0][x0] = grid[y0][x1] = grid[y1][x0] = grid[y1][x1] = 1
+    
+    def blit_sequence(self, behind, scale=1):
+        """(sprite, position) pairs for one depth layer at render `scale`, ready for `Surface.blits`"""
+        if scale not in self.atlases:
+            self.atlases[scale] = [scaled(sprite, scale) for sprite in self.atlas]
+        atlas = self.atlases[scale]
+        buckets = 256 // self.ALPHA_STEP
+        sequence = []
+        for p in self.particles:
+            if (p.y > self.depth_y) != behind:
+                continue
+            alpha = int(p.alpha * (0.6 + 0.4 * abs(math.sin(p.pulse))))
+            index = (p.color * len(self.sizes) + self.size_index[p.size]) * buckets + alpha // self.ALPHA_STEP
+            offset = p.size + 1
+            sequence.append((atlas[index], ((p.x - offset) * scale, (p.y - offset) * scale)))
+        return sequence
+    
+    def draw(self, screen, behind, scale=1):
+        screen.blits(self.blit_sequence(behind, scale), doreturn=False)
+
+_tree_sprites = {}
 
 class Tree:
     def __init__(self, x, y, size):
         self.x = x
         self.y = y
         self.size = size
+        self.bounds = self.get_bounds()
+        self.depth = y + int(size * 1.3) // 2  # scene order: by the foot of the trunk
         
     def update(self):
         pass  # No animation for simplicity
         
-    def draw(self, screen):
+    def get_bounds(self):
+        trunk_w = int(self.size * 0.35)
+        trunk_h = int(self.size * 1.3)
+        trunk = pygame.Rect(self.x - trunk_w // 2, self.y - trunk_h // 2, trunk_w, trunk_h)
+        foliage_size = int(self.size * 1.0)
+        foliage_y = int(trunk.y - self.size * 0.35)
+        foliage = pygame.Rect(self.x - foliage_size, foliage_y - foliage_size, foliage_size * 2 + 1, foliage_size * 2 + 4)
+        return trunk.union(foliage).inflate(4, 4)
+    
+    def sprite(self):
+        """Trees of one size look the same, so they share a sprite"""
+        if self.size not in _tree_sprites:
+            sprite = new_surface(self.bounds.size, pygame.SRCALPHA)
+            self.draw_shape(sprite, self.x - self.bounds.x, self.y - self.bounds.y)
+            _tree_sprites[self.size] = sprite.convert_alpha()
+        return _tree_sprites[self.size]
+        
+    def draw(self, screen, offset=(0, 0), scale=1):
+        screen.blit(scaled(self.sprite(), scale),
+                    ((self.bounds.x - offset[0]) * scale, (self.bounds.y - offset[1]) * scale))
+        
+    def draw_shape(self, surface, x, y):
         # Defined trunk with outline
         trunk_w = int(self.size * 0.35)
         trunk_h = int(self.size * 1.3)
-        trunk_x = self.x - trunk_w // 2
-        trunk_y = self.y - trunk_h // 2
+        trunk_x = x - trunk_w // 2
+        trunk_y = y - trunk_h // 2
         
         # Trunk body
-        pygame.draw.rect(screen, Colors.TRUNK_DARK, 
+        pygame.draw.rect(surface, Colors.TRUNK_DARK, 
                         (trunk_x, trunk_y, trunk_w, trunk_h), border_radius=2)
         # Trunk highlight
-        pygame.draw.rect(screen, Colors.TRUNK_LIGHT, 
+        pygame.draw.rect(surface, Colors.TRUNK_LIGHT, 
                         (trunk_x + 2, trunk_y + 2, trunk_w // 3, trunk_h - 4))
         # Trunk outline
-        pygame.draw.rect(screen, (80, 50, 30), 
+        pygame.draw.rect(surface, (80, 50, 30), 
                         (trunk_x, trunk_y, trunk_w, trunk_h), 2, border_radius=2)
         
         # Defined circular foliage with layers
@@ -139,21 +342,26 @@ class Tree:
         foliage_y = int(trunk_y - self.size * 0.35)
         
         # Dark layer (depth)
-        pygame.draw.circle(screen, Colors.LEAF_DARK, (self.x, foliage_y + 3), foliage_size)
+        pygame.draw.circle(surface, Colors.LEAF_DARK, (x, foliage_y + 3), foliage_size)
         # Mid layer
-        pygame.draw.circle(screen, Colors.LEAF_MID, (self.x, foliage_y), foliage_size - 2)
+        pygame.draw.circle(surface, Colors.LEAF_MID, (x, foliage_y), foliage_size - 2)
         # Bright highlight
-        pygame.draw.circle(screen, Colors.LEAF_BRIGHT, 
-                         (self.x - foliage_size // 3, foliage_y - foliage_size // 3), 
+        pygame.draw.circle(surface, Colors.LEAF_BRIGHT, 
+                         (x - foliage_size // 3, foliage_y - foliage_size // 3), 
                          foliage_size // 2.5)
         # Define outline
-        pygame.draw.circle(screen, (50, 100, 35), (self.x, foliage_y), foliage_size, 2)
+        pygame.draw.circle(surface, (50, 100, 35), (x, foliage_y), foliage_size, 2)
+
+# Room around the stickman sprite for its arms, head and line width
+CHARACTER_MARGIN = 5
 
 class Character:
     """Stickman character"""
-    def __init__(self, x, y):
+    def __init__(self, x, y, world_width=WIDTH, world_height=HEIGHT):
         self.x = x
         self.y = y
+        self.world_width = world_width
+        self.world_height = world_height
         self.width = 40
         self.height = 60
         self.speed = 15  # Significantly faster movement
@@ -161,6 +369,7 @@ class Character:
         self.anim_counter = 0
         self.velocity_x = 0
         self.velocity_y = 0
+        self.frames = None
         
     def move(self, dx, dy):
         # Smooth interpolation for movement
@@ -171,6 +380,12 @@ class Character:
         self.velocity_x += (target_vx - self.velocity_x) * 0.3
         self.velocity_y += (target_vy - self.velocity_y) * 0.3
         
+        # Come to a real stop instead of drifting by ever smaller fractions of a pixel
+        if not dx and abs(self.velocity_x) < 0.01:
+            self.velocity_x = 0
+        if not dy and abs(self.velocity_y) < 0.01:
+            self.velocity_y = 0
+        
         if abs(self.velocity_x) > 0.1 or abs(self.velocity_y) > 0.1:
             self.anim_counter += 1
             if self.anim_counter >= 4:  # Faster animation for faster movement
@@ -182,54 +397,96 @@ class Character:
         
         # Constrain to grass area only - don't let character go into sky
         grass_start = int(HEIGHT*0.2)  # 275px - where grass begins
-        self.x = max(50, min(self.x, WIDTH - self.width - 50))
-        self.y = max(grass_start + 20, min(self.y, HEIGHT - self.height - 50))
-        
-    def draw(self, screen):
+        self.x = max(50, min(self.x, self.world_width - self.width - 50))
+        self.y = max(grass_start + 20, min(self.y, self.world_height - self.height - 50))
+        
+    def render_frames(self):
+        """Pre-render the four walking frames, shadow included, as sprites"""
+        self.frames = []
+        for anim_frame in range(4):
+            frame = new_surface((self.width + CHARACTER_MARGIN * 2, self.height + 4 + CHARACTER_MARGIN * 2), pygame.SRCALPHA)
+            self.draw_frame(frame, CHARACTER_MARGIN, CHARACTER_MARGIN, anim_frame)
+            self.frames.append(frame.convert_alpha())
+    
+    def draw(self, screen, offset=(0, 0), scale=1):
+        if self.frames is None:
+            self.render_frames()
+        screen.blit(scaled(self.frames[self.anim_frame], scale),
+                    ((int(self.x) - CHARACTER_MARGIN - offset[0]) * scale,
+                     (int(self.y) - CHARACTER_MARGIN - offset[1]) * scale))
+        
+    def draw_frame(self, surface, x, y, anim_frame):
         # Center point for stickman
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
+        center_x = x + self.width // 2
+        center_y = y + self.height // 2
         
         # Simple shadow
-        shadow_surf = pygame.Surface((self.width, 8), pygame.SRCALPHA)
+        shadow_surf = new_surface((self.width, 8), pygame.SRCALPHA)
         pygame.draw.ellipse(shadow_surf, (0, 0, 0, 60), shadow_surf.get_rect())
-        screen.blit(shadow_surf, (self.x, self.y + self.height - 4))
+        surface.blit(shadow_surf, (x, y + self.height - 4))
         
         stick_color = (40, 40, 50)
         stick_width = 5
         
         # Head (circle)
-        head_y = self.y + 12
-        pygame.draw.circle(screen, stick_color, (center_x, head_y), 10, stick_width)
+        head_y = y + 12
+        pygame.draw.circle(surface, stick_color, (center_x, head_y), 10, stick_width)
         
         # Body (vertical line)
         body_top = head_y + 10
-        body_bottom = self.y + 38
-        pygame.draw.line(screen, stick_color, (center_x, body_top), (center_x, body_bottom), stick_width)
+        body_bottom = y + 38
+        pygame.draw.line(surface, stick_color, (center_x, body_top), (center_x, body_bottom), stick_width)
         
         # Arms - walking animation
         arm_y = body_top + 8
-        if self.anim_frame in [0, 2]:
+        if anim_frame in [0, 2]:
             # Arms neutral/mid
-            pygame.draw.line(screen, stick_color, (center_x, arm_y), (center_x - 12, arm_y + 12), stick_width)
-            pygame.draw.line(screen, stick_color, (center_x, arm_y), (center_x + 12, arm_y + 12), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, arm_y), (center_x - 12, arm_y + 12), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, arm_y), (center_x + 12, arm_y + 12), stick_width)
         else:
             # Arms swinging
-            pygame.draw.line(screen, stick_color, (center_x, arm_y), (center_x - 15, arm_y + 8), stick_width)
-            pygame.draw.line(screen, stick_color, (center_x, arm_y), (center_x + 15, arm_y + 14), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, arm_y), (center_x - 15, arm_y + 8), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, arm_y), (center_x + 15, arm_y + 14), stick_width)
         
         # Legs - walking animation
-        if self.anim_frame in [0, 2]:
+        if anim_frame in [0, 2]:
             # Legs in walking position
-            pygame.draw.line(screen, stick_color, (center_x, body_bottom), (center_x - 10, self.y + self.height), stick_width)
-            pygame.draw.line(screen, stick_color, (center_x, body_bottom), (center_x + 10, self.y + self.height - 5), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, body_bottom), (center_x - 10, y + self.height), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, body_bottom), (center_x + 10, y + self.height - 5), stick_width)
         else:
             # Legs in opposite position
-            pygame.draw.line(screen, stick_color, (center_x, body_bottom), (center_x - 10, self.y + self.height - 5), stick_width)
-            pygame.draw.line(screen, stick_color, (center_x, body_bottom), (center_x + 10, self.y + self.height), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, body_bottom), (center_x - 10, y + self.height - 5), stick_width)
+            pygame.draw.line(surface, stick_color, (center_x, body_bottom), (center_x + 10, y + self.height), stick_width)
     
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
+    
+    @property
+    def depth(self):
+        # Scene order: by the feet
+        return self.y + self.height
+    
+    @property
+    def bounds(self):
+        return pygame.Rect(int(self.x) - CHARACTER_MARGIN, int(self.y) - CHARACTER_MARGIN,
+                           self.width + CHARACTER_MARGIN * 2, self.height + 4 + CHARACTER_MARGIN * 2)
+
+# Room around a building sprite for roofs, antenna and pediment outside its footprint
+SPRITE_MARGIN = 50
+
+_glow_frames = {}
+
+def glow_frame(width, height, glow_size):
+    """Proximity glow around a width x height building, rendered once per glow size"""
+    key = (width, height, glow_size)
+    if key not in _glow_frames:
+        glow = new_surface((width + glow_size * 2, height + glow_size * 2), pygame.SRCALPHA)
+        for i in range(glow_size, 0, -2):
+            alpha = int(40 * (i / glow_size))
+            pygame.draw.rect(glow, (255, 255, 150, alpha),
+                           glow.get_rect(), border_radius=20)
+        _glow_frames[key] = glow.convert_alpha()
+    return _glow_frames[key]
 
 class Building:
     """Interactive buildings"""
@@ -242,6 +499,11 @@ class Building:
         self.location = location
         self.type = btype
         self.pulse = 0
+        self.shadow = None
+        self.sprite = None
+        self.prompt = None
+        self.bounds = None
+        self.depth = y  # scene order: by the top edge, so a character walking across a building stays in front
         
     def update(self):
         self.pulse += 0.08
@@ -252,355 +514,396 @@ class Building:
         expanded = bld.inflate(threshold * 2, threshold * 2)
         return expanded.colliderect(char)
         
-    def draw(self, screen, character):
-        is_near = self.is_near(character)
+    def get_bounds(self):
+        """Everything the building itself may draw: shadow, body and the largest glow"""
+        shadow = pygame.Rect(self.x + 12, self.y + 12, self.width + 20, self.height + 20)
+        body = pygame.Rect(self.x - SPRITE_MARGIN, self.y - SPRITE_MARGIN,
+                           self.width + SPRITE_MARGIN * 2, self.height + SPRITE_MARGIN * 2)
+        glow = pygame.Rect(self.x, self.y, self.width, self.height).inflate(66, 66)
+        return shadow.union(body).union(glow)
+    
+    def overlay_rects(self, offset, screen_width):
+        """Screen areas of this frame's animated overlays (glow and prompt), for when the character is near"""
+        glow_size = int(25 + 8 * abs(math.sin(self.pulse * 2)))
+        glow = pygame.Rect(self.x - offset[0], self.y - offset[1], self.width, self.height)
+        rects = [glow.inflate(glow_size * 2, glow_size * 2)]
+        if self.location != Location.NONE:
+            rects.append(self.prompt_rect(int(8 * abs(math.sin(self.pulse * 3))), offset, screen_width))
+        return rects
+    
+    def render_sprite(self):
+        """Pre-render the static layers once: the drop shadow and the building body"""
+        self.shadow = new_surface((self.width + 20, self.height + 20), pygame.SRCALPHA)
+        pygame.draw.rect(self.shadow, (0, 0, 0, 45), self.shadow.get_rect(), border_radius=12)
+        self.shadow = self.shadow.convert_alpha()
+        
+        sprite = new_surface((self.width + SPRITE_MARGIN * 2, self.height + SPRITE_MARGIN * 2), pygame.SRCALPHA)
+        draw_body = {
+            "arcade": self.draw_arcade,
+            "library": self.draw_library,
+            "office": self.draw_office,
+            "bank": self.draw_bank,
+        }[self.type]
+        draw_body(sprite, SPRITE_MARGIN, SPRITE_MARGIN)
+        self.sprite = sprite.convert_alpha()
+        self.bounds = self.get_bounds()
+        
+    def draw(self, screen, is_near, offset=(0, 0), scale=1):
+        """Shadow, glow and body; the prompt goes on top of the whole scene, see Game.draw_prompts.
+        
+        Returns the number of blits.
+        """
+        if self.sprite is None:
+            self.render_sprite()
+        x = self.x - offset[0]
+        y = self.y - offset[1]
         
         # Shadow
-        shadow = pygame.Surface((self.width + 20, self.height + 20), pygame.SRCALPHA)
-        pygame.draw.rect(shadow, (0, 0, 0, 45), shadow.get_rect(), border_radius=12)
-        screen.blit(shadow, (self.x + 12, self.y + 12))
+        screen.blit(scaled(self.shadow, scale), ((x + 12) * scale, (y + 12) * scale))
         
         # Glow when near
         if is_near:
             glow_size = int(25 + 8 * abs(math.sin(self.pulse * 2)))
-            glow = pygame.Surface((self.width + glow_size * 2, 
-                                  self.height + glow_size * 2), pygame.SRCALPHA)
-            for i in range(glow_size, 0, -2):
-                alpha = int(40 * (i / glow_size))
-                pygame.draw.rect(glow, (255, 255, 150, alpha), 
-                               glow.get_rect(), border_radius=20)
-            screen.blit(glow, (self.x - glow_size, self.y - glow_size))
-        
-        # Draw building
-        if self.type == "arcade":
-            self.draw_arcade(screen)
-        elif self.type == "library":
-            self.draw_library(screen)
-        elif self.type == "office":
-            self.draw_office(screen)
-        elif self.type == "bank":
-            self.draw_bank(screen)
-            
-        # Interaction prompt
-        if is_near and self.location != Location.NONE:
-            self.draw_prompt(screen)
+            screen.blit(scaled(glow_frame(self.width, self.height, glow_size), scale),
+                        ((x - glow_size) * scale, (y - glow_size) * scale))
+        
+        # Building
+        screen.blit(scaled(self.sprite, scale), ((x - SPRITE_MARGIN) * scale, (y - SPRITE_MARGIN) * scale))
+        return 3 if is_near else 2
     
-    def draw_arcade(self, screen):
-        wall_y = self.y + 80
+    def draw_arcade(self, surface, x, y):
+        wall_y = y + 80
         wall_h = self.height - 80
         
         # Subtle soft shadow
-        shadow_surf = pygame.Surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
+        shadow_surf = new_surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
         for i in range(6):
             alpha = 40 - i * 6
             pygame.draw.rect(shadow_surf, (0, 0, 0, alpha), (i, i, self.width + 12 - i*2, wall_h + 12 - i*2), border_radius=10)
-        screen.blit(shadow_surf, (self.x + 6, wall_y + 6))
+        surface.blit(shadow_surf, (x + 6, wall_y + 6))
         
         # Main wall
-        pygame.draw.rect(screen, (220, 170, 140),
-                        (self.x, wall_y, self.width, wall_h), border_radius=10)
+        pygame.draw.rect(surface, (220, 170, 140),
+                        (x, wall_y, self.width, wall_h), border_radius=10)
         
         # Wall shading - left and right
-        pygame.draw.rect(screen, (190, 145, 115),
-                        (self.x + 5, wall_y + 5, 18, wall_h - 10))
-        pygame.draw.rect(screen, (235, 190, 160),
-                        (self.x + self.width - 23, wall_y + 5, 18, wall_h - 10))
+        pygame.draw.rect(surface, (190, 145, 115),
+                        (x + 5, wall_y + 5, 18, wall_h - 10))
+        pygame.draw.rect(surface, (235, 190, 160),
+                        (x + self.width - 23, wall_y + 5, 18, wall_h - 10))
         
         # Clean roof - simple design, NO overlaps
         roof_w = self.width + 30
         roof_h = 75
-        roof_x = self.x - 15
-        roof_y = self.y + 5
+        roof_x = x - 15
+        roof_y = y + 5
         
         # Roof fill
-        pygame.draw.rect(screen, (230, 60, 90),
+        pygame.draw.rect(surface, (230, 60, 90),
                         (roof_x, roof_y, roof_w, roof_h), border_radius=8)
         
         # Roof stripe (internal decoration)
-        pygame.draw.rect(screen, (200, 40, 70),
+        pygame.draw.rect(surface, (200, 40, 70),
                         (roof_x + 8, roof_y + roof_h - 12, roof_w - 16, 6), border_radius=2)
         
         sign_w = self.width - 35
         sign_h = 50
-        sign_x = self.x + 18
-        sign_y = self.y + 20
+        sign_x = x + 18
+        sign_y = y + 20
         
         # Sign background with border
-        pygame.draw.rect(screen, (255, 235, 60), (sign_x - 3, sign_y - 3, sign_w + 6, sign_h + 6), border_radius=8)
-        pygame.draw.rect(screen, (255, 50, 90), (sign_x, sign_y, sign_w, sign_h), border_radius=6)
-        
-        try:
-            font = pygame.font.SysFont('couriernew', 44, bold=True)
-        except:
-            font = pygame.font.Font(None, 50)
+        pygame.draw.rect(surface, (255, 235, 60), (sign_x - 3, sign_y - 3, sign_w + 6, sign_h + 6), border_radius=8)
+        pygame.draw.rect(surface, (255, 50, 90), (sign_x, sign_y, sign_w, sign_h), border_radius=6)
         
-        text = font.render("ARCADE", True, (255, 235, 60))
-        text_rect = text.get_rect(center=(self.x + self.width // 2, sign_y + sign_h // 2))
+        text = text_cache.render("ARCADE", (255, 235, 60), 44, 'couriernew', bold=True, fallback_size=50)
+        text_rect = text.get_rect(center=(x + self.width // 2, sign_y + sign_h // 2))
         
-        shadow = font.render("ARCADE", True, (100, 20, 40))
-        screen.blit(shadow, (text_rect.x + 3, text_rect.y + 3))
-        screen.blit(text, text_rect)
+        shadow = text_cache.render("ARCADE", (100, 20, 40), 44, 'couriernew', bold=True, fallback_size=50)
+        surface.blit(shadow, (text_rect.x + 3, text_rect.y + 3))
+        surface.blit(text, text_rect)
         
         # Windows - square arcade style
-        for wx in [self.x + 25, self.x + self.width - 55]:
-            pygame.draw.rect(screen, (90, 130, 170), (wx, wall_y + 30, 30, 30), border_radius=4)
-            pygame.draw.rect(screen, (60, 90, 130), (wx, wall_y + 30, 30, 30), 3, border_radius=4)
+        for wx in [x + 25, x + self.width - 55]:
+            pygame.draw.rect(surface, (90, 130, 170), (wx, wall_y + 30, 30, 30), border_radius=4)
+            pygame.draw.rect(surface, (60, 90, 130), (wx, wall_y + 30, 30, 30), 3, border_radius=4)
         
         # Door
         door_w = 70
         door_h = 85
-        door_x = self.x + self.width // 2 - door_w // 2
+        door_x = x + self.width // 2 - door_w // 2
         door_y = wall_y + wall_h - door_h - 8
-        pygame.draw.rect(screen, (50, 40, 50), (door_x, door_y, door_w, door_h), border_radius=6)
-        pygame.draw.line(screen, (70, 60, 70), (door_x + door_w//2, door_y + 8), (door_x + door_w//2, door_y + door_h - 8), 2)
+        pygame.draw.rect(surface, (50, 40, 50), (door_x, door_y, door_w, door_h), border_radius=6)
+        pygame.draw.line(surface, (70, 60, 70), (door_x + door_w//2, door_y + 8), (door_x + door_w//2, door_y + door_h - 8), 2)
         # Handle
-        pygame.draw.circle(screen, (220, 180, 80), (door_x + door_w - 12, door_y + door_h // 2), 5)
+        pygame.draw.circle(surface, (220, 180, 80), (door_x + door_w - 12, door_y + door_h // 2), 5)
         
         # Clean building outline
-        pygame.draw.rect(screen, (150, 115, 90), (self.x, wall_y, self.width, wall_h), 3, border_radius=10)
+        pygame.draw.rect(surface, (150, 115, 90), (x, wall_y, self.width, wall_h), 3, border_radius=10)
     
-    def draw_library(self, screen):
-        wall_y = self.y + 85
+    def draw_library(self, surface, x, y):
+        wall_y = y + 85
         wall_h = self.height - 85
         
         # Subtle soft shadow
-        shadow_surf = pygame.Surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
+        shadow_surf = new_surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
         for i in range(6):
             alpha = 40 - i * 6
             pygame.draw.rect(shadow_surf, (0, 0, 0, alpha), (i, i, self.width + 12 - i*2, wall_h + 12 - i*2), border_radius=10)
-        screen.blit(shadow_surf, (self.x + 6, wall_y + 6))
+        surface.blit(shadow_surf, (x + 6, wall_y + 6))
         
         # Warm brown wall
-        pygame.draw.rect(screen, (210, 165, 120),
-                        (self.x, wall_y, self.width, wall_h), border_radius=10)
+        pygame.draw.rect(surface, (210, 165, 120),
+                        (x, wall_y, self.width, wall_h), border_radius=10)
         
         # Wall shading
-        pygame.draw.rect(screen, (185, 145, 105),
-                        (self.x + 5, wall_y + 5, 18, wall_h - 10))
-        pygame.draw.rect(screen, (230, 180, 135),
-                        (self.x + self.width - 23, wall_y + 5, 18, wall_h - 10))
+        pygame.draw.rect(surface, (185, 145, 105),
+                        (x + 5, wall_y + 5, 18, wall_h - 10))
+        pygame.draw.rect(surface, (230, 180, 135),
+                        (x + self.width - 23, wall_y + 5, 18, wall_h - 10))
         
         # Clean tiled roof
         roof_w = self.width + 40
         roof_h = 85
-        roof_x = self.x - 20
-        roof_y = self.y
+        roof_x = x - 20
+        roof_y = y
         
         # Roof fill
-        pygame.draw.rect(screen, (120, 75, 45),
+        pygame.draw.rect(surface, (120, 75, 45),
                         (roof_x, roof_y, roof_w, roof_h), border_radius=10)
         
         # Tile pattern - clean internal lines
         for i in range(6):
             tile_y = roof_y + 15 + i * 12
-            pygame.draw.rect(screen, (100, 60, 35),
+            pygame.draw.rect(surface, (100, 60, 35),
                            (roof_x + 8, tile_y, roof_w - 16, 4), border_radius=1)
         
         # Roof decorative ends
         end_size = 10
-        pygame.draw.circle(screen, (140, 90, 55), (roof_x + 10, roof_y + roof_h // 2), end_size)
-        pygame.draw.circle(screen, (140, 90, 55), (roof_x + roof_w - 10, roof_y + roof_h // 2), end_size)
+        pygame.draw.circle(surface, (140, 90, 55), (roof_x + 10, roof_y + roof_h // 2), end_size)
+        pygame.draw.circle(surface, (140, 90, 55), (roof_x + roof_w - 10, roof_y + roof_h // 2), end_size)
         
         # LIBRARY sign - dark wood
         sign_w = self.width - 45
         sign_h = 48
-        sign_x = self.x + 23
-        sign_y = self.y + 30
+        sign_x = x + 23
+        sign_y = y + 30
         
-        pygame.draw.rect(screen, (130, 85, 55), (sign_x - 3, sign_y - 3, sign_w + 6, sign_h + 6), border_radius=8)
-        pygame.draw.rect(screen, (80, 50, 30), (sign_x, sign_y, sign_w, sign_h), border_radius=6)
+        pygame.draw.rect(surface, (130, 85, 55), (sign_x - 3, sign_y - 3, sign_w + 6, sign_h + 6), border_radius=8)
+        pygame.draw.rect(surface, (80, 50, 30), (sign_x, sign_y, sign_w, sign_h), border_radius=6)
         
-        try:
-            font = pygame.font.SysFont('couriernew', 38, bold=True)
-        except:
-            font = pygame.font.Font(None, 44)
+        text = text_cache.render("LIBRARY", (255, 245, 220), 38, 'couriernew', bold=True, fallback_size=44)
+        text_rect = text.get_rect(center=(x + self.width // 2, sign_y + sign_h // 2))
         
-        text = font.render("LIBRARY", True, (255, 245, 220))
-        text_rect = text.get_rect(center=(self.x + self.width // 2, sign_y + sign_h // 2))
-        
-        shadow = font.render("LIBRARY", True, (40, 25, 15))
-        screen.blit(shadow, (text_rect.x + 3, text_rect.y + 3))
-        screen.blit(text, text_rect)
+        shadow = text_cache.render("LIBRARY", (40, 25, 15), 38, 'couriernew', bold=True, fallback_size=44)
+        surface.blit(shadow, (text_rect.x + 3, text_rect.y + 3))
+        surface.blit(text, text_rect)
         
         # Windows with cross dividers
         for i in range(3):
-            win_x = self.x + 30 + i * 80
+            win_x = x + 30 + i * 80
             win_y = wall_y + 28
             # Window
-            pygame.draw.rect(screen, (255, 250, 220), (win_x, win_y, 62, 75), border_radius=6)
-            pygame.draw.rect(screen, (130, 95, 65), (win_x, win_y, 62, 75), 3, border_radius=6)
+            pygame.draw.rect(surface, (255, 250, 220), (win_x, win_y, 62, 75), border_radius=6)
+            pygame.draw.rect(surface, (130, 95, 65), (win_x, win_y, 62, 75), 3, border_radius=6)
             # Dividers
-            pygame.draw.line(screen, (130, 95, 65), (win_x + 31, win_y + 3), (win_x + 31, win_y + 72), 3)
-            pygame.draw.line(screen, (130, 95, 65), (win_x + 3, win_y + 37), (win_x + 59, win_y + 37), 3)
+            pygame.draw.line(surface, (130, 95, 65), (win_x + 31, win_y + 3), (win_x + 31, win_y + 72), 3)
+            pygame.draw.line(surface, (130, 95, 65), (win_x + 3, win_y + 37), (win_x + 59, win_y + 37), 3)
         
         # Door
         door_w = 58
         door_h = 78
-        door_x = self.x + self.width // 2 - door_w // 2
+        door_x = x + self.width // 2 - door_w // 2
         door_y = wall_y + wall_h - door_h - 8
-        pygame.draw.rect(screen, (95, 65, 40), (door_x, door_y, door_w, door_h), border_radius=6)
-        pygame.draw.rect(screen, (130, 95, 65), (door_x, door_y, door_w, door_h), 3, border_radius=6)
-        pygame.draw.circle(screen, (180, 140, 70), (door_x + door_w - 12, door_y + door_h // 2), 5)
+        pygame.draw.rect(surface, (95, 65, 40), (door_x, door_y, door_w, door_h), border_radius=6)
+        pygame.draw.rect(surface, (130, 95, 65), (door_x, door_y, door_w, door_h), 3, border_radius=6)
+        pygame.draw.circle(surface, (180, 140, 70), (door_x + door_w - 12, door_y + door_h // 2), 5)
         
         # Clean outline
-        pygame.draw.rect(screen, (145, 105, 75), (self.x, wall_y, self.width, wall_h), 3, border_radius=10)
+        pygame.draw.rect(surface, (145, 105, 75), (x, wall_y, self.width, wall_h), 3, border_radius=10)
     
-    def draw_office(self, screen):
+    def draw_office(self, surface, x, y):
         # Building
-        pygame.draw.rect(screen, Colors.OFFICE_BLUE,
-                        (self.x, self.y, self.width, self.height),
+        pygame.draw.rect(surface, Colors.OFFICE_BLUE,
+                        (x, y, self.width, self.height),
                         border_radius=6)
-        pygame.draw.rect(screen, Colors.OFFICE_DARK,
-                        (self.x, self.y, self.width, self.height),
+        pygame.draw.rect(surface, Colors.OFFICE_DARK,
+                        (x, y, self.width, self.height),
                         5, border_radius=6)
         
         # Antenna
-        pygame.draw.rect(screen, (40, 55, 85),
-                        (self.x + self.width // 2 - 7, self.y - 35, 14, 40))
-        pygame.draw.circle(screen, (255, 80, 80),
-                         (self.x + self.width // 2, self.y - 35), 10)
-        pygame.draw.circle(screen, (255, 120, 120),
-                         (self.x + self.width // 2, self.y - 35), 10, 2)
+        pygame.draw.rect(surface, (40, 55, 85),
+                        (x + self.width // 2 - 7, y - 35, 14, 40))
+        pygame.draw.circle(surface, (255, 80, 80),
+                         (x + self.width // 2, y - 35), 10)
+        pygame.draw.circle(surface, (255, 120, 120),
+                         (x + self.width // 2, y - 35), 10, 2)
         
         # Windows
         for row in range(10):
             for col in range(3):
-                wx = self.x + 26 + col * 52
-                wy = self.y + 18 + row * 24
+                wx = x + 26 + col * 52
+                wy = y + 18 + row * 24
                 lit = (row + col) % 3 == 0
                 color = Colors.OFFICE_LIT if lit else Colors.OFFICE_WINDOW
-                pygame.draw.rect(screen, color, (wx, wy, 34, 18), border_radius=2)
-                pygame.draw.rect(screen, Colors.OFFICE_DARK, (wx, wy, 34, 18), 2, border_radius=2)
+                pygame.draw.rect(surface, color, (wx, wy, 34, 18), border_radius=2)
+                pygame.draw.rect(surface, Colors.OFFICE_DARK, (wx, wy, 34, 18), 2, border_radius=2)
     
-    def draw_bank(self, screen):
-        wall_y = self.y + 85
+    def draw_bank(self, surface, x, y):
+        wall_y = y + 85
         wall_h = self.height - 85
         
         # Subtle soft shadow
-        shadow_surf = pygame.Surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
+        shadow_surf = new_surface((self.width + 12, wall_h + 12), pygame.SRCALPHA)
         for i in range(6):
             alpha = 40 - i * 6
             pygame.draw.rect(shadow_surf, (0, 0, 0, alpha), (i, i, self.width + 12 - i*2, wall_h + 12 - i*2), border_radius=10)
-        screen.blit(shadow_surf, (self.x + 6, wall_y + 6))
+        surface.blit(shadow_surf, (x + 6, wall_y + 6))
         
         # Cream temple wall - rounded
-        pygame.draw.rect(screen, (240, 220, 190),
-                        (self.x, wall_y, self.width, wall_h), border_radius=12)
+        pygame.draw.rect(surface, (240, 220, 190),
+                        (x, wall_y, self.width, wall_h), border_radius=12)
         
         # Wall depth shading
-        pygame.draw.rect(screen, (215, 195, 165),
-                        (self.x, wall_y, 18, wall_h), border_radius=12)
-        pygame.draw.rect(screen, (255, 240, 210),
-                        (self.x + self.width - 18, wall_y, 18, wall_h), border_radius=12)
+        pygame.draw.rect(surface, (215, 195, 165),
+                        (x, wall_y, 18, wall_h), border_radius=12)
+        pygame.draw.rect(surface, (255, 240, 210),
+                        (x + self.width - 18, wall_y, 18, wall_h), border_radius=12)
         
         # Grand cartoon pediment
         ped_points = [
-            (self.x + self.width // 2, self.y + 8),
-            (self.x - 22, wall_y + 8),
-            (self.x - 22, wall_y + 28),
-            (self.x + self.width + 22, wall_y + 28),
-            (self.x + self.width + 22, wall_y + 8)
+            (x + self.width // 2, y + 8),
+            (x - 22, wall_y + 8),
+            (x - 22, wall_y + 28),
+            (x + self.width + 22, wall_y + 28),
+            (x + self.width + 22, wall_y + 8)
         ]
-        pygame.draw.polygon(screen, (250, 235, 205), ped_points)
+        pygame.draw.polygon(surface, (250, 235, 205), ped_points)
         
         # Pediment detail line
-        pygame.draw.line(screen, (220, 200, 170),
-                        (self.x - 15, wall_y + 18),
-                        (self.x + self.width + 15, wall_y + 18), 4)
+        pygame.draw.line(surface, (220, 200, 170),
+                        (x - 15, wall_y + 18),
+                        (x + self.width + 15, wall_y + 18), 4)
         
         # Pediment outline - thick
-        pygame.draw.lines(screen, (190, 165, 135), False, ped_points, 6)
+        pygame.draw.lines(surface, (190, 165, 135), False, ped_points, 6)
         
         # Large decorative columns - cartoon style
         for i in range(3):
-            cx = self.x + 45 + i * 95
+            cx = x + 45 + i * 95
             col_y = wall_y + 35
             col_w = 45
             col_h = 150
             
             # Column body - white/cream
-            pygame.draw.rect(screen, (255, 250, 235),
+            pygame.draw.rect(surface, (255, 250, 235),
                            (cx, col_y, col_w, col_h), border_radius=4)
             
             # Fluting effect (vertical highlights)
             for j in range(4):
                 groove_x = cx + 9 + j * 11
-                pygame.draw.line(screen, (245, 235, 210),
+                pygame.draw.line(surface, (245, 235, 210),
                                (groove_x, col_y + 10), (groove_x, col_y + col_h - 10), 3)
             
             # Column outline
-            pygame.draw.rect(screen, (190, 165, 135),
+            pygame.draw.rect(surface, (190, 165, 135),
                            (cx, col_y, col_w, col_h), 3, border_radius=4)
             
             # Capital (top) - detailed
             cap_h = 22
-            pygame.draw.rect(screen, (255, 250, 240), 
+            pygame.draw.rect(surface, (255, 250, 240), 
                            (cx - 8, col_y - cap_h, col_w + 16, cap_h), border_radius=4)
-            pygame.draw.rect(screen, (190, 165, 135),
+            pygame.draw.rect(surface, (190, 165, 135),
                            (cx - 8, col_y - cap_h, col_w + 16, cap_h), 3, border_radius=4)
             # Capital bands
-            pygame.draw.line(screen, (190, 165, 135),
+            pygame.draw.line(surface, (190, 165, 135),
                            (cx - 5, col_y - cap_h + 8),
                            (cx + col_w + 13, col_y - cap_h + 8), 2)
             
             # Base (bottom)
             base_h = 22
-            pygame.draw.rect(screen, (255, 250, 240),
+            pygame.draw.rect(surface, (255, 250, 240),
                            (cx - 8, col_y + col_h, col_w + 16, base_h), border_radius=4)
-            pygame.draw.rect(screen, (190, 165, 135),
+            pygame.draw.rect(surface, (190, 165, 135),
                            (cx - 8, col_y + col_h, col_w + 16, base_h), 3, border_radius=4)
         
         # HUGE glowing golden dollar sign
-        font = pygame.font.Font(None, 125)
-        
         # Multi-layer glow
         for size_offset in range(5, 0, -1):
-            glow_font = pygame.font.Font(None, 125 + size_offset * 4)
-            glow = glow_font.render("$", True, (255, 225, 120))
-            glow.set_alpha(35)
-            glow_rect = glow.get_rect(center=(self.x + self.width // 2, self.y + 155))
-            screen.blit(glow, glow_rect)
+            glow = text_cache.render("$", (255, 225, 120), 125 + size_offset * 4, alpha=35)
+            glow_rect = glow.get_rect(center=(x + self.width // 2, y + 155))
+            surface.blit(glow, glow_rect)
         
         # Thick shadow
+        shadow = text_cache.render("$", (140, 105, 60), 125)
         for offset in [(4, 4), (3, 3), (2, 2)]:
-            shadow = font.render("$", True, (140, 105, 60))
-            shadow_rect = shadow.get_rect(center=(self.x + self.width // 2 + offset[0], self.y + 155 + offset[1]))
-            screen.blit(shadow, shadow_rect)
+            shadow_rect = shadow.get_rect(center=(x + self.width // 2 + offset[0], y + 155 + offset[1]))
+            surface.blit(shadow, shadow_rect)
         
         # Golden dollar
-        dollar = font.render("$", True, (255, 210, 30))
-        dollar_rect = dollar.get_rect(center=(self.x + self.width // 2, self.y + 155))
-        screen.blit(dollar, dollar_rect)
+        dollar = text_cache.render("$", (255, 210, 30), 125)
+        dollar_rect = dollar.get_rect(center=(x + self.width // 2, y + 155))
+        surface.blit(dollar, dollar_rect)
         
         # Sparkles
         for pos in [(-40, -30), (40, -30), (-50, 20), (50, 20)]:
-            sparkle_x = self.x + self.width // 2 + pos[0]
-            sparkle_y = self.y + 155 + pos[1]
-            pygame.draw.circle(screen, (255, 245, 180), (sparkle_x, sparkle_y), 5)
-            pygame.draw.circle(screen, (255, 210, 30), (sparkle_x, sparkle_y), 5, 2)
+            sparkle_x = x + self.width // 2 + pos[0]
+            sparkle_y = y + 155 + pos[1]
+            pygame.draw.circle(surface, (255, 245, 180), (sparkle_x, sparkle_y), 5)
+            pygame.draw.circle(surface, (255, 210, 30), (sparkle_x, sparkle_y), 5, 2)
         
         # Building outline
-        pygame.draw.rect(screen, (175, 150, 120), (self.x, wall_y, self.width, wall_h), 3, border_radius=12)
+        pygame.draw.rect(surface, (175, 150, 120), (x, wall_y, self.width, wall_h), 3, border_radius=12)
     
-    def draw_prompt(self, screen):
-        # Floating prompt animation
-        pulse_y = int(8 * abs(math.sin(self.pulse * 3)))
-        prompt_y = self.y - 75 - pulse_y
+    def render_prompt(self):
+        """Pre-render the prompt card with its text; only the borders are drawn per frame"""
+        prompt_w = 300
+        prompt_h = 55
+        card = pygame.Rect(0, 0, prompt_w, prompt_h)
+        
+        # Remove emoji from display
+        display_name = self.name.replace("🎮 ", "").replace("📚 ", "").replace("🏦 ", "")
+        
+        text_msg = f"PRESS SPACE - {display_name}"
+        text_shadow = text_cache.render(text_msg, (30, 30, 50), 30, 'couriernew', bold=True, fallback_size=36)
+        shadow_rect = text_shadow.get_rect(center=(prompt_w // 2 + 3, prompt_h // 2 + 3))
+        text = text_cache.render(text_msg, (255, 255, 255), 30, 'couriernew', bold=True, fallback_size=36)
+        text_rect = text.get_rect(center=(prompt_w // 2, prompt_h // 2))
+        
+        # Long names overflow the card, so the sprite covers the text as well
+        bounds = card.union(shadow_rect).union(text_rect)
+        sprite = new_surface(bounds.size, pygame.SRCALPHA)
+        pygame.draw.rect(sprite, (15, 15, 35), card.move(-bounds.x, -bounds.y), border_radius=12)
+        sprite.blit(text_shadow, shadow_rect.move(-bounds.x, -bounds.y))
+        sprite.blit(text, text_rect.move(-bounds.x, -bounds.y))
+        return sprite.convert_alpha(), card, bounds.topleft
+    
+    def prompt_rect(self, pulse_y, offset=(0, 0), screen_width=WIDTH):
+        """Where on screen the prompt sprite lands when floated `pulse_y` px up"""
+        if self.prompt is None:
+            self.prompt = self.render_prompt()
+        sprite, card, (sprite_x, sprite_y) = self.prompt
+        prompt_y = self.y - offset[1] - 75 - pulse_y
         
         # Ensure prompt stays on screen
         if prompt_y < 10:
-            prompt_y = self.y + self.height + 15 + pulse_y
+            prompt_y = self.y - offset[1] + self.height + 15 + pulse_y
         
-        prompt_w = 300
-        prompt_h = 55
-        prompt_x = self.x + self.width // 2 - prompt_w // 2
+        prompt_x = self.x - offset[0] + self.width // 2 - card.width // 2
         
         # Ensure prompt doesn't go off screen horizontally
-        prompt_x = max(10, min(prompt_x, WIDTH - prompt_w - 10))
+        prompt_x = max(10, min(prompt_x, screen_width - card.width - 10))
+        return sprite.get_rect(topleft=(prompt_x + sprite_x, prompt_y + sprite_y))
+    
+    def draw_prompt(self, screen, offset=(0, 0)):
+        # Floating prompt animation
+        pulse_y = int(8 * abs(math.sin(self.pulse * 3)))
+        rect = self.prompt_rect(pulse_y, offset, screen.get_width())
+        sprite, card, (sprite_x, sprite_y) = self.prompt
+        prompt_x = rect.x - sprite_x
+        prompt_y = rect.y - sprite_y
+        prompt_w, prompt_h = card.size
         
-        pygame.draw.rect(screen, (15, 15, 35, 240),
-                        (prompt_x, prompt_y, prompt_w, prompt_h),
-                        border_radius=12)
+        screen.blit(sprite, rect)
         
         # Animated rainbow border
         hue = (self.pulse * 60) % 360
@@ -614,64 +917,200 @@ class Building:
         pygame.draw.rect(screen, (255, 255, 120),
                         (prompt_x + 4, prompt_y + 4, prompt_w - 8, prompt_h - 8),
                         2, border_radius=10)
-        
-        try:
-            font = pygame.font.SysFont('couriernew', 30, bold=True)
-        except:
-            font = pygame.font.Font(None, 36)
-        
-        # Remove emoji from display
-        display_name = self.name.replace("🎮 ", "").replace("📚 ", "").replace("🏦 ", "")
-        
-        text_msg = f"PRESS SPACE - {display_name}"
-        text_shadow = font.render(text_msg, True, (30, 30, 50))
-        text_rect = text_shadow.get_rect(center=(self.x + self.width // 2 + 3, prompt_y + prompt_h // 2 + 3))
-        screen.blit(text_shadow, text_rect)
-        
-        # Main text
-        text = font.render(text_msg, True, (255, 255, 255))
-        text_rect = text.get_rect(center=(self.x + self.width // 2, prompt_y + prompt_h // 2))
-        screen.blit(text, text_rect)
 
-class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("FinQuest")
-        self.clock = pygame.time.Clock()
-        self.running = True
-        
-        # Character starts in center of screen
-        self.character = Character(WIDTH // 2 - 27, HEIGHT // 2 - 27)
-        
-        # Widescreen building layout
-        self.buildings = [
-            Building("🎮 ARCADE", 100, 100, 280, 260, Location.ARCADE, "arcade"),
-            Building("📚 LIBRARY", WIDTH - 380, 100, 280, 260, Location.LIBRARY, "library"),
-            Building("🏦 BANK", WIDTH // 2 - 140, HEIGHT - 360, 280, 280, Location.BANK, "bank"),
-        ]
-        
-        # Generate trees - simplified for less clutter
-        self.trees = []
-        for _ in range(25):
-            x = random.randint(150, WIDTH - 150)
-            y = random.randint(400, HEIGHT - 120)
-            too_close = any(
-                abs(x - (b.x + b.width // 2)) < 200 and 
-                abs(y - (b.y + b.height // 2)) < 200 
-                for b in self.buildings
-            )
-            if not too_close:
-                self.trees.append(Tree(x, y, random.randint(25, 35)))
-        
-        self.particles = [Particle() for _ in range(30)]
+def dirty_grid(width, height, tile):
+    """Tile flags for a `width` x `height` screen: one bytearray per row of tiles, 1 = dirty"""
+    return [bytearray(-(-width // tile)) for _ in range(-(-height // tile))]
+
+def merge_dirty(grid, other):
+    """Tiles flagged in either grid"""
+    return [bytearray((int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(len(a), 'little'))
+            for a, b in zip(grid, other)]
+
+def dirty_share(grid):
+    """Fraction of tiles flagged"""
+    return sum(row.count(1) for row in grid) / (len(grid) * len(grid[0]))
+
+def row_runs(row):
+    """(start, end) of each run of flagged tiles in a row"""
+    runs = []
+    start = row.find(1)
+    while start != -1:
+        end = row.find(0, start)
+        if end == -1:
+            end = len(row)
+        runs.append((start, end))
+        start = row.find(1, end)
+    return runs
+
+def dirty_regions(grid, tile):
+    """Rects covering the flagged tiles: runs along each row, merged down while they line up"""
+    rects = []
+    open_runs = {}
+    for row in range(len(grid)):
+        still_open = {}
+        for run in row_runs(grid[row]):
+            rect = open_runs.get(run)
+            if rect is None:
+                rect = pygame.Rect(run[0] * tile, row * tile, (run[1] - run[0]) * tile, tile)
+                rects.append(rect)
+            else:
+                rect.height += tile
+            still_open[run] = rect
+        open_runs = still_open
+    return rects
+
+class SpatialHash:
+    """Uniform grid of `cell` px squares, each holding the items whose bounds overlap it"""
+    def __init__(self, cell=256):
+        self.cell = cell
+        self.buckets = {}
+        self.cells = {}  # item -> the cells it is filed under
+        
+    def cells_for(self, rect):
+        cell = self.cell
+        return [(cx, cy)
+                for cx in range(rect.left // cell, (rect.right - 1) // cell + 1)
+                for cy in range(rect.top // cell, (rect.bottom - 1) // cell + 1)]
+    
+    def insert(self, item, rect):
+        cells = self.cells_for(rect)
+        self.cells[item] = cells
+        for key in cells:
+            self.buckets.setdefault(key, set()).add(item)
+    
+    def remove(self, item):
+        for key in self.cells.pop(item, ()):
+            bucket = self.buckets[key]
+            bucket.discard(item)
+            if not bucket:
+                del self.buckets[key]
+    
+    def move(self, item, rect):
+        if self.cells.get(item) != self.cells_for(rect):
+            self.remove(item)
+            self.insert(item, rect)
+    
+    def query(self, rect):
+        """Items filed under any cell `rect` touches; callers check the exact overlap"""
+        found = set()
+        for key in self.cells_for(rect):
+            found.update(self.buckets.get(key, ()))
+        return found
+
+class SceneGraph:
+    """Drawables kept in depth order (their `depth`, the y of their base) plus a spatial hash of their `bounds`.
+    
+    Only moved nodes are re-sorted, so depth ordering and proximity or visibility queries cost O(visible)
+    per frame rather than a sort or scan of the whole map.
+    """
+    def __init__(self, cell=256):
+        self.entries = []  # sorted (depth, insertion order, node)
         self.keys = {}
+        self.hash = SpatialHash(cell)
+        self.counter = itertools.count()
+        
+    def __len__(self):
+        return len(self.entries)
+    
+    def __iter__(self):
+        return (node for _, _, node in self.entries)
+    
+    def add(self, node):
+        key = (node.depth, next(self.counter))
+        self.keys[node] = key
+        bisect.insort(self.entries, (*key, node))
+        self.hash.insert(node, node.bounds)
+    
+    def remove(self, node):
+        key = self.keys.pop(node)
+        del self.entries[bisect.bisect_left(self.entries, key)]
+        self.hash.remove(node)
+    
+    def update(self, node):
+        """Re-file a node after it moved"""
+        key = self.keys[node]
+        if key[0] != node.depth:
+            del self.entries[bisect.bisect_left(self.entries, key)]
+            key = (node.depth, key[1])
+            self.keys[node] = key
+            bisect.insort(self.entries, (*key, node))
+        self.hash.move(node, node.bounds)
+    
+    def query(self, rect):
+        """Nodes whose bounds overlap `rect`, in depth order"""
+        found = [node for node in self.hash.query(rect) if node.bounds.colliderect(rect)]
+        found.sort(key=self.keys.__getitem__)
+        return found
+
+class Ground:
+    """The static ground of the world (sky, sun, grass, paths), rendered lazily in square chunks.
+    
+    Only chunks under the camera are ever rendered. Once more than `max_chunks` are cached, the ones
+    farthest from the camera are dropped, so memory stays flat however large the world gets.
+    """
+    def __init__(self, world_width, world_height, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS):
+        self.world = pygame.Rect(0, 0, world_width, world_height)
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.chunks = {}
+        self.rendered = 0
+        self.evicted = 0
+        
+    def chunk(self, cx, cy):
+        surface = self.chunks.get((cx, cy))
+        if surface is None:
+            area = pygame.Rect(cx * self.chunk_size, cy * self.chunk_size,
+                               self.chunk_size, self.chunk_size).clip(self.world)
+            surface = new_surface(area.size).convert()
+            self.draw_background(surface, area)
+            self.draw_paths(surface, area)
+            self.chunks[(cx, cy)] = surface
+            self.rendered += 1
+        return surface
+    
+    def draw(self, screen, view, clip=None, scale=1):
+        """Blit the chunks under `view` (the world rect on screen), only inside the screen rect `clip`.
+        
+        At a render `scale` below 1 chunks are drawn scaled, and `clip` is not supported.
+        Returns the number of blits.
+        """
+        area = (view if clip is None else clip.move(view.topleft)).clip(self.world)
+        size = self.chunk_size
+        blits = 0
+        for cy in range(area.top // size, (area.bottom - 1) // size + 1):
+            for cx in range(area.left // size, (area.right - 1) // size + 1):
+                dest = (cx * size - view.x, cy * size - view.y)
+                if scale != 1:
+                    screen.blit(scaled(self.chunk(cx, cy), scale), (dest[0] * scale, dest[1] * scale))
+                elif clip is None:
+                    screen.blit(self.chunk(cx, cy), dest)
+                else:
+                    screen.blit(self.chunk(cx, cy), clip, clip.move(-dest[0], -dest[1]))
+                blits += 1
+        
+        if len(self.chunks) > self.max_chunks:
+            self.evict(view)
+        return blits
+    
+    def evict(self, view):
+        def distance(key):
+            return math.hypot((key[0] + 0.5) * self.chunk_size - view.centerx,
+                              (key[1] + 0.5) * self.chunk_size - view.centery)
+        for key in sorted(self.chunks, key=distance)[self.max_chunks:]:
+            del self.chunks[key]
+            self.evicted += 1
+    
+    def draw_background(self, surface, area):
+        """Draw the part of the sky, sun and grass inside the world rect `area` onto `surface`"""
+        width = area.width
+        ox, oy = area.topleft
         
-    def draw_background(self):
         # Sunset at very top - like reference image
         sky_height = int(HEIGHT * 0.25)  # Much smaller sky, sunset at top
         
         # Smooth gradient sunset
-        for i in range(sky_height):
+        for i in range(max(oy, 0), min(sky_height, area.bottom)):
             t = i / sky_height
             # Smooth interpolation through all sky colors
             if t < 0.2:
@@ -695,30 +1134,33 @@ class Game:
                 g = int(Colors.SKY_LAYERS[3][1] * (1-progress) + Colors.SKY_LAYERS[4][1] * progress)
                 b = int(Colors.SKY_LAYERS[3][2] * (1-progress) + Colors.SKY_LAYERS[4][2] * progress)
             
-            pygame.draw.line(self.screen, (r, g, b), (0, i), (WIDTH, i))
+            pygame.draw.line(surface, (r, g, b), (0, i - oy), (width, i - oy))
         
-        sun_x = WIDTH - 180
-        sun_y = 90
+        # The sun sits over the first zone, where the character starts
+        sun_x = WIDTH - 180 - ox
+        sun_y = 90 - oy
         sun_radius = 75
         
-        # Sun glow
-        for i in range(5):
-            glow_radius = sun_radius + (5 - i) * 12
-            alpha = 50 - i * 10
-            glow_surf = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surf, (255, 230, 150, alpha), (glow_radius, glow_radius), glow_radius)
-            self.screen.blit(glow_surf, (sun_x - glow_radius, sun_y - glow_radius))
-        
-        # Sun body - more detailed
-        pygame.draw.circle(self.screen, (255, 245, 120), (sun_x, sun_y), sun_radius)
-        pygame.draw.circle(self.screen, (255, 230, 90), (sun_x, sun_y), sun_radius - 6)
-        pygame.draw.circle(self.screen, (255, 200, 0), (sun_x, sun_y), sun_radius, 3)
+        if surface.get_rect().colliderect((sun_x - 135, sun_y - 135, 270, 270)):
+            # Sun glow
+            for i in range(5):
+                glow_radius = sun_radius + (5 - i) * 12
+                alpha = 50 - i * 10
+                glow_surf = new_surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+                pygame.draw.circle(glow_surf, (255, 230, 150, alpha), (glow_radius, glow_radius), glow_radius)
+                surface.blit(glow_surf, (sun_x - glow_radius, sun_y - glow_radius))
+            
+            # Sun body - more detailed
+            pygame.draw.circle(surface, (255, 245, 120), (sun_x, sun_y), sun_radius)
+            pygame.draw.circle(surface, (255, 230, 90), (sun_x, sun_y), sun_radius - 6)
+            pygame.draw.circle(surface, (255, 200, 0), (sun_x, sun_y), sun_radius, 3)
         
-        # Top half is GRASS like reference
+        # Grass from the sky down to the bottom of the world
         grass_start = sky_height
-        grass_height = HEIGHT - grass_start
+        grass_height = self.world.height - grass_start
         
-        for i in range(0, grass_height, 4):
+        first = max(0, (oy - grass_start) // 4 * 4)
+        for i in range(first, min(grass_height, area.bottom - grass_start), 4):
             t = i / grass_height
             if t < 0.5:
                 r = int(Colors.GRASS_TOP[0] * (1-t*2) + Colors.GRASS_MID[0] * t*2)
@@ -729,40 +1171,277 @@ class Game:
                 r = int(Colors.GRASS_MID[0] * (1-t) + Colors.GRASS_DARK[0] * t)
                 g = int(Colors.GRASS_MID[1] * (1-t) + Colors.GRASS_DARK[1] * t)
                 b = int(Colors.GRASS_MID[2] * (1-t) + Colors.GRASS_DARK[2] * t)
-            pygame.draw.rect(self.screen, (r, g, b), (0, grass_start + i, WIDTH, 4))
+            pygame.draw.rect(surface, (r, g, b), (0, grass_start + i - oy, width, 4))
     
-    def draw_paths(self):
+    def draw_paths(self, surface, area):
+        """Draw the paths inside the world rect `area`: a crossroads through the middle of every zone"""
         path_w = 92
-        center_x = WIDTH // 2
-        center_y = HEIGHT // 2
         grass_start = int(HEIGHT * 0.25)  # 275px - where grass begins
-        
-        # Horizontal path
-        pygame.draw.rect(self.screen, Colors.PATH_DARK,
-                        (0, center_y - path_w // 2 - 8, WIDTH, path_w + 16))
-        pygame.draw.rect(self.screen, Colors.PATH_MID,
-                        (0, center_y - path_w // 2 - 4, WIDTH, path_w + 8))
-        pygame.draw.rect(self.screen, Colors.PATH_LIGHT,
-                        (0, center_y - path_w // 2, WIDTH, path_w))
-        
-        # Vertical path - constrained to grass area only
-        path_height = HEIGHT - grass_start
-        pygame.draw.rect(self.screen, Colors.PATH_DARK,
-                        (center_x - path_w // 2 - 8, grass_start, path_w + 16, path_height))
-        pygame.draw.rect(self.screen, Colors.PATH_MID,
-                        (center_x - path_w // 2 - 4, grass_start, path_w + 8, path_height))
-        pygame.draw.rect(self.screen, Colors.PATH_LIGHT,
-                        (center_x - path_w // 2, grass_start, path_w, path_height))
+        ox, oy = area.topleft
+        
+        # Horizontal paths
+        for center_y in range(HEIGHT // 2, self.world.height, HEIGHT):
+            if abs(center_y - area.centery) > area.height // 2 + path_w:
+                continue
+            pygame.draw.rect(surface, Colors.PATH_DARK,
+                            (0, center_y - path_w // 2 - 8 - oy, area.width, path_w + 16))
+            pygame.draw.rect(surface, Colors.PATH_MID,
+                            (0, center_y - path_w // 2 - 4 - oy, area.width, path_w + 8))
+            pygame.draw.rect(surface, Colors.PATH_LIGHT,
+                            (0, center_y - path_w // 2 - oy, area.width, path_w))
+        
+        # Vertical paths - constrained to grass area only
+        path_height = self.world.height - grass_start
+        for center_x in range(WIDTH // 2, self.world.width, WIDTH):
+            if abs(center_x - area.centerx) > area.width // 2 + path_w:
+                continue
+            pygame.draw.rect(surface, Colors.PATH_DARK,
+                            (center_x - path_w // 2 - 8 - ox, grass_start - oy, path_w + 16, path_height))
+            pygame.draw.rect(surface, Colors.PATH_MID,
+                            (center_x - path_w // 2 - 4 - ox, grass_start - oy, path_w + 8, path_height))
+            pygame.draw.rect(surface, Colors.PATH_LIGHT,
+                            (center_x - path_w // 2 - ox, grass_start - oy, path_w, path_height))
+    
+    def stats(self):
+        return {'chunks': len(self.chunks), 'rendered': self.rendered, 'evicted': self.evicted}
+
+class QualityController:
+    """Picks a quality level from recent frame times: down a level over budget, up again with headroom.
+    
+    Frame time here is the work of a frame (update and render), not the wait in `clock.tick`. Decisions
+    are made on the mean of a full window of frames, and the window restarts after every change, so a
+    level is never judged on frames drawn at another one. Stepping up assumes the frame time grows with
+    the pixel count, which keeps the controller from bouncing between two levels.
+    """
+    def __init__(self, levels=QUALITY_LEVELS, budget_ms=FRAME_BUDGET_MS, window=30, headroom=0.8):
+        self.levels = levels
+        self.budget_ms = budget_ms
+        self.headroom = headroom  # step up only if the projected frame time stays under this share of the budget
+        self.level = 0
+        self.samples = deque(maxlen=window)
+        self.changes = 0
+        
+    @property
+    def scale(self):
+        return self.levels[self.level][0]
+    
+    @property
+    def particles(self):
+        return self.levels[self.level][1]
+    
+    def record(self, frame_ms):
+        """Add one frame's time; returns True when the level changed"""
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        mean = sum(self.samples) / len(self.samples)
+        if mean > self.budget_ms and self.level < len(self.levels) - 1:
+            self.level += 1
+        elif self.level > 0 and mean * (self.levels[self.level - 1][0] / self.scale) ** 2 < self.budget_ms * self.headroom:
+            self.level -= 1
+        else:
+            return False
+        self.samples.clear()
+        self.changes += 1
+        return True
+
+class FrameProfiler:
+    """Rolling per-stage frame timings, draw calls and Surface allocations over the last `window` frames.
     
+    The game loop calls `begin`, then `lap(stage)` after each piece of work, which charges the time since
+    the previous lap to that stage, then `end`. F3 shows the overlay; `stats()` is the same data as a
+    dict, published as JSON to `window.mapStats` in the browser every `refresh` frames.
+    """
+    STAGES = ('events', 'update', 'ground', 'particles', 'scene', 'trees', 'buildings', 'character',
+              'prompts', 'upscale', 'overlay', 'present')
+    
+    def __init__(self, window=120, refresh=30):
+        self.window = window
+        self.refresh = refresh
+        self.visible = False
+        self.times = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self.draws = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self.allocations = deque(maxlen=window)
+        self.intervals = deque(maxlen=window)  # begin to begin, so including the wait in clock.tick
+        self.frames = 0
+        self.panel = None
+        self.rect = pygame.Rect(10, 10, 0, 0)
+        self.started = None
+        self.last = None
+        self.current = {}
+        self.current_draws = {}
+        self.allocated = 0
+        
+    def begin(self):
+        now = time.perf_counter()
+        if self.started is not None:
+            self.intervals.append((now - self.started) * 1000)
+        self.started = self.last = now
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.current_draws = dict.fromkeys(self.STAGES, 0)
+        self.allocated = surfaces_allocated
+        
+    def lap(self, stage, draws=0):
+        now = time.perf_counter()
+        self.current[stage] += now - self.last
+        self.current_draws[stage] += draws
+        self.last = now
+    
+    def end(self):
+        for stage in self.STAGES:
+            self.times[stage].append(self.current[stage] * 1000)
+            self.draws[stage].append(self.current_draws[stage])
+        self.allocations.append(surfaces_allocated - self.allocated)
+        self.frames += 1
+    
+    def stats(self, **extra):
+        """Means and p99s over the window, plus whatever `extra` the game adds"""
+        def summary(values):
+            ordered = sorted(values)
+            return {'mean': round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+                    'p99': round(ordered[int(len(ordered) * 0.99)], 3) if ordered else 0.0}
+        
+        frame = [sum(times) for times in zip(*self.times.values())]
+        interval = sum(self.intervals) / len(self.intervals) if self.intervals else 0
+        return {
+            'frames': self.frames,
+            'window': len(frame),
+            'fps': round(1000 / interval, 1) if interval else None,
+            'frame_ms': summary(frame),
+            'stages': {stage: {**summary(self.times[stage]),
+                               'draws': round(sum(self.draws[stage]) / max(len(self.draws[stage]), 1), 1)}
+                       for stage in self.STAGES},
+            'draws': round(sum(map(sum, zip(*self.draws.values()))) / max(len(frame), 1), 1),
+            'surfaces_per_frame': round(sum(self.allocations) / max(len(self.allocations), 1), 2),
+            'surfaces_allocated': surfaces_allocated,
+            **extra,
+        }
+    
+    def render_panel(self, stats):
+        global surfaces_allocated
+        font = text_cache.font(20, 'couriernew', fallback_size=24)
+        lines = [
+            f"FPS {stats['fps'] or 0:5.1f}  frame {stats['frame_ms']['mean']:6.2f} ms  p99 {stats['frame_ms']['p99']:6.2f}",
+            f"{'stage':<10} {'mean':>7} {'p99':>7} {'draws':>6}",
+        ]
+        for stage, timing in stats['stages'].items():
+            lines.append(f"{stage:<10} {timing['mean']:7.2f} {timing['p99']:7.2f} {timing['draws']:6.0f}")
+        lines.append(f"draws {stats['draws']:.0f}  surfaces/frame {stats['surfaces_per_frame']:.2f}")
+        lines.append(f"scale {stats['scale']}  particles {stats['particles']}  pushed {stats['pixels_pushed']:,}")
+        
+        rendered = [font.render(line, True, (230, 255, 230)) for line in lines]
+        surfaces_allocated += len(rendered)
+        line_height = font.get_linesize()
+        panel = new_surface((max(r.get_width() for r in rendered) + 20, line_height * len(lines) + 16), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, text in enumerate(rendered):
+            panel.blit(text, (10, 8 + i * line_height))
+        self.panel = panel.convert_alpha()
+        self.rect = self.panel.get_rect(topleft=self.rect.topleft)
+    
+    def publish(self, stats):
+        """Expose the stats to the browser console as `JSON.parse(mapStats)`; a no-op outside pygbag"""
+        try:
+            import platform
+            platform.window.mapStats = json.dumps(stats)
+        except Exception:
+            pass
+    
+    def draw(self, screen):
+        if self.visible and self.panel is not None:
+            screen.blit(self.panel, self.rect)
+
+class Game:
+    def __init__(self, dirty_rects=DIRTY_RECTS, world_zones=WORLD_ZONES, adaptive_quality=ADAPTIVE_QUALITY):
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("FinQuest")
+        self.clock = pygame.time.Clock()
+        self.running = True
+        
+        zones_x, zones_y = world_zones
+        self.world = pygame.Rect(0, 0, WIDTH * zones_x, HEIGHT * zones_y)
+        self.ground = Ground(self.world.width, self.world.height)
+        
+        # Character starts in center of the first zone
+        self.character = Character(WIDTH // 2 - 27, HEIGHT // 2 - 27, self.world.width, self.world.height)
+        self.camera = self.screen.get_rect()
+        
+        # Widescreen building layout
+        self.buildings = [
+            Building("🎮 ARCADE", 100, 100, 280, 260, Location.ARCADE, "arcade"),
+            Building("📚 LIBRARY", WIDTH - 380, 100, 280, 260, Location.LIBRARY, "library"),
+            Building("🏦 BANK", WIDTH // 2 - 140, HEIGHT - 360, 280, 280, Location.BANK, "bank"),
+        ]
+        
+        # Generate trees - simplified for less clutter
+        self.trees = []
+        self.plant_trees(0, 0)
+        
+        # Every zone except the starting one gets an office block off its crossroads, and its own trees
+        for zone_y in range(zones_y):
+            for zone_x in range(zones_x):
+                if zone_x or zone_y:
+                    ox, oy = zone_x * WIDTH, zone_y * HEIGHT
+                    x = ox + random.choice([random.randint(150, WIDTH // 2 - 400),
+                                            random.randint(WIDTH // 2 + 200, WIDTH - 350)])
+                    y = oy + random.randint(HEIGHT // 2 + 120, HEIGHT - 380)
+                    self.buildings.append(Building("OFFICE", x, y, 200, 270, Location.NONE, "office"))
+                    self.plant_trees(ox, oy)
+        for b in self.buildings:
+            b.render_sprite()
+        
+        # Depth order and proximity lookups for everything drawn between the particle layers
+        self.scene = SceneGraph()
+        for node in (*self.trees, *self.buildings, self.character):
+            self.scene.add(node)
+        self.nearby = self.buildings_near()
+        
+        # Particles float over the screen, not the world
+        self.particles = ParticleSystem(PARTICLE_COUNT)
+        self.keys = {}
+        
+        # Dirty-rectangle renderer state; pixels_pushed counts what reached the display last frame
+        self.dirty_rects = dirty_rects
+        self.previous_dirty = None
+        self.previous_camera = None
+        self.character_state = None
+        self.pixels_pushed = 0
+        
+        # Below full quality the scene is drawn into `canvas`, a scaled-down copy of the window
+        self.quality = QualityController() if adaptive_quality else None
+        self.scale = 1
+        self.canvas = None
+        self.lag = TICK  # gameplay time not yet stepped through; the first frame takes one step
+        self.profiler = FrameProfiler()
+        
+    def plant_trees(self, ox, oy, attempts=25):
+        """Scatter trees over the zone at (ox, oy), keeping clear of its buildings"""
+        for _ in range(attempts):
+            x = ox + random.randint(150, WIDTH - 150)
+            y = oy + random.randint(400, HEIGHT - 120)
+            too_close = any(
+                abs(x - (b.x + b.width // 2)) < 200 and 
+                abs(y - (b.y + b.height // 2)) < 200 
+                for b in self.buildings
+            )
+            if not too_close:
+                self.trees.append(Tree(x, y, random.randint(25, 35)))
+        
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN:
                 self.keys[event.key] = True
-                if event.key == pygame.K_SPACE:
-                    for b in self.buildings:
-                        if b.is_near(self.character) and b.location != Location.NONE:
+                if event.key == pygame.K_F3:
+                    self.profiler.visible = not self.profiler.visible
+                    if self.profiler.visible:
+                        self.profiler.render_panel(self.profile_stats())
+                elif event.key == pygame.K_F4:
+                    print(json.dumps(self.profile_stats()))
+                elif event.key == pygame.K_SPACE:
+                    for b in self.buildings_near():
+                        if b.location != Location.NONE:
                             try:
                                 # Use platform.window to navigate
                                 import platform
@@ -776,6 +1455,8 @@ class Game:
                                 print(f"Would navigate to: /{b.location.value}")
             elif event.type == pygame.KEYUP:
                 self.keys[event.key] = False
+            elif event.type == pygame.VIDEORESIZE:
+                self.previous_dirty = None  # the next frame is drawn in full
     
     def handle_movement(self):
         dx = dy = 0
@@ -793,49 +1474,211 @@ class Game:
             dy *= 0.707
         
         self.character.move(dx, dy)
+        self.scene.update(self.character)
+        self.nearby = self.buildings_near()
+        self.follow_character()
     
-    async def run(self):
-        while self.running:
-            self.handle_events()
-            self.handle_movement()
-            
-            for b in self.buildings:
-                b.update()
-            for t in self.trees:
-                t.update()
-            for p in self.particles:
-                p.update()
-            
-            # Draw - clear screen completely first to prevent trails
-            self.screen.fill((0, 0, 0))
-            self.draw_background()
-            self.draw_paths()
-            
-            # Depth sorting
-            for p in self.particles:
-                if p.y > 420:
-                    p.draw(self.screen)
-            
-            trees_behind = [t for t in self.trees if t.y < self.character.y]
-            trees_front = [t for t in self.trees if t.y >= self.character.y]
+    def follow_character(self):
+        """Center the camera on the character, without showing anything beyond the edges of the world"""
+        camera = pygame.Rect((0, 0), self.screen.get_size())
+        camera.center = self.character.get_rect().center
+        camera.x = max(0, min(camera.x, self.world.width - camera.width))
+        camera.y = max(0, min(camera.y, self.world.height - camera.height))
+        self.camera = camera
+    
+    def buildings_near(self, threshold=95):
+        """Buildings within `threshold` px of the character, found through the scene's spatial hash"""
+        area = self.character.get_rect().inflate(threshold * 2, threshold * 2)
+        return [node for node in self.scene.hash.query(area)
+                if isinstance(node, Building) and node.is_near(self.character, threshold)]
+    
+    def draw_scene(self, surface, clips=None, scale=1):
+        """Draw the whole frame onto `surface`, or with `clips` redraw only those regions of it.
+        
+        At a render `scale` below 1 the prompts are left out; `present_scaled` adds them at full size.
+        """
+        camera = self.camera
+        offset = camera.topleft
+        lap = self.profiler.lap
+        particles_behind = self.particles.blit_sequence(True, scale)
+        particles_front = self.particles.blit_sequence(False, scale)
+        lap('particles')
+        
+        # Blits outside the clip rect cost next to nothing, so particles are not filtered per region
+        for clip in clips or [None]:
+            surface.set_clip(clip)
+            if not self.world.contains(camera):
+                surface.fill((0, 0, 0), clip)  # a screen larger than the world
+            # The ground covers the whole view, so there are no trails
+            lap('ground', self.ground.draw(surface, camera, clip, scale))
             
-            for t in trees_behind:
-                t.draw(self.screen)
+            surface.blits(particles_behind, doreturn=False)
+            lap('particles', len(particles_behind))
             
-            for b in self.buildings:
-                b.draw(self.screen, self.character)
+            # Depth sorting, culled to what is on screen
+            nodes = self.scene.query(camera if clip is None else clip.move(offset))
+            lap('scene')
+            for node in nodes:
+                if isinstance(node, Building):
+                    lap('buildings', node.draw(surface, node in self.nearby, offset, scale))
+                elif isinstance(node, Tree):
+                    node.draw(surface, offset, scale)
+                    lap('trees', 1)
+                else:
+                    node.draw(surface, offset, scale)
+                    lap('character', 1)
             
-            self.character.draw(self.screen)
+            if scale == 1:
+                lap('prompts', self.draw_prompts(surface))
             
-            for t in trees_front:
-                t.draw(self.screen)
+            surface.blits(particles_front, doreturn=False)
+            lap('particles', len(particles_front))
+        surface.set_clip(None)
+    
+    def draw_prompts(self, surface):
+        """Interaction prompts float above everything else. Returns the number of draw calls."""
+        draws = 0
+        for b in self.nearby:
+            if b.location != Location.NONE:
+                b.draw_prompt(surface, self.camera.topleft)
+                draws += 3
+        return draws
+    
+    def mark_dirty(self):
+        """Tiles touched this frame by the character (when it changed), particles and building overlays"""
+        width, height = self.screen.get_size()
+        grid = dirty_grid(width, height, DIRTY_TILE)
+        offset = self.camera.topleft
+        
+        def mark(rect):
+            rect = rect.clip(self.screen.get_rect())
+            if rect:
+                left, right = rect.left // DIRTY_TILE, (rect.right - 1) // DIRTY_TILE + 1
+                for row in grid[rect.top // DIRTY_TILE:(rect.bottom - 1) // DIRTY_TILE + 1]:
+                    row[left:right] = b'\x01' * (right - left)
+        
+        state = (self.character.x, self.character.y, self.character.anim_frame)
+        if state != self.character_state:
+            self.character_state = state
+            mark(self.character.bounds.move(-offset[0], -offset[1]))
+        for b in self.nearby:
+            for rect in b.overlay_rects(offset, width):
+                mark(rect)
+        if self.profiler.visible:
+            mark(self.profiler.rect)
+        self.particles.mark_dirty(grid, DIRTY_TILE)
+        return grid
+    
+    def present(self):
+        """Draw the frame and push it to the display, in full or as dirty rects"""
+        if self.scale != 1:
+            self.present_scaled()
+            return
+        if not self.dirty_rects:
+            self.draw_scene(self.screen)
+            self.push()
+            return
+        
+        # A region must be redrawn if something is there now or was there last frame.
+        # When the camera scrolls everything moves, so the whole frame is drawn.
+        grid = self.mark_dirty()
+        moved = self.camera != self.previous_camera
+        self.previous_camera = self.camera
+        dirty = grid if self.previous_dirty is None else merge_dirty(grid, self.previous_dirty)
+        full = moved or self.previous_dirty is None or dirty_share(dirty) > DIRTY_AREA_LIMIT
+        self.previous_dirty = grid
+        if full:
+            self.draw_scene(self.screen)
+            self.push()
+            return
+        
+        screen_rect = self.screen.get_rect()
+        rects = [r.clip(screen_rect) for r in dirty_regions(dirty, DIRTY_TILE)]
+        self.draw_scene(self.screen, rects)
+        self.push(rects)
+    
+    def present_scaled(self):
+        """Draw the scene into the scaled-down canvas, upscale it to the window and add the prompts at full size"""
+        size = self.screen.get_size()
+        canvas_size = (round(size[0] * self.scale), round(size[1] * self.scale))
+        if self.canvas is None or self.canvas.get_size() != canvas_size:
+            self.canvas = new_surface(canvas_size).convert()
+        self.draw_scene(self.canvas, scale=self.scale)
+        pygame.transform.scale(self.canvas, size, self.screen)
+        self.profiler.lap('upscale', 1)
+        self.profiler.lap('prompts', self.draw_prompts(self.screen))
+        self.push()
+    
+    def push(self, rects=None):
+        """Add the profiler overlay and send the frame to the display, all of it or just `rects`"""
+        self.profiler.draw(self.screen)
+        self.profiler.lap('overlay', int(self.profiler.visible))
+        if rects is None:
+            pygame.display.flip()
+            width, height = self.screen.get_size()
+            self.pixels_pushed = width * height
+        else:
+            pygame.display.update(rects)
+            self.pixels_pushed = sum(r.width * r.height for r in rects)
+        self.profiler.lap('present')
+    
+    def profile_stats(self):
+        """Profiler stats plus the state they were measured in, for the overlay and for comparing devices"""
+        return self.profiler.stats(
+            scale=self.scale,
+            particles=len(self.particles),
+            pixels_pushed=self.pixels_pushed,
+            screen=list(self.screen.get_size()),
+            dirty_rects=self.dirty_rects,
+            scene_nodes=len(self.scene),
+            ground=self.ground.stats(),
+            text_cache=text_cache.stats(),
+        )
+    
+    def apply_quality(self):
+        self.scale = self.quality.scale
+        self.particles.resize(self.quality.particles)
+        self.previous_dirty = None  # the next frame is drawn in full
+    
+    def step(self):
+        """Advance movement and animation by one TICK"""
+        self.handle_movement()
+        for b in self.buildings:
+            b.update()
+        for t in self.trees:
+            t.update()
+        self.particles.update()
+    
+    async def run(self):
+        profiler = self.profiler
+        while self.running:
+            started = time.perf_counter()
+            profiler.begin()
+            self.handle_events()
+            profiler.lap('events')
             
-            for p in self.particles:
-                if p.y <= 420:
-                    p.draw(self.screen)
+            # Fixed timestep. Rounding to the nearest step (lag may go half a tick negative) keeps a
+            # frame rate close to FPS at one step a frame instead of alternating between none and two.
+            steps = 0
+            while self.lag >= TICK / 2 and steps < MAX_STEPS:
+                self.step()
+                self.lag -= TICK
+                steps += 1
+            if steps == MAX_STEPS:
+                self.lag = 0  # too far behind to catch up
+            profiler.lap('update')
             
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            self.present()
+            if profiler.frames % profiler.refresh == 0:
+                stats = self.profile_stats()
+                profiler.publish(stats)
+                if profiler.visible:
+                    profiler.render_panel(stats)
+                profiler.lap('overlay')
+            profiler.end()
+            if self.quality is not None and self.quality.record((time.perf_counter() - started) * 1000):
+                self.apply_quality()
+            self.lag += self.clock.tick(FPS) / 1000
             await asyncio.sleep(0)
         
         pygame.quit()
@@ -0,0 +1,140 @@
+"""Deterministic detection of subscriptions and other recurring charges.
+
+Charges are grouped by normalized merchant ("NETFLIX.COM 8271" and
+"Netflix" are the same merchant). Within a merchant they are split into
+amount clusters, so that two plans from the same company, or a regular
+charge next to one-off purchases, are judged separately. Two charges sit
+in the same cluster when their amounts are within `amount_tolerance` of
+each other.
+
+A cluster is recurring when most of the gaps between consecutive charges
+match one period (weekly, monthly or annual, each with some slack for
+weekends and short months). It also needs enough charges:
+`min_occurrences`, or two for annual ones.
+
+The work is two sorts and a handful of vectorized passes over NumPy
+arrays, so it is O(n log n) in the number of transactions. Only merchant
+normalization runs per row in Python, and it is memoized per distinct name.
+"""
+import re
+from datetime import date
+
+# name -> (nominal days, shortest gap, longest gap)
+PERIODS = {
+    'weekly': (7, 5, 9),
+    'monthly': (30.44, 26, 35),
+    'annual': (365.25, 350, 380),
+}
+_ANNUAL = list(PERIODS).index('annual')
+
+_NOISE = re.compile(r"\b(?:www|com|co|uk|ltd|limited|inc|llc|plc|gmbh|payment|pmt|purchase|pos|dd|direct debit|"
+                    r"subscription|sub|recurring|online|intl|ref|card)\b")
+_NON_ALPHA = re.compile(r"[^a-z& ]+")
+_SPACE = re.compile(r"\s+")
+
+
+def _np():
+    """NumPy, imported on first use so importing this module (and the app) stays fast."""
+    import numpy
+    return numpy
+
+
+def normalize_merchant(name):
+    """'NETFLIX.COM 8271-LONDON' -> 'netflix london'; digits, punctuation and filler words removed."""
+    text = _NON_ALPHA.sub(' ', (name or '').lower())
+    return _SPACE.sub(' ', _NOISE.sub(' ', text)).strip()
+
+
+def detect_subscriptions(merchants, dates, amounts, today=None, amount_tolerance=0.15,
+                         min_occurrences=3, regularity=0.75):
+    """Find recurring charges.
+
+    `merchants`, `dates` and `amounts` are parallel sequences; dates are
+    `datetime.date`s and positive amounts are money out (Plaid's sign
+    convention). Returns one dict per recurring charge, most expensive per
+    month first.
+    """
+    np = _np()
+    today = today or date.today()
+    amounts = np.asarray(amounts, dtype=np.float64)
+    out = amounts > 0
+    if not out.any():
+        return []
+
+    # Merchant ids: normalize each distinct raw name once
+    names = {}
+    keys = {}
+    merchant_ids = np.empty(len(amounts), dtype=np.int64)
+    for i, raw in enumerate(merchants):
+        mid = names.get(raw)
+        if mid is None:
+            key = normalize_merchant(raw)
+            mid = names[raw] = keys.setdefault(key, len(keys)) if key else -1
+        merchant_ids[i] = mid
+    labels = [key.title() for key in keys]
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(amounts))
+
+    keep = out & (merchant_ids >= 0)
+    if not keep.any():
+        return []
+    merchant_ids, ordinals, amounts = merchant_ids[keep], ordinals[keep], amounts[keep]
+
+    # 1. Sort by (merchant, amount); start a new cluster on a merchant change or an amount jump
+    order = np.lexsort((amounts, merchant_ids))
+    m, a = merchant_ids[order], amounts[order]
+    jump = np.empty(len(a), dtype=bool)
+    jump[0] = True
+    jump[1:] = (m[1:] != m[:-1]) | (a[1:] - a[:-1] > amount_tolerance * np.maximum(a[:-1], 1.0))
+    cluster_sorted = np.cumsum(jump) - 1
+    cluster = np.empty_like(cluster_sorted)
+    cluster[order] = cluster_sorted
+    n_clusters = int(cluster_sorted[-1]) + 1
+
+    # 2. Sort by (cluster, date) and look at the gaps between consecutive charges
+    order = np.lexsort((ordinals, cluster))
+    c, d, a = cluster[order], ordinals[order], amounts[order]
+    counts = np.bincount(c, minlength=n_clusters)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    same = c[1:] == c[:-1]
+    gaps = np.diff(d)[same]
+    gap_cluster = c[1:][same]
+    n_gaps = np.bincount(gap_cluster, minlength=n_clusters)
+
+    best_period = np.full(n_clusters, -1)
+    best_share = np.zeros(n_clusters)
+    for p, (_, low, high) in enumerate(PERIODS.values()):
+        hits = np.bincount(gap_cluster, weights=(gaps >= low) & (gaps <= high), minlength=n_clusters)
+        share = np.divide(hits, n_gaps, out=np.zeros(n_clusters), where=n_gaps > 0)
+        better = share > best_share
+        best_period[better] = p
+        best_share[better] = share[better]
+
+    periods = list(PERIODS.items())
+    recurring = (best_period >= 0) & (best_share >= regularity)
+    recurring &= counts >= np.where(best_period == _ANNUAL, 2, min_occurrences)
+
+    totals = np.bincount(c, weights=a, minlength=n_clusters)
+    ends = starts + counts - 1
+    results = []
+    for k in np.flatnonzero(recurring):
+        period_name, (days, _, _) = periods[best_period[k]]
+        first, last = date.fromordinal(int(d[starts[k]])), date.fromordinal(int(d[ends[k]]))
+        amount = totals[k] / counts[k]
+        monthly = amount * PERIODS['monthly'][0] / days
+        results.append({
+            'merchant': labels[m[np.searchsorted(cluster_sorted, k)]],
+            'period': period_name,
+            'amount': round(float(amount), 2),
+            'last_amount': round(float(a[ends[k]]), 2),
+            'occurrences': int(counts[k]),
+            'first_date': first.isoformat(),
+            'last_date': last.isoformat(),
+            'next_expected': date.fromordinal(int(d[ends[k]] + round(days))).isoformat(),
+            'monthly_cost': round(float(monthly), 2),
+            'annual_cost': round(float(monthly * 12), 2),
+            # Missed more than half a period past the expected date: probably cancelled
+            'active': (today - last).days <= days * 1.5,
+            'regularity': round(float(best_share[k]), 2),
+        })
+    results.sort(key=lambda r: (not r['active'], -r['monthly_cost']))
+    return results